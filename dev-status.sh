@@ -18,7 +18,7 @@ echo ""
 echo "📊 Workspace Stats:"
 echo "   • Skills: $(ls -1 /home/ubuntu/clawd/skills | wc -l)"
 echo "   • Agents: $(ls -1 /home/ubuntu/clawd/agents | wc -l)"
-echo "   • Tasks: $(python3 -c "import json; d=json.load(open('/home/ubuntu/clawd/memory/tasks.json')); print(len(d['tasks']))")"
-echo "   • Lessons: $(python3 -c "import json; d=json.load(open('/home/ubuntu/clawd/memory/lessons.json')); print(len(d['lessons']))")"
+echo "   • Open tasks: $(python3 -c "import sqlite3; print(sqlite3.connect('/home/ubuntu/clawd/memory/tasks.db').execute('SELECT COUNT(*) FROM tasks').fetchone()[0])")"
+echo "   • Lessons: $(python3 -c "import json; m=json.load(open('/home/ubuntu/clawd/memory/lessons/manifest.json')); print(sum(s['count'] for s in m['shards'].values()))")"
 echo ""
 echo "=========================================="
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+knowledge-graph: In-memory adjacency index for O(degree) edge lookups
+"""
+
+class AdjacencyIndex:
+    """Edges keyed by (source, target, relation) with out- and in-neighbor maps.
+
+    The index holds references to the edge dicts themselves, so weight and
+    timestamp updates made through it are visible in the graph document.
+    """
+
+    def __init__(self, edges=()):
+        self.edges = {}  # (source, target, relation) -> edge
+        self.out = {}    # source -> {(target, relation): edge}
+        self.inn = {}    # target -> {(source, relation): edge}
+        for edge in edges:
+            self.add(edge)
+
+    def __len__(self):
+        return len(self.edges)
+
+    def __contains__(self, key):
+        return key in self.edges
+
+    def get(self, source, target, relation):
+        return self.edges.get((source, target, relation))
+
+    def add(self, edge):
+        """Index an edge (replacing any edge with the same key)."""
+        source, target, relation = edge["source"], edge["target"], edge["relation"]
+        self.edges[(source, target, relation)] = edge
+        self.out.setdefault(source, {})[(target, relation)] = edge
+        self.inn.setdefault(target, {})[(source, relation)] = edge
+
+    def remove(self, source, target, relation):
+        """Drop an edge from the index. Returns the removed edge or None."""
+        edge = self.edges.pop((source, target, relation), None)
+        if edge is not None:
+            self.out[source].pop((target, relation), None)
+            self.inn[target].pop((source, relation), None)
+        return edge
+
+    def out_edges(self, node_id):
+        return self.out.get(node_id, {}).values()
+
+    def in_edges(self, node_id):
+        return self.inn.get(node_id, {}).values()
+
+    def edges_for(self, node_id, direction="both"):
+        """Yield edges leaving (`out`), entering (`in`) or touching a node."""
+        if direction in ("out", "both"):
+            yield from self.out_edges(node_id)
+        if direction in ("in", "both"):
+            for edge in self.in_edges(node_id):
+                if direction == "both" and edge["source"] == node_id:
+                    continue
+                yield edge
+
+    def degree(self, node_id):
+        return len(self.out.get(node_id, ())) + len(self.inn.get(node_id, ()))
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+knowledge-graph: Graph analytics (PageRank, components, degree, communities)
+
+The graph is packed into integer-indexed arrays (edge list + CSR adjacency)
+once per run. NumPy is used for the vectorizable parts when installed;
+otherwise everything runs in pure Python. Results are cached on disk and
+reused until the store's revision changes.
+"""
+import json
+import random
+from array import array
+from pathlib import Path
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+CACHE_VERSION = 1
+
+class CompactGraph:
+    """Integer-indexed view of the graph: node ids, COO edges and undirected CSR."""
+
+    def __init__(self, store):
+        self.ids = []
+        self.index = {}
+        for node in store.iter_nodes():
+            self._intern(node["id"])
+        src, dst, weight = array("i"), array("i"), array("d")
+        for edge in store.iter_edges():
+            src.append(self._intern(edge["source"]))
+            dst.append(self._intern(edge["target"]))
+            weight.append(float(edge.get("weight", 1)))
+        self.src, self.dst, self.weight = src, dst, weight
+        self.n = len(self.ids)
+        self._build_csr()
+
+    def _intern(self, node_id):
+        i = self.index.get(node_id)
+        if i is None:
+            i = self.index[node_id] = len(self.ids)
+            self.ids.append(node_id)
+        return i
+
+    def _build_csr(self):
+        """Undirected adjacency: neighbors of i are indices[indptr[i]:indptr[i+1]]."""
+        counts = [0] * (self.n + 1)
+        for s, d in zip(self.src, self.dst):
+            counts[s + 1] += 1
+            counts[d + 1] += 1
+        for i in range(self.n):
+            counts[i + 1] += counts[i]
+        self.indptr = array("i", counts)
+        fill = list(counts[:-1])
+        self.indices = array("i", [0] * counts[-1])
+        self.adj_weight = array("d", [0.0] * counts[-1])
+        for s, d, w in zip(self.src, self.dst, self.weight):
+            for a, b in ((s, d), (d, s)):
+                self.indices[fill[a]] = b
+                self.adj_weight[fill[a]] = w
+                fill[a] += 1
+
+def pagerank(g, damping=0.85, tol=1e-6, max_iter=100):
+    """Weighted PageRank; rank of dangling nodes is spread uniformly."""
+    n = g.n
+    if n == 0:
+        return []
+    if NUMPY_AVAILABLE:
+        src = np.frombuffer(g.src, dtype=np.int32)
+        dst = np.frombuffer(g.dst, dtype=np.int32)
+        w = np.frombuffer(g.weight, dtype=np.float64)
+        out_w = np.bincount(src, weights=w, minlength=n)
+        dangling = out_w == 0
+        share = np.divide(w, out_w[src], out=np.zeros_like(w), where=out_w[src] > 0)
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            incoming = np.bincount(dst, weights=rank[src] * share, minlength=n)
+            new = (1 - damping) / n + damping * (incoming + rank[dangling].sum() / n)
+            delta = np.abs(new - rank).sum()
+            rank = new
+            if delta < tol:
+                break
+        return rank.tolist()
+
+    out_w = [0.0] * n
+    for s, w in zip(g.src, g.weight):
+        out_w[s] += w
+    rank = [1.0 / n] * n
+    for _ in range(max_iter):
+        incoming = [0.0] * n
+        for s, d, w in zip(g.src, g.dst, g.weight):
+            incoming[d] += rank[s] * w / out_w[s]
+        dangling = sum(r for r, ow in zip(rank, out_w) if ow == 0)
+        base = (1 - damping) / n + damping * dangling / n
+        new = [base + damping * x for x in incoming]
+        delta = sum(abs(a - b) for a, b in zip(new, rank))
+        rank = new
+        if delta < tol:
+            break
+    return rank
+
+def connected_components(g):
+    """Weakly connected component label per node (union-find)."""
+    parent = list(range(g.n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for s, d in zip(g.src, g.dst):
+        a, b = find(s), find(d)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+    return [find(i) for i in range(g.n)]
+
+def degree_centrality(g):
+    """(in_degree, out_degree, centrality) per node.
+
+    Degrees count edges (one per relation); centrality is the share of other
+    nodes that are direct neighbors, so parallel relations are not double-counted.
+    """
+    n = g.n
+    if NUMPY_AVAILABLE and n:
+        in_deg = np.bincount(np.frombuffer(g.dst, dtype=np.int32), minlength=n).tolist()
+        out_deg = np.bincount(np.frombuffer(g.src, dtype=np.int32), minlength=n).tolist()
+    else:
+        in_deg, out_deg = [0] * n, [0] * n
+        for s, d in zip(g.src, g.dst):
+            out_deg[s] += 1
+            in_deg[d] += 1
+    scale = 1.0 / (n - 1) if n > 1 else 0.0
+    indptr, indices = g.indptr, g.indices
+    neighbors = [len(set(indices[indptr[i]:indptr[i + 1]]) - {i}) for i in range(n)]
+    return [(i, o, k * scale) for i, o, k in zip(in_deg, out_deg, neighbors)]
+
+def label_propagation(g, max_iter=20, seed=42):
+    """Community label per node: each node adopts its neighbors' heaviest label."""
+    labels = list(range(g.n))
+    indptr, indices, weights = g.indptr.tolist(), g.indices.tolist(), g.adj_weight.tolist()
+    order = list(range(g.n))
+    rng = random.Random(seed)
+    for _ in range(max_iter):
+        rng.shuffle(order)
+        changed = 0
+        for i in order:
+            start, end = indptr[i], indptr[i + 1]
+            if start == end:
+                continue
+            totals = {}
+            for k in range(start, end):
+                label = labels[indices[k]]
+                totals[label] = totals.get(label, 0.0) + weights[k]
+            best = max(totals.values())
+            choice = min(label for label, total in totals.items() if total == best)
+            if labels[i] in totals and totals[labels[i]] == best:
+                continue
+            labels[i] = choice
+            changed += 1
+        if not changed:
+            break
+    return labels
+
+def compute(store):
+    """Run every analysis and return results keyed by node id."""
+    g = CompactGraph(store)
+    ranks = pagerank(g)
+    components = connected_components(g)
+    degrees = degree_centrality(g)
+    communities = label_propagation(g)
+    return {
+        "nodes": g.n,
+        "edges": len(g.src),
+        "backend": "numpy" if NUMPY_AVAILABLE else "python",
+        "pagerank": {g.ids[i]: r for i, r in enumerate(ranks)},
+        "component": {g.ids[i]: g.ids[c] for i, c in enumerate(components)},
+        "degree": {g.ids[i]: list(d) for i, d in enumerate(degrees)},
+        "community": {g.ids[i]: g.ids[c] for i, c in enumerate(communities)},
+    }
+
+def analyze(store, cache_file=None):
+    """Cached analytics: recomputed only when the store revision changes."""
+    revision = f"{store.backend}:{store.revision()}"
+    cache_file = Path(cache_file) if cache_file else None
+    if cache_file and cache_file.exists():
+        try:
+            with open(cache_file) as f:
+                cached = json.load(f)
+            if cached.get("version") == CACHE_VERSION and cached.get("revision") == revision:
+                cached["cached"] = True
+                return cached
+        except (OSError, ValueError):
+            pass
+    results = compute(store)
+    results.update({"version": CACHE_VERSION, "revision": revision})
+    if cache_file:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, "w") as f:
+            json.dump(results, f)
+    results["cached"] = False
+    return results
+
+def group_by(assignment):
+    """Invert {node: label} into [[node, ...], ...], largest group first."""
+    groups = {}
+    for node_id, label in assignment.items():
+        groups.setdefault(label, []).append(node_id)
+    return sorted(groups.values(), key=len, reverse=True)
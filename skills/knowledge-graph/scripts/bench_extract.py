@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+knowledge-graph: Micro-benchmark for entity extraction
+
+Compares the single-pass trie extractor with the previous implementation
+(one re.finditer per type pattern) on synthetic documents, for growing
+lexicon sizes.
+"""
+import random
+import re
+import string
+import sys
+import time
+
+import graph
+from extractor import EntityExtractor
+
+STOPWORDS = ["the", "this", "that", "with", "from"]
+FILLER = ("we are deploying the new service and it uses a queue for jobs so that "
+          "the team can ship faster with fewer regressions during the week").split()
+
+def legacy_patterns(lexicon):
+    """Per-type alternations, as the extractor was written before."""
+    patterns = {type_: list(regexes) for type_, regexes in graph.ENTITY_PATTERNS.items()}
+    for type_, names in lexicon.items():
+        alternation = "|".join(re.escape(n) for n in names)
+        patterns.setdefault(type_, []).append(r'\b(?:' + alternation + r')\b')
+    return patterns
+
+def legacy_extract(text, patterns):
+    """Previous extract_entities: one finditer per pattern, relying on the re cache."""
+    entities = []
+    for type_, type_patterns in patterns.items():
+        for pattern in type_patterns:
+            for match in re.finditer(pattern, text, re.IGNORECASE):
+                name = match.group(0)
+                if len(name) < 2 or name.lower() in STOPWORDS:
+                    continue
+                entities.append({"name": name, "type": type_, "position": match.start()})
+    seen = set()
+    unique = []
+    for e in entities:
+        key = (e["name"].lower(), e["type"])
+        if key not in seen:
+            seen.add(key)
+            unique.append(e)
+    return unique
+
+def single_pass_extract(text, extractor):
+    seen = set()
+    unique = []
+    for name, type_, position in extractor.finditer(text):
+        if len(name) < 2 or name.lower() in STOPWORDS:
+            continue
+        key = (name.lower(), type_)
+        if key not in seen:
+            seen.add(key)
+            unique.append({"name": name, "type": type_, "position": position})
+    return unique
+
+def synthetic_lexicon(size, rng):
+    """Built-in lexicon plus `size` random technology names."""
+    lexicon = {type_: list(names) for type_, names in graph.ENTITY_LEXICON.items()}
+    extra = {"".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 12))) for _ in range(size)}
+    lexicon["technology"] = lexicon["technology"] + sorted(extra)
+    return lexicon
+
+def synthetic_docs(lexicon, count, rng):
+    names = [n for names in lexicon.values() for n in names]
+    docs = []
+    for _ in range(count):
+        words = [rng.choice(FILLER) for _ in range(120)]
+        for _ in range(12):
+            words[rng.randrange(len(words))] = rng.choice(names)
+        words[rng.randrange(len(words))] = "@" + rng.choice(["steve", "rajesh", "bob"])
+        docs.append(" ".join(words))
+    return docs
+
+def timed(fn, docs):
+    start = time.perf_counter()
+    results = [fn(doc) for doc in docs]
+    return time.perf_counter() - start, results
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in ("--help", "-h"):
+        print("Usage: bench_extract.py [docs] [lexicon_sizes]")
+        print("")
+        print("Benchmark single-pass entity extraction against the per-pattern implementation.")
+        print("")
+        print("Examples:")
+        print("  bench_extract.py                 # 300 docs, lexicon sizes 0,1000,10000")
+        print("  bench_extract.py 1000 0,50000")
+        sys.exit(0)
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    sizes = [int(s) for s in sys.argv[2].split(",")] if len(sys.argv) > 2 else [0, 1000, 10000]
+    rng = random.Random(42)
+
+    print(f"{'lexicon':>8} {'build':>8} {'legacy docs/s':>14} {'single docs/s':>14} {'speedup':>8}  match")
+    for size in sizes:
+        lexicon = synthetic_lexicon(size, rng)
+        docs = synthetic_docs(lexicon, count, rng)
+
+        start = time.perf_counter()
+        extractor = EntityExtractor(lexicon, graph.ENTITY_PATTERNS)
+        build = time.perf_counter() - start
+
+        patterns = legacy_patterns(lexicon)
+        legacy_time, legacy = timed(lambda d: legacy_extract(d, patterns), docs)
+        single_time, single = timed(lambda d: single_pass_extract(d, extractor), docs)
+
+        same = all(
+            {(e["name"].lower(), e["type"]) for e in a} == {(e["name"].lower(), e["type"]) for e in b}
+            for a, b in zip(legacy, single)
+        )
+        print(f"{len(extractor):>8} {build:>7.2f}s {count / legacy_time:>14.1f} {count / single_time:>14.1f} "
+              f"{legacy_time / single_time:>7.1f}x  {'yes' if same else 'NO'}")
+
+if __name__ == "__main__":
+    main()
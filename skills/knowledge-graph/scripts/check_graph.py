@@ -2,52 +2,64 @@
 """
 Extract and summarize knowledge from recent conversations
 """
-import json
+import argparse
 import sys
-from pathlib import Path
 from datetime import datetime, timedelta
 
-GRAPH_FILE = Path("/home/ubuntu/clawd/memory/knowledge_graph.json")
-
-def load_graph():
-    if GRAPH_FILE.exists():
-        with open(GRAPH_FILE) as f:
-            return json.load(f)
-    return {"nodes": {}, "edges": []}
+from graph import get_store
 
 def get_recent_additions(hours=24):
     """Get entities added in the last N hours."""
-    data = load_graph()
     cutoff = datetime.now() - timedelta(hours=hours)
-    
-    recent = []
-    for node in data["nodes"].values():
-        created = datetime.fromisoformat(node["created_at"])
-        if created > cutoff:
-            recent.append(node)
-    
-    return recent
+    return get_store().nodes_between("created_at", cutoff)
 
 def get_active_connections(min_weight=2):
     """Get strong relationships (frequently mentioned)."""
-    data = load_graph()
-    strong = [e for e in data["edges"] if e.get("weight", 1) >= min_weight]
-    return sorted(strong, key=lambda x: -x.get("weight", 1))[:10]
+    return get_store().strong_edges(min_weight, limit=10)
+
+def get_strengthened_connections(days=7, min_weight=2):
+    """Get strong relationships seen again in the last N days, strongest first."""
+    cutoff = datetime.now() - timedelta(days=days)
+    edges = [e for e in get_store().edges_between(cutoff) if e.get("weight", 1) >= min_weight]
+    return sorted(edges, key=lambda e: e.get("weight", 1), reverse=True)
+
+def format_edge(edge):
+    store = get_store()
+    source = (store.get_node(edge["source"]) or {}).get("name", "?")
+    target = (store.get_node(edge["target"]) or {}).get("name", "?")
+    return f"  {source} --{edge['relation']}--> {target} ({edge.get('weight', 1)}x)"
+
+def positive_number(value):
+    """argparse type: a number greater than zero."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected a number, got {value!r}")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"expected a positive number, got {value!r}")
+    return number
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="check_graph.py",
+        description="Check for recent additions and strong connections in knowledge graph.",
+        epilog="Examples:\n  check_graph.py\n  check_graph.py --hours 72 --strengthened 7",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--hours", type=positive_number, default=24, metavar="N",
+                        help="Entities added in the last N hours (default 24)")
+    parser.add_argument("--strengthened", type=positive_number, default=None, metavar="DAYS",
+                        help="Also list strong connections seen in the last DAYS")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    # Handle --help
-    if len(sys.argv) > 1 and sys.argv[1] in ("--help", "-h"):
-        print("Usage: check_graph.py")
-        print("")
-        print("Check for recent additions and strong connections in knowledge graph.")
-        print("")
-        print("Examples:")
-        print("  check_graph.py")
-        sys.exit(0)
+    args = parse_args()
     
     try:
-        recent = get_recent_additions()
+        recent = get_recent_additions(args.hours)
         strong = get_active_connections()
+        days = args.strengthened
+        strengthened = get_strengthened_connections(days) if days is not None else []
         
         output = []
         
@@ -61,11 +73,13 @@ if __name__ == "__main__":
         
         if strong:
             output.append("\n🔗 STRONG CONNECTIONS:")
-            data = load_graph()
             for edge in strong[:5]:
-                source = data["nodes"].get(edge["source"], {}).get("name", "?")
-                target = data["nodes"].get(edge["target"], {}).get("name", "?")
-                output.append(f"  {source} --{edge['relation']}--> {target} ({edge.get('weight', 1)}x)")
+                output.append(format_edge(edge))
+        
+        if strengthened:
+            output.append("\n📈 STRENGTHENED THIS WEEK:" if days == 7 else f"\n📈 STRENGTHENED (last {days:g} days):")
+            for edge in strengthened[:5]:
+                output.append(format_edge(edge))
         
         if output:
             print("\n".join(output))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+knowledge-graph: Side store for contexts evicted from graph nodes
+
+Nodes keep only their most recent contexts. Older ones are archived here,
+deduplicated by content hash: a context shared by every entity of a
+document is stored once and linked to each node.
+"""
+import hashlib
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contexts (
+    hash TEXT PRIMARY KEY,
+    context TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS node_contexts (
+    node_id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    archived_at TEXT NOT NULL,
+    UNIQUE (node_id, hash)
+);
+"""
+
+def context_hash(context):
+    return hashlib.sha1(context.encode()).hexdigest()
+
+class ContextArchive:
+    """Buffered, hash-deduplicated archive of node contexts (SQLite)."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._conn = None
+        self._pending = []  # (node_id, context)
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def add(self, node_id, contexts):
+        """Queue contexts for archiving; written on the next flush()."""
+        self._pending.extend((node_id, c) for c in contexts if c)
+
+    def flush(self):
+        """Write queued contexts. Returns how many were queued."""
+        if not self._pending:
+            return 0
+        now = datetime.now().isoformat()
+        rows = [(node_id, context_hash(c), c) for node_id, c in self._pending]
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO contexts (hash, context) VALUES (?, ?)",
+                                  [(h, c) for _, h, c in rows])
+            self.conn.executemany("INSERT OR IGNORE INTO node_contexts (node_id, hash, archived_at) VALUES (?, ?, ?)",
+                                  [(node_id, h, now) for node_id, h, _ in rows])
+        count = len(self._pending)
+        self._pending = []
+        return count
+
+    def discard(self):
+        """Forget queued contexts (their eviction was rolled back)."""
+        self._pending = []
+
+    def get(self, node_id, limit=20):
+        """Archived contexts for a node, newest first."""
+        if not self.path.exists():
+            return []
+        rows = self.conn.execute(
+            "SELECT c.context FROM node_contexts n JOIN contexts c ON c.hash = n.hash "
+            "WHERE n.node_id = ? ORDER BY n.rowid DESC LIMIT ?",
+            (node_id, limit),
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def count(self, node_id):
+        if not self.path.exists():
+            return 0
+        return self.conn.execute("SELECT COUNT(*) FROM node_contexts WHERE node_id = ?", (node_id,)).fetchone()[0]
+
+    def size_bytes(self):
+        return sum(p.stat().st_size for p in (self.path, Path(f"{self.path}-wal")) if p.exists())
+
+    def close(self):
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
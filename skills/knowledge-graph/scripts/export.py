@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+knowledge-graph: Streaming exporters (DOT, GraphML, CSV, JSONL)
+
+Nodes and edges are pulled from the store one at a time and written as they
+arrive, so memory stays flat regardless of graph size. Filters select node
+types, a minimum edge weight, or the N-hop neighborhood around one node.
+"""
+import csv
+import json
+import sys
+from contextlib import contextmanager
+from xml.sax.saxutils import escape, quoteattr
+
+FORMATS = ("dot", "graphml", "csv", "jsonl")
+
+# Color by type
+DOT_COLORS = {
+    "person": "lightblue",
+    "technology": "lightgreen",
+    "project": "lightyellow",
+    "organization": "lightcoral",
+    "concept": "plum",
+}
+
+def neighborhood(store, node_id, hops=1):
+    """Node ids within `hops` edges of `node_id`, ignoring edge direction."""
+    seen = {node_id}
+    frontier = [node_id]
+    for _ in range(hops):
+        next_frontier = []
+        for current in frontier:
+            for edge in store.edges_for(current, "both"):
+                other = edge["target"] if edge["source"] == current else edge["source"]
+                if other not in seen:
+                    seen.add(other)
+                    next_frontier.append(other)
+        frontier = next_frontier
+    return seen
+
+def select(store, types=None, min_weight=None, around=None, hops=1):
+    """Return (nodes, edges) generator functions for the filtered graph.
+
+    Only node ids are held in memory, and only when a filter needs them to
+    decide which edges to keep.
+    """
+    types = set(types) if types else None
+    region = sorted(neighborhood(store, around, hops)) if around else None
+
+    def nodes():
+        source = (store.get_node(i) for i in region) if region is not None else store.iter_nodes()
+        for node in source:
+            if node is not None and (types is None or node["type"] in types):
+                yield node
+
+    if types is not None:
+        keep = {node["id"] for node in nodes()}
+    else:
+        keep = set(region) if region is not None else None
+
+    def edges():
+        if region is not None:
+            source = (e for i in region if i in keep for e in store.edges_for(i, "out"))
+        else:
+            source = store.iter_edges()
+        for edge in source:
+            if min_weight is not None and edge.get("weight", 1) < min_weight:
+                continue
+            if keep is not None and (edge["source"] not in keep or edge["target"] not in keep):
+                continue
+            yield edge
+
+    return nodes, edges
+
+def _dot_escape(text):
+    return str(text).replace("\\", "\\\\").replace('"', '\\"')
+
+def write_dot(f, nodes, edges):
+    f.write("digraph KnowledgeGraph {\n")
+    f.write("  rankdir=LR;\n")
+    f.write("  node [shape=box];\n")
+    for node in nodes():
+        color = DOT_COLORS.get(node["type"], "white")
+        f.write(f'  "{node["id"]}" [label="{_dot_escape(node["name"])}", fillcolor={color}, style=filled];\n')
+    for edge in edges():
+        weight = edge.get("weight", 1)
+        f.write(f'  "{edge["source"]}" -> "{edge["target"]}" '
+                f'[label="{_dot_escape(edge["relation"])}", penwidth={min(weight, 5)}];\n')
+    f.write("}\n")
+
+def write_graphml(f, nodes, edges):
+    f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    f.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+    f.write('  <key id="name" for="node" attr.name="name" attr.type="string"/>\n')
+    f.write('  <key id="type" for="node" attr.name="type" attr.type="string"/>\n')
+    f.write('  <key id="mentions" for="node" attr.name="mentions" attr.type="int"/>\n')
+    f.write('  <key id="relation" for="edge" attr.name="relation" attr.type="string"/>\n')
+    f.write('  <key id="weight" for="edge" attr.name="weight" attr.type="double"/>\n')
+    f.write('  <graph id="KnowledgeGraph" edgedefault="directed">\n')
+    for node in nodes():
+        f.write(f'    <node id={quoteattr(node["id"])}>'
+                f'<data key="name">{escape(node["name"])}</data>'
+                f'<data key="type">{escape(node["type"])}</data>'
+                f'<data key="mentions">{node.get("mentions", 0)}</data></node>\n')
+    for edge in edges():
+        f.write(f'    <edge source={quoteattr(edge["source"])} target={quoteattr(edge["target"])}>'
+                f'<data key="relation">{escape(edge["relation"])}</data>'
+                f'<data key="weight">{edge.get("weight", 1)}</data></edge>\n')
+    f.write("  </graph>\n</graphml>\n")
+
+def write_jsonl(f, nodes, edges):
+    for node in nodes():
+        f.write(json.dumps({"kind": "node", **node}) + "\n")
+    for edge in edges():
+        f.write(json.dumps({"kind": "edge", **edge}) + "\n")
+
+def write_csv(nodes_file, edges_file, nodes, edges):
+    """Gephi-style node and edge lists (Id/Label and Source/Target/Weight)."""
+    writer = csv.writer(nodes_file)
+    writer.writerow(["Id", "Label", "Type", "Mentions", "Created", "LastMentioned"])
+    for node in nodes():
+        writer.writerow([node["id"], node["name"], node["type"], node.get("mentions", 0),
+                         node.get("created_at", ""), node.get("last_mentioned", "")])
+    writer = csv.writer(edges_file)
+    writer.writerow(["Source", "Target", "Relation", "Weight", "Created", "LastSeen"])
+    for edge in edges():
+        writer.writerow([edge["source"], edge["target"], edge["relation"], edge.get("weight", 1),
+                         edge.get("created_at", ""), edge.get("last_seen", "")])
+
+@contextmanager
+def _open_output(path):
+    if path == "-":
+        yield sys.stdout
+    else:
+        with open(path, "w", newline="") as f:
+            yield f
+
+def export_graph(store, fmt, output, **filters):
+    """Stream the (filtered) graph to `output`. Returns the file(s) written.
+
+    CSV writes `<output>_nodes.csv` and `<output>_edges.csv`; `-` means stdout
+    for the single-file formats.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt} (expected one of {', '.join(FORMATS)})")
+    nodes, edges = select(store, **filters)
+    if fmt == "csv":
+        base = output[:-4] if output.endswith(".csv") else output
+        node_path, edge_path = f"{base}_nodes.csv", f"{base}_edges.csv"
+        with open(node_path, "w", newline="") as nf, open(edge_path, "w", newline="") as ef:
+            write_csv(nf, ef, nodes, edges)
+        return [node_path, edge_path]
+    writer = {"dot": write_dot, "graphml": write_graphml, "jsonl": write_jsonl}[fmt]
+    with _open_output(output) as f:
+        writer(f, nodes, edges)
+    return [output]
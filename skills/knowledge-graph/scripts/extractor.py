@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+knowledge-graph: Single-pass entity extractor
+
+All known entity names are folded into one character trie and compiled,
+together with the free-form patterns (e.g. @handles), into a single regex.
+Each document is scanned once, and because the trie branches on the next
+character, matching cost does not grow with the number of names.
+"""
+import json
+import re
+from pathlib import Path
+
+def _trie_insert(trie, word):
+    node = trie
+    for ch in word:
+        node = node.setdefault(ch, {})
+    node[""] = True
+
+def _trie_regex(node):
+    """Render a trie as a regex that prefers the longest literal."""
+    terminal = "" in node
+    branches = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    if len(branches) == 1 and not terminal:
+        return branches[0]
+    body = "(?:" + "|".join(branches) + ")"
+    return body + "?" if terminal else body
+
+def build_trie_pattern(words):
+    """Compile-ready regex source matching any of `words` (lowercase)."""
+    trie = {}
+    for word in words:
+        if word:
+            _trie_insert(trie, word)
+    return _trie_regex(trie)
+
+def load_lexicon(path):
+    """Load extra entity names from a file.
+
+    `.json` files map type -> [names]; any other file holds one
+    `type<TAB>name` pair per line (blank lines and `#` comments skipped).
+    """
+    path = Path(path)
+    lexicon = {}
+    if path.suffix == ".json":
+        with open(path) as f:
+            for type_, names in json.load(f).items():
+                lexicon.setdefault(type_, []).extend(names)
+        return lexicon
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "\t" not in line:
+                continue
+            type_, name = line.split("\t", 1)
+            lexicon.setdefault(type_.strip(), []).append(name.strip())
+    return lexicon
+
+class EntityExtractor:
+    """Match lexicon literals and regex patterns in one pass over the text."""
+
+    def __init__(self, lexicon, patterns=None):
+        self.types_by_name = {}  # lowercase name -> [types]
+        for type_, names in lexicon.items():
+            for name in names:
+                types = self.types_by_name.setdefault(name.lower(), [])
+                if type_ not in types:
+                    types.append(type_)
+
+        alternatives = []
+        if self.types_by_name:
+            alternatives.append(r"(?<!\w)(?P<lit>" + build_trie_pattern(self.types_by_name) + r")(?!\w)")
+        self.pattern_types = {}  # group name -> type
+        for type_, regexes in (patterns or {}).items():
+            for regex in regexes:
+                group = f"p{len(self.pattern_types)}"
+                self.pattern_types[group] = type_
+                alternatives.append(f"(?P<{group}>{regex})")
+        self.regex = re.compile("|".join(alternatives) or r"(?!)", re.IGNORECASE)
+
+    def __len__(self):
+        return len(self.types_by_name)
+
+    def finditer(self, text):
+        """Yield (name, type, position) for every match, in document order."""
+        types_by_name = self.types_by_name
+        for match in self.regex.finditer(text):
+            group = match.lastgroup
+            name = match.group(group)
+            position = match.start(group)
+            if group == "lit":
+                for type_ in types_by_name[name.lower()]:
+                    yield name, type_, position
+                continue
+            yield name, self.pattern_types[group], position
+            # A pattern match (e.g. "@Steve") can hide a known name inside it
+            tail = name.lstrip("@#")
+            if tail != name:
+                for type_ in types_by_name.get(tail.lower(), ()):
+                    yield tail, type_, position + len(name) - len(tail)
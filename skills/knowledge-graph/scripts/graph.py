@@ -3,35 +3,67 @@
 knowledge-graph: Extract entities, relationships, and build a persistent graph database
 """
 import json
+import os
 import sys
 import re
 from datetime import datetime
 from pathlib import Path
 from collections import defaultdict
 import hashlib
+import bisect
+import time
 
-GRAPH_FILE = Path("/home/ubuntu/clawd/memory/knowledge_graph.json")
+from analytics import analyze, group_by
+from contexts import ContextArchive
+from export import FORMATS, export_graph
+from extractor import EntityExtractor, load_lexicon
+from paths import shortest_path
+from server import DaemonError, DaemonUnavailable, GraphDaemon, request
+from storage import open_store, trim_contexts
 
-# Entity type patterns (basic extraction)
-ENTITY_PATTERNS = {
-    "person": [
-        r'@\w+',  # Usernames @name
-        r'\b(?:Steve|Rajesh)\b',  # Known people
-    ],
+GRAPH_FILE = Path(os.environ.get("KNOWLEDGE_GRAPH_FILE", "/home/ubuntu/clawd/memory/knowledge_graph.json"))
+GRAPH_DB = GRAPH_FILE.with_suffix(".db")
+CONTEXTS_DB = GRAPH_FILE.parent / "knowledge_graph_contexts.db"
+ANALYTICS_CACHE = GRAPH_FILE.parent / "knowledge_graph_analytics.json"
+STORAGE_BACKEND = os.environ.get("KNOWLEDGE_GRAPH_BACKEND", "sqlite")
+SOCKET_FILE = Path(os.environ.get("KNOWLEDGE_GRAPH_SOCKET", GRAPH_FILE.parent / "knowledge_graph.sock"))
+WRITE_BEHIND_LOG = GRAPH_FILE.parent / "knowledge_graph_pending.jsonl"
+
+LEXICON_FILE = Path(os.environ.get("KNOWLEDGE_GRAPH_LEXICON", GRAPH_FILE.parent / "knowledge_graph_lexicon.json"))
+
+# Known entity names (matched case-insensitively on word boundaries)
+ENTITY_LEXICON = {
+    "person": ["Steve", "Rajesh"],
     "technology": [
-        r'\b(?:Python|JavaScript|TypeScript|React|Node\.js|Nodejs|Docker|Kubernetes|AWS|GCP|Azure|Linux|Ubuntu|PostgreSQL|MongoDB|Redis|GraphQL|REST|API|CLI|npm|pip|git|GitHub|GitLab|Terraform|Ansible|JSON|SQLite|HTML|CSS|HTTP|HTTPS|SSL|SSH)\b',
-    ],
-    "project": [
-        r'\b(?:TaskMaster|KnowledgeGraph|Humanizer|SelfImproving|SysadminToolbox|Clawdbot)\b',
+        "Python", "JavaScript", "TypeScript", "React", "Node.js", "Nodejs", "Docker", "Kubernetes",
+        "AWS", "GCP", "Azure", "Linux", "Ubuntu", "PostgreSQL", "MongoDB", "Redis", "GraphQL", "REST",
+        "API", "CLI", "npm", "pip", "git", "GitHub", "GitLab", "Terraform", "Ansible", "JSON", "SQLite",
+        "HTML", "CSS", "HTTP", "HTTPS", "SSL", "SSH",
     ],
+    "project": ["TaskMaster", "KnowledgeGraph", "Humanizer", "SelfImproving", "SysadminToolbox", "Clawdbot"],
     "organization": [
-        r'\b(?:Google|Amazon|Microsoft|Apple|Meta|Netflix|Uber|Airbnb|Stripe|Shopify|Vercel|OpenAI|Anthropic)\b',
+        "Google", "Amazon", "Microsoft", "Apple", "Meta", "Netflix", "Uber", "Airbnb", "Stripe",
+        "Shopify", "Vercel", "OpenAI", "Anthropic",
+    ],
+    "concept": [
+        "AI", "ML", "DevOps", "SRE", "Backend", "Frontend", "SaaS", "PaaS", "IaaS", "Serverless",
+        "Microservices", "Monolith", "Graph", "Database", "Knowledge Graph",
+    ],
+}
+
+# Entity type patterns for names that are not fixed literals
+ENTITY_PATTERNS = {
+    "person": [
+        r'@\w+',  # Usernames @name
     ],
     "concept": [
-        r'\b(?:AI|ML|DevOps|SRE|Backend|Frontend|Full.?stack|SaaS|PaaS|IaaS|Serverless|Microservices|Monolith|Graph|Database|Knowledge Graph)\b',
+        r'\bFull.?stack\b',
     ],
 }
 
+# Max distance (chars) between two entity positions for them to be related
+RELATIONSHIP_WINDOW = 200
+
 # Relationship indicators
 RELATIONSHIP_INDICATORS = {
     "created_by": ["created by", "built by", "made by", "authored by", "developed by"],
@@ -43,22 +75,23 @@ RELATIONSHIP_INDICATORS = {
     "maintains": ["maintains", "manages", "owns", "supports"],
 }
 
+_store = None
+
+def get_store():
+    """Open the graph store once per process."""
+    global _store
+    if _store is None:
+        _store = open_store(STORAGE_BACKEND, GRAPH_FILE, GRAPH_DB)
+        _store.archive = ContextArchive(CONTEXTS_DB)
+    return _store
+
 def load_graph():
     """Load the knowledge graph."""
-    if GRAPH_FILE.exists():
-        with open(GRAPH_FILE) as f:
-            return json.load(f)
-    return {
-        "nodes": {},  # id -> {type, name, properties, created_at, mentions}
-        "edges": [],  # {source, target, relation, context, created_at}
-        "next_id": 1,
-    }
+    return get_store().load()
 
 def save_graph(data):
     """Save the knowledge graph."""
-    GRAPH_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(GRAPH_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    get_store().save(data)
 
 def generate_id(name, type_):
     """Generate a stable ID for an entity."""
@@ -66,130 +99,173 @@ def generate_id(name, type_):
 
 def add_node(name, type_, properties=None, context=""):
     """Add a node to the graph."""
-    data = load_graph()
     node_id = generate_id(name, type_)
-    
-    if node_id in data["nodes"]:
-        # Update existing node
-        data["nodes"][node_id]["mentions"] = data["nodes"][node_id].get("mentions", 0) + 1
-        data["nodes"][node_id]["last_mentioned"] = datetime.now().isoformat()
-        if context and context not in data["nodes"][node_id].get("contexts", []):
-            data["nodes"][node_id].setdefault("contexts", []).append(context[:200])
-    else:
-        # Create new node
-        data["nodes"][node_id] = {
-            "id": node_id,
-            "name": name,
-            "type": type_,
-            "properties": properties or {},
-            "created_at": datetime.now().isoformat(),
-            "mentions": 1,
-            "last_mentioned": datetime.now().isoformat(),
-            "contexts": [context[:200]] if context else [],
-        }
-    
-    save_graph(data)
+    get_store().upsert_node(node_id, name, type_, properties, contexts=[context])
     return node_id
 
 def add_edge(source_id, target_id, relation, context=""):
     """Add a relationship between two nodes."""
-    data = load_graph()
-    
-    # Check if edge already exists
-    for edge in data["edges"]:
-        if edge["source"] == source_id and edge["target"] == target_id and edge["relation"] == relation:
-            edge["weight"] = edge.get("weight", 1) + 1
-            edge["last_seen"] = datetime.now().isoformat()
-            save_graph(data)
-            return edge
-    
-    # Create new edge
-    edge = {
-        "source": source_id,
-        "target": target_id,
-        "relation": relation,
-        "context": context[:300],
-        "created_at": datetime.now().isoformat(),
-        "weight": 1,
-    }
-    data["edges"].append(edge)
-    save_graph(data)
-    return edge
+    return get_store().upsert_edge(source_id, target_id, relation, context)
+
+_extractor = None
+
+def get_extractor():
+    """Compile the entity extractor once per process (built-in + file lexicon)."""
+    global _extractor
+    if _extractor is None:
+        lexicon = {type_: list(names) for type_, names in ENTITY_LEXICON.items()}
+        if LEXICON_FILE.exists():
+            for type_, names in load_lexicon(LEXICON_FILE).items():
+                lexicon.setdefault(type_, []).extend(names)
+        _extractor = EntityExtractor(lexicon, ENTITY_PATTERNS)
+    return _extractor
 
 def extract_entities(text):
-    """Extract entities from text using patterns."""
-    entities = []
-    
-    for type_, patterns in ENTITY_PATTERNS.items():
-        for pattern in patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                name = match.group(0)
-                # Skip common false positives
-                if len(name) < 2 or name.lower() in ["the", "this", "that", "with", "from"]:
-                    continue
-                entities.append({
-                    "name": name,
-                    "type": type_,
-                    "position": match.start(),
-                })
-    
-    # Deduplicate
+    """Extract entities from text in a single pass, in document order."""
     seen = set()
     unique = []
-    for e in entities:
-        key = (e["name"].lower(), e["type"])
+    
+    for name, type_, position in get_extractor().finditer(text):
+        # Skip common false positives
+        if len(name) < 2 or name.lower() in ["the", "this", "that", "with", "from"]:
+            continue
+        # Deduplicate
+        key = (name.lower(), type_)
         if key not in seen:
             seen.add(key)
-            unique.append(e)
+            unique.append({
+                "name": name,
+                "type": type_,
+                "position": position,
+            })
     
     return unique
 
+_indicator_regex = None
+_indicator_relations = {}
+
+def get_indicator_regex():
+    """Compile every relationship indicator into one overlapping matcher."""
+    global _indicator_regex
+    if _indicator_regex is None:
+        for rel_type, indicators in RELATIONSHIP_INDICATORS.items():
+            for indicator in indicators:
+                _indicator_relations.setdefault(indicator, []).append(rel_type)
+        alternation = "|".join(re.escape(i) for i in sorted(_indicator_relations, key=len, reverse=True))
+        # Zero-width lookahead so overlapping indicators are all reported
+        _indicator_regex = re.compile(f"(?=({alternation}))")
+    return _indicator_regex
+
 def extract_relationships(text, entities):
-    """Extract relationships between entities."""
-    relationships = []
+    """Extract relationships between entities.
+    
+    Two entities are related when an indicator phrase lies between them and
+    they are at most RELATIONSHIP_WINDOW characters apart. Indicators are
+    located in one pass and only entities around each hit are paired.
+    
+    Each edge points from the earlier entity in `entities` to the later one.
+    extract_entities() lists them in document order, so the edge reads like
+    the text: "Python created by Steve" gives Python -created_by-> Steve.
+    (Before the single-pass extractor, entities were listed by type, and the
+    edge direction depended on which type came first.)
+    """
     text_lower = text.lower()
+    ordered = sorted(range(len(entities)), key=lambda i: entities[i]["position"])
+    positions = [entities[i]["position"] for i in ordered]
+    
+    found = {}  # (i, j) -> set of relation types
+    for match in get_indicator_regex().finditer(text_lower):
+        hit_start = match.start()
+        hit_end = hit_start + len(match.group(1))
+        rel_types = _indicator_relations[match.group(1)]
+        # Left entities start at or before the hit, right ones at or after its end
+        left_lo = bisect.bisect_left(positions, hit_end - RELATIONSHIP_WINDOW)
+        left_hi = bisect.bisect_right(positions, hit_start)
+        right_lo = bisect.bisect_left(positions, hit_end)
+        for li in range(left_lo, left_hi):
+            right_hi = bisect.bisect_right(positions, positions[li] + RELATIONSHIP_WINDOW, lo=right_lo)
+            for ri in range(right_lo, right_hi):
+                a, b = ordered[li], ordered[ri]
+                found.setdefault((min(a, b), max(a, b)), set()).update(rel_types)
     
-    for i, ent1 in enumerate(entities):
-        for ent2 in entities[i+1:]:
-            # Check proximity (within 100 chars)
-            if abs(ent1["position"] - ent2["position"]) > 200:
-                continue
-            
-            # Check for relationship indicators between them
-            start = min(ent1["position"], ent2["position"])
-            end = max(ent1["position"], ent2["position"])
-            between = text_lower[start:end]
-            
-            for rel_type, indicators in RELATIONSHIP_INDICATORS.items():
-                for indicator in indicators:
-                    if indicator in between:
-                        relationships.append({
-                            "source": ent1,
-                            "target": ent2,
-                            "relation": rel_type,
-                        })
-                        break
+    relationships = []
+    for (i, j) in sorted(found):
+        for rel_type in RELATIONSHIP_INDICATORS:
+            if rel_type in found[(i, j)]:
+                relationships.append({
+                    "source": entities[i],
+                    "target": entities[j],
+                    "relation": rel_type,
+                })
     
     return relationships
 
-def process_text(text, context=""):
-    """Process text to extract entities and relationships."""
+def new_batch():
+    """Start an in-memory batch of pending graph changes."""
+    return {
+        "nodes": {},  # id -> {name, type, mentions, contexts}
+        "edges": {},  # (source, target, relation) -> {context, weight}
+        "documents": 0,
+        "entities": 0,
+        "relationships": 0,
+    }
+
+def collect_text(batch, text, context=""):
+    """Extract entities and relationships from text into a batch."""
     entities = extract_entities(text)
     relationships = extract_relationships(text, entities)
     
-    # Add nodes
     node_ids = {}
     for ent in entities:
-        node_id = add_node(ent["name"], ent["type"], context=context)
+        node_id = generate_id(ent["name"], ent["type"])
         node_ids[ent["name"]] = node_id
+        pending = batch["nodes"].get(node_id)
+        if pending is None:
+            batch["nodes"][node_id] = {
+                "name": ent["name"],
+                "type": ent["type"],
+                "mentions": 1,
+                "contexts": [context] if context else [],
+            }
+        else:
+            pending["mentions"] += 1
+            if context and context not in pending["contexts"]:
+                pending["contexts"].append(context)
     
-    # Add edges
     for rel in relationships:
         source_name = rel["source"]["name"]
         target_name = rel["target"]["name"]
         if source_name in node_ids and target_name in node_ids:
-            add_edge(node_ids[source_name], node_ids[target_name], rel["relation"], context)
+            key = (node_ids[source_name], node_ids[target_name], rel["relation"])
+            pending = batch["edges"].get(key)
+            if pending is None:
+                batch["edges"][key] = {"context": context, "weight": 1}
+            else:
+                pending["weight"] += 1
+    
+    batch["documents"] += 1
+    batch["entities"] += len(entities)
+    batch["relationships"] += len(relationships)
+    return entities, relationships
+
+def commit_batch(batch, meta=None):
+    """Write a batch to the graph in a single transaction (with any `meta` keys set in it)."""
+    store = get_store()
+    now = datetime.now().isoformat()
+    with store.transaction():
+        for key, value in (meta or {}).items():
+            store.set_meta(key, value)
+        for node_id, pending in batch["nodes"].items():
+            store.upsert_node(node_id, pending["name"], pending["type"],
+                              contexts=pending["contexts"], mentions=pending["mentions"], now=now)
+        for (source, target, relation), pending in batch["edges"].items():
+            store.upsert_edge(source, target, relation, pending["context"], weight=pending["weight"], now=now)
+
+def process_text(text, context=""):
+    """Process text to extract entities and relationships."""
+    batch = new_batch()
+    entities, relationships = collect_text(batch, text, context)
+    commit_batch(batch)
     
     return {
         "entities_added": len(entities),
@@ -197,52 +273,182 @@ def process_text(text, context=""):
         "entities": [e["name"] for e in entities],
     }
 
+def ingest_documents(docs):
+    """Ingest many documents with one graph load and one commit.
+    
+    `docs` yields strings or {"text": ..., "context": ...} dicts.
+    """
+    start = time.perf_counter()
+    batch = new_batch()
+    for doc in docs:
+        if isinstance(doc, str):
+            collect_text(batch, doc)
+        else:
+            collect_text(batch, doc.get("text", ""), doc.get("context", ""))
+    extracted = time.perf_counter()
+    commit_batch(batch)
+    elapsed = max(time.perf_counter() - start, 1e-9)
+    
+    return {
+        "documents": batch["documents"],
+        "entities": batch["entities"],
+        "relationships": batch["relationships"],
+        "nodes_touched": len(batch["nodes"]),
+        "edges_touched": len(batch["edges"]),
+        "extract_seconds": extracted - start,
+        "commit_seconds": elapsed - (extracted - start),
+        "seconds": elapsed,
+        "docs_per_sec": batch["documents"] / elapsed,
+        "entities_per_sec": batch["entities"] / elapsed,
+    }
+
+def read_documents(paths, jsonl=False):
+    """Yield documents from files (or stdin when `paths` is empty), opening one file at a time."""
+    if not paths:
+        yield from read_source("stdin", sys.stdin, jsonl)
+    for path in paths:
+        with open(path) as f:
+            yield from read_source(path, f, jsonl)
+
+def read_source(name, f, jsonl=False):
+    """Documents in one open file: the whole file, each stdin line, or each JSONL record.
+
+    JSONL lines that are not JSON, or not a string or {"text": ...} object, are skipped with a warning.
+    """
+    if not jsonl:
+        if f is sys.stdin:
+            for line in f:
+                if line.strip():
+                    yield {"text": line, "context": ""}
+        else:
+            yield {"text": f.read(), "context": Path(name).name}
+        return
+    for line_no, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            doc = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"Skipping {name}:{line_no}: {e}", file=sys.stderr)
+            continue
+        if isinstance(doc, dict):
+            valid = all(isinstance(doc.get(key, ""), str) for key in ("text", "context"))
+        else:
+            valid = isinstance(doc, str)
+        if not valid:
+            print(f"Skipping {name}:{line_no}: expected a string or an object with string text/context",
+                  file=sys.stderr)
+            continue
+        yield doc
+
 def get_node(node_id):
     """Get a node by ID."""
-    data = load_graph()
-    return data["nodes"].get(node_id)
+    return get_store().get_node(node_id)
 
 def find_node(name):
     """Find a node by name (case insensitive)."""
-    data = load_graph()
-    name_lower = name.lower()
-    for node_id, node in data["nodes"].items():
-        if node["name"].lower() == name_lower:
-            return node
-    return None
+    matches = get_store().find_by_name(name)
+    return matches[0] if matches else None
+
+def search_nodes(query, limit=10, min_score=0.3):
+    """Find candidate nodes by exact name, then name prefix, then trigram similarity."""
+    store = get_store()
+    seen = set()
+    results = []
+    
+    def take(nodes, match):
+        for node in nodes:
+            if node["id"] not in seen and len(results) < limit:
+                seen.add(node["id"])
+                results.append({"node": node, "match": match})
+    
+    take(store.find_by_name(query), "exact")
+    take(store.find_by_prefix(query, limit), "prefix")
+    if len(results) < limit:
+        take((node for _, node in store.find_similar(query, limit, min_score)), "fuzzy")
+    return results
 
 def get_relationships(node_id, direction="both"):
     """Get relationships for a node."""
-    data = load_graph()
+    store = get_store()
     results = []
     
-    for edge in data["edges"]:
-        if direction in ["out", "both"] and edge["source"] == node_id:
-            target = data["nodes"].get(edge["target"])
+    if direction in ["out", "both"]:
+        for edge in store.edges_for(node_id, "out"):
             results.append({
                 "direction": "->",
                 "relation": edge["relation"],
-                "node": target,
+                "node": store.get_node(edge["target"]),
                 "weight": edge.get("weight", 1),
             })
-        if direction in ["in", "both"] and edge["target"] == node_id:
-            source = data["nodes"].get(edge["source"])
+    if direction in ["in", "both"]:
+        for edge in store.edges_for(node_id, "in"):
             results.append({
                 "direction": "<-",
                 "relation": edge["relation"],
-                "node": source,
+                "node": store.get_node(edge["source"]),
                 "weight": edge.get("weight", 1),
             })
     
     return results
 
+def describe_node(name):
+    """A node with its relationships, or name suggestions when it does not exist."""
+    node = find_node(name)
+    if not node:
+        return {"node": None, "relationships": [],
+                "candidates": [m["node"]["name"] for m in search_nodes(name, limit=5)]}
+    return {"node": node, "relationships": get_relationships(node["id"]), "candidates": []}
+
+def related_nodes(name, direction="both"):
+    """Relationships of the node called `name` (None when it does not exist)."""
+    node = find_node(name)
+    return get_relationships(node["id"], direction) if node else None
+
+def path_between(source, target, method="bidirectional", max_depth=None, relations=None, directed=True):
+    """Shortest path between two nodes given by name, with the nodes along it."""
+    source_node, target_node = find_node(source), find_node(target)
+    if not source_node or not target_node:
+        return None
+    result = find_path(source_node["id"], target_node["id"], method=method, max_depth=max_depth,
+                       relations=relations, directed=directed)
+    return {
+        "source": source_node,
+        "target": target_node,
+        "path": result,
+        "nodes": [get_node(node_id) for node_id in result["nodes"]] if result else [],
+    }
+
+def find_path(source_id, target_id, method="bidirectional", max_depth=None, relations=None, directed=True):
+    """Find a shortest path between two nodes.
+    
+    method: bfs, bidirectional (unweighted) or weighted (Dijkstra over 1/weight).
+    relations: optional iterable restricting which edge relations may be followed.
+    directed: follow edges source -> target only (False walks them both ways).
+    """
+    store = get_store()
+    allowed = set(relations) if relations else None
+    
+    def forward(node_id):
+        for edge in store.edges_for(node_id, "out" if directed else "both"):
+            if allowed is None or edge["relation"] in allowed:
+                yield (edge["target"] if edge["source"] == node_id else edge["source"]), edge
+    
+    def backward(node_id):
+        for edge in store.edges_for(node_id, "in" if directed else "both"):
+            if allowed is None or edge["relation"] in allowed:
+                yield (edge["source"] if edge["target"] == node_id else edge["target"]), edge
+    
+    return shortest_path(forward, backward, source_id, target_id, method, max_depth)
+
 def query_graph(query_type, **kwargs):
     """Query the graph."""
-    data = load_graph()
+    store = get_store()
     
     if query_type == "nodes_by_type":
         type_ = kwargs.get("type")
-        return [n for n in data["nodes"].values() if n["type"] == type_]
+        return store.nodes_by_type(type_)
     
     elif query_type == "connected":
         node_id = kwargs.get("node_id")
@@ -251,94 +457,175 @@ def query_graph(query_type, **kwargs):
     elif query_type == "path":
         source = kwargs.get("source")
         target = kwargs.get("target")
-        # Simple BFS for path finding
-        visited = set()
-        queue = [(source, [source])]
-        while queue:
-            current, path = queue.pop(0)
-            if current == target:
-                return path
-            if current in visited:
-                continue
-            visited.add(current)
-            for edge in data["edges"]:
-                if edge["source"] == current and edge["target"] not in visited:
-                    queue.append((edge["target"], path + [edge["target"]]))
-        return None
+        result = find_path(
+            source, target,
+            method=kwargs.get("method", "bidirectional"),
+            max_depth=kwargs.get("max_depth"),
+            relations=kwargs.get("relations"),
+            directed=kwargs.get("directed", True),
+        )
+        return result["nodes"] if result else None
     
     elif query_type == "most_mentioned":
         limit = kwargs.get("limit", 10)
-        nodes = sorted(data["nodes"].values(), key=lambda x: x.get("mentions", 0), reverse=True)
+        nodes = sorted(store.iter_nodes(), key=lambda x: x.get("mentions", 0), reverse=True)
         return nodes[:limit]
     
     return []
 
+def compact_graph(max_contexts=None):
+    """Cap node contexts, archive the overflow, and shrink the graph file."""
+    store = get_store()
+    limit = store.max_contexts if max_contexts is None else max_contexts
+    before = store.size_bytes()
+    archive_before = store.archive.size_bytes()
+    
+    oversized = [n["id"] for n in store.iter_nodes() if len(n.get("contexts", [])) > limit]
+    archived = 0
+    with store.transaction():
+        for node_id in oversized:
+            node = store.get_node(node_id)
+            evicted = []
+            trim_contexts(node, limit, evicted)
+            store.archive.add(node_id, evicted)
+            archived += len(evicted)
+            store.put_node(node)
+    store.vacuum()
+    
+    after = store.size_bytes()
+    return {
+        "nodes_compacted": len(oversized),
+        "contexts_archived": archived,
+        "bytes_before": before,
+        "bytes_after": after,
+        "bytes_reclaimed": before - after,
+        "archive_bytes_added": store.archive.size_bytes() - archive_before,
+    }
+
+def get_contexts(node_id, limit=20):
+    """Recent contexts for a node, followed by archived ones (newest first)."""
+    node = get_node(node_id) or {}
+    recent = list(reversed(node.get("contexts", [])))
+    archived = get_store().archive.get(node_id, limit)
+    return (recent + [c for c in archived if c not in recent])[:limit]
+
+def graph_analytics():
+    """PageRank, components, degree and communities (cached until the graph changes)."""
+    return analyze(get_store(), ANALYTICS_CACHE)
+
 def format_graph_stats():
     """Get statistics about the graph."""
-    data = load_graph()
+    store = get_store()
     stats = {
-        "total_nodes": len(data["nodes"]),
-        "total_edges": len(data["edges"]),
+        "total_nodes": store.count_nodes(),
+        "total_edges": store.count_edges(),
         "by_type": defaultdict(int),
     }
     
-    for node in data["nodes"].values():
+    for node in store.iter_nodes():
         stats["by_type"][node["type"]] += 1
     
     return stats
 
-def export_dot(output_file="graph.dot"):
+def export_dot(output_file="graph.dot", **filters):
     """Export graph to Graphviz DOT format."""
-    data = load_graph()
-    lines = ["digraph KnowledgeGraph {"]
-    lines.append('  rankdir=LR;')
-    lines.append('  node [shape=box];')
-    
-    # Color by type
-    colors = {
-        "person": "lightblue",
-        "technology": "lightgreen",
-        "project": "lightyellow",
-        "organization": "lightcoral",
-        "concept": "plum",
-    }
-    
-    for node_id, node in data["nodes"].items():
-        color = colors.get(node["type"], "white")
-        label = node["name"].replace('"', '\\"')
-        lines.append(f'  "{node_id}" [label="{label}", fillcolor={color}, style=filled];')
-    
-    for edge in data["edges"]:
-        label = edge["relation"]
-        weight = edge.get("weight", 1)
-        lines.append(f'  "{edge["source"]}" -> "{edge["target"]}" [label="{label}", penwidth={min(weight, 5)}];')
-    
-    lines.append("}")
-    
-    with open(output_file, 'w') as f:
-        f.write("\n".join(lines))
+    return export_graph(get_store(), "dot", output_file, **filters)[0]
+
+def call_daemon(op, local, **params):
+    """Answer through a running `graph.py serve` if there is one, else call `local` directly.
+
+    Exits with a message if the daemon takes the request but cannot answer it.
+    """
+    try:
+        return request(SOCKET_FILE, op, **params)
+    except DaemonUnavailable:
+        return local(**params)
+    except DaemonError as e:
+        print(f"Daemon error: {e}")
+        sys.exit(1)
+
+def serve(flush_interval=None):
+    """Run the graph daemon on SOCKET_FILE until interrupted."""
+    pending = {"batch": new_batch()}
+    
+    def queue_text(text, context=""):
+        entities, relationships = collect_text(pending["batch"], text, context)
+        return {
+            "entities_added": len(entities),
+            "relationships_added": len(relationships),
+            "entities": [e["name"] for e in entities],
+        }
     
-    return output_file
+    def flush(last_seq):
+        # The log position is committed with the writes, so a replay after a crash skips them.
+        # The batch is only dropped once committed; a failed commit is retried with it intact.
+        commit_batch(pending["batch"], meta={"write_behind_seq": last_seq})
+        pending["batch"] = new_batch()
+    
+    def applied_seq():
+        return int(get_store().get_meta("write_behind_seq", 0))
+    
+    def fresh(handler):
+        def read(**params):
+            get_store().refresh()
+            return handler(**params)
+        return read
+    
+    handlers = {
+        "find": search_nodes,
+        "show": describe_node,
+        "related": related_nodes,
+        "path": path_between,
+    }
+    options = {"flush_interval": flush_interval} if flush_interval is not None else {}
+    daemon = GraphDaemon(SOCKET_FILE, WRITE_BEHIND_LOG,
+                         handlers={op: fresh(h) for op, h in handlers.items()},
+                         writers={"process": queue_text}, flush=flush, applied_seq=applied_seq, **options)
+    get_store().load()
+    daemon.serve_forever()
 
 def main():
     if len(sys.argv) < 2 or sys.argv[1] in ("--help", "-h"):
         print("Usage: graph.py <command> [args]")
-        print("Commands: process, show, find, related, stats, export")
+        print("Commands: process, ingest, show, find, path, contexts, related, stats, rank, communities, "
+              "export, compact, migrate, serve, snapshot, restore")
         print("\nExamples:")
         print("  graph.py process 'Extract entities from this text'")
+        print("  graph.py ingest --stdin --jsonl < docs.jsonl")
         print("  graph.py show Python")
+        print("  graph.py path Steve AWS --weighted --max-depth 4 --relation uses")
         print("  graph.py stats")
+        print("  graph.py export --format graphml --around Python --hops 2 --min-weight 2")
+        print("  graph.py serve &   # later process/find/show/related/path calls go through the daemon")
+        print("  graph.py restore 2026-10-01T09:00 --output graph_before.json")
         sys.exit(0 if sys.argv[1] in ("--help", "-h") else 1)
     
     cmd = sys.argv[1]
     
     if cmd == "process":
         text = sys.argv[2] if len(sys.argv) > 2 else sys.stdin.read()
-        result = process_text(text)
+        result = call_daemon("process", process_text, text=text)
         print(f"Extracted {result['entities_added']} entities, {result['relationships_added']} relationships")
         if result['entities']:
             print(f"Entities: {', '.join(result['entities'][:10])}")
     
+    elif cmd == "ingest":
+        args = sys.argv[2:]
+        jsonl = "--jsonl" in args
+        paths = [a for a in args if not a.startswith("--")]
+        if "--stdin" in args:
+            paths = []
+        elif not paths:
+            print("Usage: ingest [--stdin] [--jsonl] [files...]")
+            print('  JSONL records: {"text": "...", "context": "..."}')
+            sys.exit(1)
+        result = ingest_documents(read_documents(paths, jsonl=jsonl))
+        print(f"Ingested {result['documents']} documents: {result['entities']} entities, "
+              f"{result['relationships']} relationships")
+        print(f"Touched {result['nodes_touched']} nodes, {result['edges_touched']} edges "
+              f"in {result['seconds']:.2f}s (commit {result['commit_seconds']:.2f}s)")
+        print(f"Throughput: {result['docs_per_sec']:.1f} docs/sec, {result['entities_per_sec']:.1f} entities/sec")
+    
     elif cmd == "add":
         if len(sys.argv) < 5:
             print("Usage: add <name> <type> [context]")
@@ -362,28 +649,93 @@ def main():
         if len(sys.argv) < 3:
             print("Usage: show <name>")
             sys.exit(1)
-        node = find_node(sys.argv[2])
+        info = call_daemon("show", describe_node, name=sys.argv[2])
+        node = info["node"]
         if node:
             print(f"{node['name']} ({node['type']})")
             print(f"  Mentions: {node.get('mentions', 0)}")
             print(f"  Created: {node['created_at'][:10]}")
-            rels = get_relationships(node["id"])
+            rels = info["relationships"]
             if rels:
                 print("  Relationships:")
                 for r in rels:
                     print(f"    {r['direction']} {r['node']['name']} ({r['relation']})")
         else:
             print("Node not found")
+            if info["candidates"]:
+                print(f"Did you mean: {', '.join(info['candidates'])}")
+    
+    elif cmd == "related":
+        if len(sys.argv) < 3 or (len(sys.argv) > 3 and sys.argv[3] not in ("in", "out", "both")):
+            print("Usage: related <name> [in|out|both]")
+            sys.exit(1)
+        direction = sys.argv[3] if len(sys.argv) > 3 else "both"
+        rels = call_daemon("related", related_nodes, name=sys.argv[2], direction=direction)
+        if rels is None:
+            print("Node not found")
+            sys.exit(1)
+        for r in sorted(rels, key=lambda r: -r["weight"]):
+            name = r["node"]["name"] if r["node"] else "?"
+            print(f"  {r['direction']} {name} ({r['relation']}, {r['weight']}x)")
     
     elif cmd == "find":
         if len(sys.argv) < 3:
             print("Usage: find <name>")
             sys.exit(1)
-        node = find_node(sys.argv[2])
-        if node:
+        matches = call_daemon("find", search_nodes, query=sys.argv[2])
+        if matches and matches[0]["match"] == "exact":
+            node = matches.pop(0)["node"]
             print(f"Found: {node['name']} ({node['type']}) - ID: {node['id']}")
-        else:
+        elif not matches:
             print("Not found")
+        if matches:
+            print("Candidates:")
+            for m in matches:
+                node = m["node"]
+                print(f"  {node['name']} ({node['type']}, {m['match']}) - ID: {node['id']}")
+    
+    elif cmd == "path":
+        args = sys.argv[2:]
+        names, relations = [], []
+        method, max_depth, directed = "bidirectional", None, True
+        i = 0
+        while i < len(args):
+            arg = args[i]
+            if arg == "--weighted":
+                method = "weighted"
+            elif arg == "--bfs":
+                method = "bfs"
+            elif arg == "--undirected":
+                directed = False
+            elif arg in ("--max-depth", "--relation") and i + 1 < len(args):
+                i += 1
+                if arg == "--max-depth":
+                    max_depth = int(args[i])
+                else:
+                    relations.append(args[i])
+            else:
+                names.append(arg)
+            i += 1
+        if len(names) != 2:
+            print("Usage: path <source_name> <target_name> [--weighted|--bfs] [--max-depth N] "
+                  "[--relation R ...] [--undirected]")
+            sys.exit(1)
+        found = call_daemon("path", path_between, source=names[0], target=names[1], method=method,
+                            max_depth=max_depth, relations=relations, directed=directed)
+        if not found:
+            print("Node not found")
+            sys.exit(1)
+        source, target, result = found["source"], found["target"], found["path"]
+        if not result:
+            print(f"No path from {source['name']} to {target['name']}")
+        else:
+            parts = [source["name"]]
+            for node_id, node, edge in zip(result["nodes"][1:], found["nodes"][1:], result["edges"]):
+                arrow = f"--{edge['relation']}-->" if edge["target"] == node_id else f"<--{edge['relation']}--"
+                parts.append(f"{arrow} {node['name'] if node else node_id}")
+            print(" ".join(parts))
+            cost = f", cost {result['cost']:.3f}" if method == "weighted" else ""
+            print(f"  {len(result['edges'])} hops{cost}")
     
     elif cmd == "type":
         if len(sys.argv) < 3:
@@ -402,9 +754,141 @@ def main():
             print(f"  {t}: {count}")
     
     elif cmd == "export":
-        filename = export_dot()
-        print(f"Exported to {filename}")
-        print("Convert with: dot -Tpng graph.dot -o graph.png")
+        args = sys.argv[2:]
+        fmt, output, filters, types = "dot", None, {}, []
+        i = 0
+        while i < len(args):
+            arg = args[i]
+            value = args[i + 1] if i + 1 < len(args) else None
+            if arg == "--format" and value:
+                fmt = value
+            elif arg == "--output" and value:
+                output = value
+            elif arg == "--type" and value:
+                types.append(value)
+            elif arg == "--min-weight" and value:
+                filters["min_weight"] = int(value)
+            elif arg == "--around" and value:
+                node = find_node(value)
+                if not node:
+                    print(f"Node not found: {value}")
+                    sys.exit(1)
+                filters["around"] = node["id"]
+            elif arg == "--hops" and value:
+                filters["hops"] = int(value)
+            else:
+                print("Usage: export [--format dot|graphml|csv|jsonl] [--output FILE|-] [--type T ...] "
+                      "[--min-weight N] [--around NAME [--hops N]]")
+                sys.exit(1)
+            i += 2
+        if fmt not in FORMATS:
+            print(f"Unknown format: {fmt} (use {', '.join(FORMATS)})")
+            sys.exit(1)
+        if types:
+            filters["types"] = types
+        output = output or {"dot": "graph.dot", "graphml": "graph.graphml", "csv": "graph", "jsonl": "graph.jsonl"}[fmt]
+        files = export_graph(get_store(), fmt, output, **filters)
+        if output != "-":
+            print(f"Exported to {', '.join(files)}")
+            if fmt == "dot":
+                print(f"Convert with: dot -Tpng {output} -o graph.png")
+    
+    elif cmd == "rank":
+        limit = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+        results = graph_analytics()
+        store = get_store()
+        top = sorted(results["pagerank"].items(), key=lambda x: -x[1])[:limit]
+        print(f"PageRank over {results['nodes']} nodes, {results['edges']} edges"
+              f"{' (cached)' if results['cached'] else ''}:")
+        for node_id, score in top:
+            node = store.get_node(node_id) or {"name": node_id, "type": "?"}
+            in_deg, out_deg, centrality = results["degree"][node_id]
+            print(f"  {score:.4f}  {node['name']} ({node['type']})  in {in_deg} / out {out_deg}, "
+                  f"centrality {centrality:.3f}")
+    
+    elif cmd == "communities":
+        limit = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+        results = graph_analytics()
+        store = get_store()
+        components = group_by(results["component"])
+        communities = group_by(results["community"])
+        print(f"{len(components)} connected components, {len(communities)} communities"
+              f"{' (cached)' if results['cached'] else ''}")
+        for i, members in enumerate(communities[:limit], 1):
+            members.sort(key=lambda m: -results["pagerank"].get(m, 0))
+            names = [(store.get_node(m) or {"name": m})["name"] for m in members[:8]]
+            more = f" +{len(members) - 8} more" if len(members) > 8 else ""
+            print(f"  Community {i} ({len(members)} nodes): {', '.join(names)}{more}")
+    
+    elif cmd == "compact":
+        limit = int(sys.argv[2]) if len(sys.argv) > 2 else None
+        result = compact_graph(limit)
+        print(f"Compacted {result['nodes_compacted']} nodes, archived {result['contexts_archived']} contexts")
+        print(f"Graph: {result['bytes_before']:,} -> {result['bytes_after']:,} bytes "
+              f"({result['bytes_reclaimed']:,} reclaimed)")
+        print(f"Archive grew by {result['archive_bytes_added']:,} bytes ({CONTEXTS_DB.name})")
+    
+    elif cmd == "contexts":
+        if len(sys.argv) < 3:
+            print("Usage: contexts <name> [limit]")
+            sys.exit(1)
+        node = find_node(sys.argv[2])
+        if not node:
+            print("Node not found")
+            sys.exit(1)
+        limit = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+        for context in get_contexts(node["id"], limit):
+            print(f"  - {context}")
+    
+    elif cmd == "migrate":
+        store = get_store()
+        if store.backend != "sqlite":
+            print("Migration targets the sqlite backend (KNOWLEDGE_GRAPH_BACKEND=sqlite)")
+            sys.exit(1)
+        source = Path(sys.argv[2]) if len(sys.argv) > 2 else GRAPH_FILE
+        if not source.exists():
+            print(f"Not found: {source}")
+            sys.exit(1)
+        nodes, edges = store.migrate_json(str(source))
+        print(f"Migrated {nodes} nodes, {edges} edges from {source} into {GRAPH_DB}")
+    
+    elif cmd == "snapshot":
+        store = get_store()
+        if store.backend != "json":
+            print("Snapshots apply to the json backend (SQLite journals row changes in its own WAL)")
+            sys.exit(1)
+        store.snapshot()
+        print(f"Snapshot written to {GRAPH_FILE} (journal seq {store.load()['journal_seq']})")
+    
+    elif cmd == "restore":
+        args = sys.argv[2:]
+        output = args[args.index("--output") + 1] if "--output" in args[:-1] else None
+        if not args or args[0].startswith("--") or (output is None) == ("--apply" not in args):
+            print("Usage: restore <timestamp> (--output FILE | --apply)")
+            print("  Rebuilds the graph as of an ISO timestamp from snapshots and the journal (json backend)")
+            sys.exit(1)
+        store = get_store()
+        if store.backend != "json":
+            print("Point-in-time restore needs the json backend's journal")
+            sys.exit(1)
+        try:
+            data = store.restore(args[0])
+        except ValueError as e:
+            print(f"Cannot restore: {e}")
+            sys.exit(1)
+        if output:
+            with open(output, "w") as f:
+                json.dump(data, f, indent=2)
+            print(f"Graph as of {args[0]} ({len(data['nodes'])} nodes, {len(data['edges'])} edges) written to {output}")
+        else:
+            store.save(data)
+            print(f"Graph restored to {args[0]} ({len(data['nodes'])} nodes, {len(data['edges'])} edges)")
+    
+    elif cmd == "serve":
+        interval = float(sys.argv[3]) if len(sys.argv) > 3 and sys.argv[2] == "--flush-interval" else None
+        print(f"Serving {STORAGE_BACKEND} graph on {SOCKET_FILE}")
+        sys.stdout.flush()
+        serve(interval)
     
     else:
         print(f"Unknown command: {cmd}")
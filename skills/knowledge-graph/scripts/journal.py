@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+knowledge-graph: Append-only mutation journal with periodic snapshots
+
+Each commit appends its mutations (node upserts, edge upserts, node
+replacements) to `current.jsonl` as one JSON line each, so a write costs the
+size of the change rather than the size of the graph. Every SNAPSHOT_EVERY
+entries the graph file is rewritten as a snapshot and the journal rolls over
+to a closed segment. The previous snapshot is kept, so any moment since the
+oldest retained snapshot can be rebuilt by replaying segments on top of it.
+
+Layout of the journal directory:
+    current.jsonl              entries since the latest snapshot
+    segment-<first seq>.jsonl  closed segments
+    snapshot-<seq>.json        retained older snapshots
+"""
+import json
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+# Journal entries between snapshots
+SNAPSHOT_EVERY = 1000
+
+# Older snapshots retained for point-in-time restore
+KEEP_SNAPSHOTS = 5
+
+def _seq_of(path):
+    return int(path.stem.rsplit("-", 1)[1])
+
+def read_entries(path, after_seq=0):
+    """Entries in one journal file with seq > after_seq (a torn last line is skipped)."""
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry["seq"] > after_seq:
+                    yield entry
+    except FileNotFoundError:
+        return
+
+class Journal:
+    """Segmented mutation log and retained snapshots in one directory."""
+
+    def __init__(self, directory):
+        self.dir = Path(directory)
+        self.current = self.dir / "current.jsonl"
+
+    def stamp(self):
+        """Changes whenever an entry is appended or the journal rolls over."""
+        try:
+            st = self.current.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def append(self, seq, ops):
+        """Write `ops` [(op, args)] as entries seq+1, seq+2, ... Returns the last seq."""
+        self.dir.mkdir(parents=True, exist_ok=True)
+        now = datetime.now().isoformat()
+        lines = []
+        for op, args in ops:
+            seq += 1
+            lines.append(json.dumps({"seq": seq, "ts": now, "op": op, "args": args}) + "\n")
+        with open(self.current, "a+b") as f:
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")  # terminate a line torn by a crash
+            f.write("".join(lines).encode())
+            f.flush()
+            os.fsync(f.fileno())
+        return seq
+
+    def tail(self, after_seq):
+        """Entries not yet folded into the snapshot at `after_seq`."""
+        return read_entries(self.current, after_seq)
+
+    def segments(self):
+        return sorted(self.dir.glob("segment-*.jsonl"), key=_seq_of)
+
+    def entries(self, after_seq=0):
+        """Every retained entry after `after_seq`, oldest first."""
+        for path in self.segments() + [self.current]:
+            yield from read_entries(path, after_seq)
+
+    def snapshots(self):
+        """Retained older snapshots as [(seq, path)], oldest first."""
+        return sorted((_seq_of(p), p) for p in self.dir.glob("snapshot-*.json"))
+
+    def keep_snapshot(self, path, seq, empty=None):
+        """Retain the snapshot file at `path` (taken at `seq`) before it is replaced.
+
+        `empty` is retained instead when there is no file yet, so the very
+        first entries can be replayed onto it.
+        """
+        target = self.dir / f"snapshot-{seq:012d}.json"
+        if target.exists():
+            return
+        self.dir.mkdir(parents=True, exist_ok=True)
+        if not Path(path).exists():
+            if empty is not None:
+                with open(target, "w") as f:
+                    json.dump(empty, f)
+            return
+        try:
+            os.link(path, target)  # the graph file is replaced, never rewritten in place
+        except OSError:
+            shutil.copyfile(path, target)
+
+    def roll_over(self, first_seq):
+        """Close the current journal as the segment starting at `first_seq`."""
+        if self.current.exists():
+            os.replace(self.current, self.dir / f"segment-{first_seq:012d}.jsonl")
+
+    def prune(self, keep=None):
+        """Drop snapshots beyond `keep` and segments no retained snapshot needs."""
+        keep = KEEP_SNAPSHOTS if keep is None else keep
+        snapshots = self.snapshots()
+        for _, path in snapshots[:-keep] if keep else snapshots:
+            path.unlink()
+        snapshots = self.snapshots()
+        oldest = snapshots[0][0] if snapshots else None
+        segments = self.segments()
+        for path, following in zip(segments, segments[1:]):
+            if oldest is None or _seq_of(following) - 1 <= oldest:
+                path.unlink()
+        if segments and oldest is None:
+            segments[-1].unlink()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+knowledge-graph: Secondary indexes on node name and type
+
+Exact (lowercase) name lookup, type lookup, prefix search over a sorted
+name list and fuzzy search over name trigrams.
+"""
+import bisect
+
+def trigrams(name):
+    """Trigrams of a lowercased, space-padded name ("py" -> {"  p", " py", "py "})."""
+    padded = f"  {name.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def similarity(a, b):
+    """Jaccard similarity of two trigram sets."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+class NameIndex:
+    """In-memory name/type indexes, built once at load and kept current."""
+
+    def __init__(self, nodes=()):
+        self.by_name = {}      # lowercase name -> [node ids]
+        self.by_type = {}      # type -> {node id: None} (insertion-ordered set)
+        self.by_trigram = {}   # trigram -> {node ids}
+        self.names = {}        # node id -> lowercase name
+        for node in nodes:
+            self._add(node)
+        self.sorted_names = sorted(self.by_name)
+
+    def _add(self, node):
+        node_id, name = node["id"], node["name"].lower()
+        self.names[node_id] = name
+        ids = self.by_name.setdefault(name, [])
+        if node_id not in ids:
+            ids.append(node_id)
+        self.by_type.setdefault(node["type"], {})[node_id] = None
+        for gram in trigrams(name):
+            self.by_trigram.setdefault(gram, set()).add(node_id)
+        return len(ids) == 1
+
+    def add(self, node):
+        if self._add(node):
+            bisect.insort(self.sorted_names, node["name"].lower())
+
+    def remove(self, node):
+        node_id = node["id"]
+        name = self.names.pop(node_id, None)
+        if name is None:
+            return
+        ids = self.by_name.get(name, [])
+        if node_id in ids:
+            ids.remove(node_id)
+        if not ids:
+            self.by_name.pop(name, None)
+            i = bisect.bisect_left(self.sorted_names, name)
+            if i < len(self.sorted_names) and self.sorted_names[i] == name:
+                del self.sorted_names[i]
+        self.by_type.get(node["type"], {}).pop(node_id, None)
+        for gram in trigrams(name):
+            self.by_trigram.get(gram, set()).discard(node_id)
+
+    def exact(self, name):
+        return list(self.by_name.get(name.lower(), ()))
+
+    def of_type(self, type_):
+        return list(self.by_type.get(type_, ()))
+
+    def prefix(self, prefix, limit=10):
+        """Node ids whose name starts with `prefix`, in name order."""
+        prefix = prefix.lower()
+        results = []
+        i = bisect.bisect_left(self.sorted_names, prefix)
+        while i < len(self.sorted_names) and self.sorted_names[i].startswith(prefix) and len(results) < limit:
+            results.extend(self.by_name[self.sorted_names[i]])
+            i += 1
+        return results[:limit]
+
+    def similar(self, name, limit=10, min_score=0.3):
+        """(score, node id) pairs for names sharing enough trigrams with `name`."""
+        query = trigrams(name)
+        shared = {}
+        for gram in query:
+            for node_id in self.by_trigram.get(gram, ()):
+                shared[node_id] = shared.get(node_id, 0) + 1
+        scored = []
+        for node_id, common in shared.items():
+            other = len(trigrams(self.names[node_id]))
+            score = common / (len(query) + other - common)
+            if score >= min_score:
+                scored.append((score, node_id))
+        scored.sort(key=lambda x: (-x[0], self.names[x[1]]))
+        return scored[:limit]
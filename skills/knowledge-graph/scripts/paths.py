@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+knowledge-graph: Shortest-path search (BFS, bidirectional BFS, Dijkstra)
+
+Searches take neighbor functions so they run against any store:
+`forward(node_id)` and `backward(node_id)` yield (neighbor_id, edge) pairs.
+Paths are returned as {"nodes": [...], "edges": [...], "cost": float}.
+"""
+import heapq
+from collections import deque
+
+def _walk_back(parents, node):
+    """Follow parent pointers from `node` to the search root."""
+    nodes, edges = [node], []
+    while parents[node] is not None:
+        node, edge = parents[node]
+        nodes.append(node)
+        edges.append(edge)
+    nodes.reverse()
+    edges.reverse()
+    return nodes, edges
+
+def bfs_path(forward, source, target, max_depth=None):
+    """Unweighted shortest path with a deque and parent pointers."""
+    if source == target:
+        return {"nodes": [source], "edges": [], "cost": 0}
+    parents = {source: None}
+    queue = deque([(source, 0)])
+    while queue:
+        current, depth = queue.popleft()
+        if max_depth is not None and depth >= max_depth:
+            continue
+        for neighbor, edge in forward(current):
+            if neighbor in parents:
+                continue
+            parents[neighbor] = (current, edge)
+            if neighbor == target:
+                nodes, edges = _walk_back(parents, neighbor)
+                return {"nodes": nodes, "edges": edges, "cost": len(edges)}
+            queue.append((neighbor, depth + 1))
+    return None
+
+def bidirectional_path(forward, backward, source, target, max_depth=None):
+    """Unweighted shortest path searching from both ends, smaller frontier first."""
+    if source == target:
+        return {"nodes": [source], "edges": [], "cost": 0}
+    fwd_parents, bwd_parents = {source: None}, {target: None}
+    fwd_frontier, bwd_frontier = [source], [target]
+    fwd_depth = bwd_depth = 0
+
+    while fwd_frontier and bwd_frontier:
+        if max_depth is not None and fwd_depth + bwd_depth >= max_depth:
+            return None
+        expand_forward = len(fwd_frontier) <= len(bwd_frontier)
+        if expand_forward:
+            frontier, parents, others, step = fwd_frontier, fwd_parents, bwd_parents, forward
+        else:
+            frontier, parents, others, step = bwd_frontier, bwd_parents, fwd_parents, backward
+
+        # Finish the whole level before choosing a meeting point so the
+        # shortest join wins, not just the first one discovered.
+        next_frontier = []
+        meeting = None
+        for current in frontier:
+            for neighbor, edge in step(current):
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = (current, edge)
+                next_frontier.append(neighbor)
+                if neighbor in others and meeting is None:
+                    meeting = neighbor
+        if expand_forward:
+            fwd_frontier, fwd_depth = next_frontier, fwd_depth + 1
+        else:
+            bwd_frontier, bwd_depth = next_frontier, bwd_depth + 1
+
+        if meeting is not None:
+            head_nodes, head_edges = _walk_back(fwd_parents, meeting)
+            tail_nodes, tail_edges = _walk_back(bwd_parents, meeting)
+            tail_nodes.reverse()
+            tail_edges.reverse()
+            nodes = head_nodes + tail_nodes[1:]
+            edges = head_edges + tail_edges
+            return {"nodes": nodes, "edges": edges, "cost": len(edges)}
+    return None
+
+def _step_cost(edge):
+    return 1.0 / max(edge.get("weight", 1), 1)
+
+def weighted_path(forward, source, target, max_depth=None):
+    """Dijkstra over inverse edge weight: frequently seen links are short."""
+    if max_depth is not None:
+        return _capped_weighted_path(forward, source, target, max_depth)
+    best = {source: 0.0}
+    parents = {source: None}
+    heap = [(0.0, source)]
+    settled = set()
+    while heap:
+        cost, current = heapq.heappop(heap)
+        if current in settled:
+            continue
+        if current == target:
+            nodes, edges = _walk_back(parents, current)
+            return {"nodes": nodes, "edges": edges, "cost": cost}
+        settled.add(current)
+        for neighbor, edge in forward(current):
+            if neighbor in settled:
+                continue
+            new_cost = cost + _step_cost(edge)
+            if new_cost < best.get(neighbor, float("inf")):
+                best[neighbor] = new_cost
+                parents[neighbor] = (current, edge)
+                heapq.heappush(heap, (new_cost, neighbor))
+    return None
+
+def _capped_weighted_path(forward, source, target, max_depth):
+    """weighted_path within `max_depth` hops.
+
+    Search states are (node, depth). A node popped again is skipped only if it
+    was already settled at the same or a smaller depth, so a cheap but deep
+    route can't hide a dearer, shallower one that fits the cap.
+    """
+    start = (source, 0)
+    best = {start: 0.0}
+    parents = {start: None}
+    heap = [(0.0, 0, source)]
+    settled = {}  # node -> smallest depth it was settled at
+    while heap:
+        cost, depth, current = heapq.heappop(heap)
+        if settled.get(current, depth + 1) <= depth:
+            continue
+        state = (current, depth)
+        if current == target:
+            nodes, edges = _walk_back(parents, state)
+            return {"nodes": [node for node, _ in nodes], "edges": edges, "cost": cost}
+        settled[current] = depth
+        if depth >= max_depth:
+            continue
+        for neighbor, edge in forward(current):
+            if settled.get(neighbor, depth + 2) <= depth + 1:
+                continue
+            new_cost = cost + _step_cost(edge)
+            following = (neighbor, depth + 1)
+            if new_cost < best.get(following, float("inf")):
+                best[following] = new_cost
+                parents[following] = (state, edge)
+                heapq.heappush(heap, (new_cost, depth + 1, neighbor))
+    return None
+
+METHODS = {
+    "bfs": lambda fwd, bwd, s, t, d: bfs_path(fwd, s, t, d),
+    "bidirectional": bidirectional_path,
+    "weighted": lambda fwd, bwd, s, t, d: weighted_path(fwd, s, t, d),
+}
+
+def shortest_path(forward, backward, source, target, method="bidirectional", max_depth=None):
+    """Dispatch to one of METHODS."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown path method: {method} (expected one of {', '.join(METHODS)})")
+    return METHODS[method](forward, backward, source, target, max_depth)
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+knowledge-graph: Local daemon speaking newline-delimited JSON over a Unix socket
+
+`graph.py serve` keeps the store and its indexes warm so each query skips
+interpreter startup and the graph load. Requests are one JSON object per
+line ({"op": "find", "name": "Python"}); each gets one JSON line back
+({"ok": true, "result": ...} or {"ok": false, "error": "..."}).
+
+Writes are acknowledged once appended to a write-behind log, then coalesced
+into one store commit: before the next read, when enough are queued, or
+after a short interval. Log records are numbered, and each commit stores
+the number of the last record it contains, so a log left behind by a crash
+is replayed on start without applying any write twice. A commit that fails
+(a busy database, a full disk) is logged and retried after the next interval;
+the queued writes and the log are kept until one succeeds.
+
+Connections are multiplexed with a selector: a slow or idle client holds
+no one else up, and is dropped after CLIENT_TIMEOUT seconds of silence.
+"""
+import json
+import os
+import selectors
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
+# Seconds a queued write may wait before it is committed
+FLUSH_INTERVAL = 2.0
+
+# Queued writes that force a commit
+MAX_PENDING = 500
+
+# Seconds a client may take to send a request line
+CLIENT_TIMEOUT = 30
+
+# Seconds the daemon waits for a client to accept a response
+SEND_TIMEOUT = 5
+
+# Longest request line accepted (bytes)
+MAX_REQUEST = 16 * 1024 * 1024
+
+class DaemonUnavailable(ConnectionError):
+    """No daemon is listening on the socket."""
+
+class DaemonError(RuntimeError):
+    """The daemon received the request but could not answer it."""
+
+def request(socket_path, op, timeout=CLIENT_TIMEOUT, **params):
+    """Send one request to the daemon and return its result."""
+    if not hasattr(socket, "AF_UNIX") or not Path(socket_path).exists():
+        raise DaemonUnavailable(f"No daemon at {socket_path}")
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        try:
+            sock.connect(str(socket_path))
+        except OSError as e:
+            raise DaemonUnavailable(f"No daemon at {socket_path}: {e}") from e
+        with sock.makefile("rwb") as f:
+            f.write(json.dumps({"op": op, **params}).encode() + b"\n")
+            f.flush()
+            line = f.readline()
+    finally:
+        sock.close()
+    if not line:
+        raise DaemonUnavailable(f"Daemon at {socket_path} closed the connection")
+    response = json.loads(line)
+    if not response.get("ok"):
+        raise DaemonError(response.get("error", "unknown error"))
+    return response.get("result")
+
+class WriteBehindLog:
+    """Append-only NDJSON file of acknowledged but uncommitted writes, numbered by `seq`."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = None
+        self.seq = 0  # number of the last record appended
+
+    def append(self, record):
+        """Log a record and return its sequence number."""
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a")
+        self.seq += 1
+        self._file.write(json.dumps({"seq": self.seq, **record}) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self.seq
+
+    def replay(self):
+        """Records left from a previous run (a torn last line is skipped)."""
+        if not self.path.exists():
+            return []
+        records = []
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return records
+
+    def clear(self):
+        """Forget everything logged so far (called after a commit)."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.path.exists():
+            self.path.unlink()
+
+class GraphDaemon:
+    """Single-threaded socket server; requests are handled one at a time.
+
+    handlers: op -> function(**params) for reads, answered after a flush.
+    writers: op -> function(**params) that queues a write and returns its ack.
+    flush: flush(last_seq) commits everything the writers queued, recording
+        `last_seq` (the last log record included) in the same transaction.
+    applied_seq: returns the last_seq of the latest commit (0 if none).
+    """
+
+    def __init__(self, socket_path, log_path, handlers, writers, flush,
+                 applied_seq=lambda: 0, flush_interval=FLUSH_INTERVAL, max_pending=MAX_PENDING):
+        self.socket_path = Path(socket_path)
+        self.log = WriteBehindLog(log_path)
+        self.handlers = handlers
+        self.writers = writers
+        self._flush = flush
+        self.applied_seq = applied_seq
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending = 0
+        self.oldest_pending = None
+        self.running = False
+        self.clients = {}  # connection -> [unread bytes, time of last activity]
+
+    def recover(self):
+        """Commit writes logged by a previous run that did not get to flush them.
+
+        Records up to the store's applied_seq were committed before the crash
+        (which came before the log could be cleared) and are skipped.
+        """
+        applied = self.applied_seq()
+        last = applied
+        replayed = 0
+        for record in self.log.replay():
+            params = dict(record)
+            seq = params.pop("seq", None)
+            if seq is not None and seq <= applied:
+                continue
+            self.writers[params.pop("op")](**params)
+            replayed += 1
+            last = max(last, seq or 0)
+        if replayed:
+            self._flush(last)
+        self.log.clear()
+        self.log.seq = last  # keep numbering above everything already committed
+        return replayed
+
+    def flush(self):
+        if self.pending:
+            self._flush(self.log.seq)
+            self.log.clear()
+            self.pending = 0
+            self.oldest_pending = None
+
+    def try_flush(self):
+        """flush(), reporting a failure instead of raising it; the writes stay queued for a retry."""
+        try:
+            self.flush()
+            return True
+        except Exception as e:
+            print(f"Commit of {self.pending} queued writes failed, will retry: {type(e).__name__}: {e}",
+                  file=sys.stderr)
+            self.oldest_pending = time.monotonic()  # next attempt after another flush_interval
+            return False
+
+    def handle(self, message):
+        op = message.pop("op", None)
+        if op == "ping":
+            return {"pid": os.getpid(), "pending": self.pending}
+        if op in self.writers:
+            result = self.writers[op](**message)
+            self.log.append({"op": op, **message})
+            self.pending += 1
+            self.oldest_pending = self.oldest_pending or time.monotonic()
+            if self.pending >= self.max_pending:
+                self.try_flush()  # the write is logged either way, so it is still acknowledged
+            return result
+        if op in self.handlers:
+            self.flush()
+            return self.handlers[op](**message)
+        raise ValueError(f"Unknown op: {op}")
+
+    def respond(self, line):
+        """The response line for one request line."""
+        try:
+            response = {"ok": True, "result": self.handle(json.loads(line))}
+        except Exception as e:
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        return json.dumps(response).encode() + b"\n"
+
+    def _accept(self, server, selector):
+        conn, _ = server.accept()
+        conn.settimeout(SEND_TIMEOUT)  # recv only runs when data is ready; this bounds sendall
+        selector.register(conn, selectors.EVENT_READ)
+        self.clients[conn] = [b"", time.monotonic()]
+
+    def _drop(self, conn, selector):
+        selector.unregister(conn)
+        del self.clients[conn]
+        conn.close()
+
+    def _read(self, conn, selector):
+        """Answer every complete request line a client has sent; drop it on EOF or error."""
+        state = self.clients[conn]
+        try:
+            chunk = conn.recv(65536)
+            state[0] += chunk
+            state[1] = time.monotonic()
+            lines = state[0].split(b"\n")
+            state[0] = lines.pop() if chunk else b""  # at EOF a final unterminated line counts too
+            if len(state[0]) > MAX_REQUEST:
+                conn.sendall(json.dumps({"ok": False, "error": "request too large"}).encode() + b"\n")
+                chunk = b""
+            for line in lines:
+                if line.strip():
+                    conn.sendall(self.respond(line))
+        except OSError:
+            chunk = b""  # client went away mid-request
+        if not chunk:
+            self._drop(conn, selector)
+
+    def _drop_idle(self, selector):
+        cutoff = time.monotonic() - CLIENT_TIMEOUT
+        for conn in [c for c, (_, seen) in self.clients.items() if seen < cutoff]:
+            self._drop(conn, selector)
+
+    def _claim_socket(self):
+        """Remove a stale socket file; refuse to start if a daemon is already answering."""
+        try:
+            request(self.socket_path, "ping", timeout=2)
+        except DaemonUnavailable:
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+            return
+        raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+
+    def _stop(self, signum, frame):
+        self.running = False
+
+    def serve_forever(self):
+        self._claim_socket()
+        self.recover()
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(self.socket_path))
+        os.chmod(self.socket_path, 0o600)
+        server.listen(16)
+        selector = selectors.DefaultSelector()
+        selector.register(server, selectors.EVENT_READ)
+        signal.signal(signal.SIGTERM, self._stop)
+        self.running = True
+        try:
+            while self.running:
+                now = time.monotonic()
+                deadlines = [now + self.flush_interval]
+                if self.oldest_pending is not None:
+                    deadlines.append(self.oldest_pending + self.flush_interval)
+                deadlines.extend(seen + CLIENT_TIMEOUT for _, seen in self.clients.values())
+                for key, _ in selector.select(max(0, min(deadlines) - now)):
+                    if key.fileobj is server:
+                        self._accept(server, selector)
+                    else:
+                        self._read(key.fileobj, selector)
+                self._drop_idle(selector)
+                if self.oldest_pending is not None and time.monotonic() - self.oldest_pending >= self.flush_interval:
+                    self.try_flush()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for conn in list(self.clients):
+                self._drop(conn, selector)
+            selector.close()
+            server.close()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+            if not self.try_flush():
+                print(f"Uncommitted writes are kept in {self.log.path} and replayed on the next start",
+                      file=sys.stderr)
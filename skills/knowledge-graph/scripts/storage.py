@@ -0,0 +1,827 @@
+#!/usr/bin/env python3
+"""
+knowledge-graph: Storage backends for the graph database
+"""
+import copy
+import heapq
+import json
+import os
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from adjacency import AdjacencyIndex
+from journal import SNAPSHOT_EVERY, Journal
+from name_index import NameIndex, similarity, trigrams
+from time_index import TimeIndex, to_epoch
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+BACKENDS = ("sqlite", "json")
+
+# Node timestamp fields that support range queries
+NODE_TIME_FIELDS = ("created_at", "last_mentioned")
+
+# Contexts kept on each node; older ones move to the context archive
+MAX_CONTEXTS = 10
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS nodes (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    properties TEXT NOT NULL DEFAULT '{}',
+    created_at TEXT,
+    mentions INTEGER NOT NULL DEFAULT 0,
+    last_mentioned TEXT,
+    contexts TEXT NOT NULL DEFAULT '[]'
+);
+CREATE TABLE IF NOT EXISTS edges (
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    relation TEXT NOT NULL,
+    context TEXT NOT NULL DEFAULT '',
+    created_at TEXT,
+    weight INTEGER NOT NULL DEFAULT 1,
+    last_seen TEXT,
+    PRIMARY KEY (source, target, relation)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS name_trigrams (
+    trigram TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    PRIMARY KEY (trigram, node_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_edges_source ON edges(source, relation);
+CREATE INDEX IF NOT EXISTS idx_edges_target ON edges(target, relation);
+CREATE INDEX IF NOT EXISTS idx_nodes_type ON nodes(type);
+CREATE INDEX IF NOT EXISTS idx_nodes_name ON nodes(lower(name));
+CREATE INDEX IF NOT EXISTS idx_nodes_created ON nodes(created_at);
+CREATE INDEX IF NOT EXISTS idx_nodes_last_mentioned ON nodes(last_mentioned);
+CREATE INDEX IF NOT EXISTS idx_edges_seen ON edges(COALESCE(last_seen, created_at));
+"""
+
+def empty_graph():
+    """Return an empty graph document."""
+    return {
+        "nodes": {},  # id -> {type, name, properties, created_at, mentions}
+        "edges": [],  # {source, target, relation, context, created_at}
+        "next_id": 1,
+    }
+
+def edge_seen(edge):
+    """When an edge was last observed (creation time until it is seen again)."""
+    return edge.get("last_seen") or edge.get("created_at")
+
+def trim_contexts(node, max_contexts, evicted=None):
+    """Keep the newest `max_contexts` contexts, moving older ones to `evicted`."""
+    contexts = node.get("contexts", [])
+    if max_contexts is not None and len(contexts) > max_contexts:
+        overflow = len(contexts) - max_contexts
+        if evicted is not None:
+            evicted.extend(contexts[:overflow])
+        del contexts[:overflow]
+    return node
+
+def merge_node(node, node_id, name, type_, properties=None, contexts=(), mentions=1, now=None,
+               max_contexts=None, evicted=None):
+    """Apply a mention to a node record, creating it if needed."""
+    now = now or datetime.now().isoformat()
+    contexts = [c[:200] for c in contexts if c]
+    if node is None:
+        node = {
+            "id": node_id,
+            "name": name,
+            "type": type_,
+            "properties": properties or {},
+            "created_at": now,
+            "mentions": mentions,
+            "last_mentioned": now,
+            "contexts": list(dict.fromkeys(contexts)),
+        }
+        return trim_contexts(node, max_contexts, evicted)
+    node["mentions"] = node.get("mentions", 0) + mentions
+    node["last_mentioned"] = now
+    existing = node.setdefault("contexts", [])
+    for context in contexts:
+        if context not in existing:
+            existing.append(context)
+    return trim_contexts(node, max_contexts, evicted)
+
+def merge_edge(edge, source, target, relation, context="", weight=1, now=None):
+    """Apply an observation to an edge record, creating it if needed."""
+    now = now or datetime.now().isoformat()
+    if edge is None:
+        return {
+            "source": source,
+            "target": target,
+            "relation": relation,
+            "context": context[:300],
+            "created_at": now,
+            "weight": weight,
+        }
+    edge["weight"] = edge.get("weight", 1) + weight
+    edge["last_seen"] = now
+    return edge
+
+class JsonStore:
+    """Whole-document storage in a single JSON file (legacy format).
+
+    The file is a snapshot; commits append their mutations to a journal
+    (see journal.py) and the snapshot is rewritten every SNAPSHOT_EVERY
+    entries. Writers serialize on an advisory lock next to the file. If
+    another process committed since this one loaded, the graph is reloaded
+    under the lock and this transaction's mutations are replayed on top, so
+    concurrent runs never lose updates. Snapshots are replaced atomically.
+    """
+
+    backend = "json"
+
+    def __init__(self, path, journaled=True):
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.journal = Journal(self.path.with_name(self.path.stem + "_journal")) if journaled else None
+        self._data = None
+        self._stamp = None  # snapshot + journal state as loaded
+        self._seq = 0       # last journal entry applied
+        self._base_seq = 0  # journal seq the snapshot file was written at
+        self._ops = []      # mutations since the last write, for replay
+        self._lock_depth = 0
+        self._index = None
+        self._names = None
+        self._times = None
+        self._depth = 0
+        self._dirty = False
+        self.archive = None  # ContextArchive for evicted contexts
+        self.max_contexts = MAX_CONTEXTS
+
+    def load(self):
+        """Return the full graph document (snapshot plus journal tail)."""
+        if self._data is None:
+            with self._locked(shared=True):
+                self._stamp = self._disk_stamp()
+                try:
+                    with open(self.path) as f:
+                        self._data = json.load(f)
+                except FileNotFoundError:
+                    self._data = empty_graph()
+                self._seq = self._base_seq = self._data.get("journal_seq", 0)
+                self._index = AdjacencyIndex(self._data["edges"])
+                self._names = None
+                self._times = None
+                if self.journal is not None:
+                    for entry in self.journal.tail(self._seq):
+                        self._apply(entry["op"], entry["args"])
+                        self._seq = entry["seq"]
+        return self._data
+
+    def _apply(self, op, args):
+        getattr(self, "_" + op)(*args)
+
+    @property
+    def index(self):
+        """Adjacency index over the loaded edges, built once per load."""
+        self.load()
+        return self._index
+
+    @property
+    def names(self):
+        """Name/type index, built on first lookup and kept current after that."""
+        nodes = self.load()["nodes"]
+        if self._names is None:
+            self._names = NameIndex(nodes.values())
+        return self._names
+
+    @property
+    def times(self):
+        """Time indexes (node fields + edge last-seen), built on first range query."""
+        data = self.load()
+        if self._times is None:
+            self._times = {field: TimeIndex((n.get(field), n["id"]) for n in data["nodes"].values())
+                           for field in NODE_TIME_FIELDS}
+            self._times["edge_seen"] = TimeIndex((edge_seen(e), key) for key, e in self._index.edges.items())
+        return self._times
+
+    def save(self, data):
+        """Replace the stored graph with `data`."""
+        self._data = data
+        self._index = AdjacencyIndex(data["edges"])
+        self._names = None
+        self._times = None
+        self._ops = []
+        self._write(replace=True)
+
+    @staticmethod
+    def _file_stamp(st):
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _disk_stamp(self):
+        try:
+            stamp = self._file_stamp(self.path.stat())
+        except FileNotFoundError:
+            stamp = None
+        return (stamp, self.journal.stamp()) if self.journal is not None else stamp
+
+    @contextmanager
+    def _locked(self, shared=False):
+        """Hold the writer lock, or a shared one for reading (no-op without fcntl)."""
+        if not FCNTL_AVAILABLE or self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _replay(self):
+        """Reload from disk and re-apply this process's pending mutations."""
+        ops = self._ops
+        self._data = None
+        self.load()
+        for op, args in ops:
+            self._apply(op, args)
+
+    def _disk_seqs(self):
+        """(snapshot seq, last committed seq) as currently on disk."""
+        base = 0
+        if self.path.exists():
+            with open(self.path) as f:
+                base = json.load(f).get("journal_seq", 0)
+        return base, max((e["seq"] for e in self.journal.tail(base)), default=base)
+
+    def _write(self, replace=False, snapshot=False):
+        with self._locked():
+            if not replace and self._stamp != self._disk_stamp():
+                self._replay()
+            if replace and self.journal is not None:
+                self._base_seq, self._seq = self._disk_seqs()  # keep the journal's numbering
+            if self.archive is not None:
+                self.archive.flush()
+            if self.journal is not None and self._ops and not replace:
+                self._seq = self.journal.append(self._seq, self._ops)
+            if self.journal is None or replace or snapshot or not self.path.exists() or \
+                    self._seq - self._base_seq >= SNAPSHOT_EVERY:
+                self._write_snapshot()
+            self._stamp = self._disk_stamp()
+        self._ops = []
+        self._dirty = False
+
+    def _write_snapshot(self):
+        """Atomically replace the graph file with the in-memory graph."""
+        if self.journal is not None:
+            self.journal.keep_snapshot(self.path, self._base_seq, empty_graph())
+            self._data["journal_seq"] = self._seq
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+        try:
+            os.fchmod(fd, self.path.stat().st_mode & 0o777 if self.path.exists() else 0o644)
+            with os.fdopen(fd, "w") as f:
+                json.dump(self._data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        if self.journal is not None:
+            self.journal.roll_over(self._base_seq + 1)
+            self.journal.prune()
+            self._base_seq = self._seq
+
+    def snapshot(self):
+        """Fold the journal into a fresh snapshot now."""
+        self.load()
+        self._write(snapshot=True)
+
+    def restore(self, until):
+        """The graph document as it was at `until` (datetime or ISO string)."""
+        if self.journal is None:
+            raise ValueError("Point-in-time restore needs the journal")
+        until = to_epoch(until)
+        with self._locked(shared=True):
+            entries = list(self.journal.entries())
+            target = max((e["seq"] for e in entries if to_epoch(e["ts"]) <= until), default=0)
+            bases = self.journal.snapshots()
+            if self.path.exists():
+                with open(self.path) as f:
+                    bases.append((json.load(f).get("journal_seq", 0), self.path))
+            bases = [(seq, path) for seq, path in bases if seq <= target]
+            if not bases:
+                raise ValueError("The journal does not reach back that far")
+            base_seq, base_path = max(bases)
+            scratch = JsonStore(self.path, journaled=False)
+            scratch.max_contexts = self.max_contexts
+            with open(base_path) as f:
+                data = json.load(f)
+            scratch._data, scratch._index = data, AdjacencyIndex(data["edges"])
+            for entry in entries:
+                if base_seq < entry["seq"] <= target:
+                    scratch._apply(entry["op"], entry["args"])
+        data["journal_seq"] = target
+        return data
+
+    def refresh(self):
+        """Drop the cached graph if another process committed since it was loaded."""
+        if self._depth == 0 and self._data is not None and self._stamp != self._disk_stamp():
+            self._data = None
+
+    @contextmanager
+    def transaction(self):
+        """Group mutations so they are committed once on exit; an exception discards them."""
+        self.refresh()
+        self.load()
+        self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                self._discard()
+            raise
+        self._depth -= 1
+        if self._depth == 0 and self._dirty:
+            self._write()
+
+    def _discard(self):
+        """Drop uncommitted mutations; the graph is reloaded from disk on next use."""
+        self._ops = []
+        self._dirty = False
+        self._data = None
+        self._index = None
+        self._names = None
+        self._times = None
+        if self.archive is not None:
+            self.archive.discard()
+
+    def _touch(self):
+        self._dirty = True
+        if self._depth == 0:
+            self._write()
+
+    def get_node(self, node_id):
+        return self.load()["nodes"].get(node_id)
+
+    def upsert_node(self, node_id, name, type_, properties=None, contexts=(), mentions=1, now=None):
+        args = (node_id, name, type_, properties, list(contexts), mentions, now or datetime.now().isoformat())
+        self._ops.append(("upsert_node", args))
+        node = self._upsert_node(*args)
+        self._touch()
+        return node
+
+    def _upsert_node(self, node_id, name, type_, properties, contexts, mentions, now):
+        nodes = self.load()["nodes"]
+        existing = nodes.get(node_id)
+        old_times = {f: existing.get(f) for f in NODE_TIME_FIELDS} if existing else {}
+        evicted = []
+        nodes[node_id] = merge_node(existing, node_id, name, type_, properties, contexts, mentions, now,
+                                    self.max_contexts, evicted)
+        if evicted and self.archive is not None:
+            self.archive.add(node_id, evicted)
+        if existing is None and self._names is not None:
+            self._names.add(nodes[node_id])
+        if self._times is not None:
+            for field in NODE_TIME_FIELDS:
+                self._times[field].move(old_times.get(field), nodes[node_id].get(field), node_id)
+        return nodes[node_id]
+
+    def put_node(self, node):
+        self._ops.append(("put_node", (copy.deepcopy(node),)))
+        self._put_node(node)
+        self._touch()
+
+    def _put_node(self, node):
+        node = copy.deepcopy(node)
+        nodes = self.load()["nodes"]
+        old = nodes.get(node["id"], {})
+        if self._names is not None:
+            if old:
+                self._names.remove(old)
+            self._names.add(node)
+        if self._times is not None:
+            for field in NODE_TIME_FIELDS:
+                self._times[field].move(old.get(field), node.get(field), node["id"])
+        nodes[node["id"]] = node
+
+    def get_edge(self, source, target, relation):
+        return self.index.get(source, target, relation)
+
+    def upsert_edge(self, source, target, relation, context="", weight=1, now=None):
+        args = (source, target, relation, context, weight, now or datetime.now().isoformat())
+        self._ops.append(("upsert_edge", args))
+        edge = self._upsert_edge(*args)
+        self._touch()
+        return edge
+
+    def _upsert_edge(self, source, target, relation, context, weight, now):
+        edge = self.index.get(source, target, relation)
+        old_seen = edge_seen(edge) if edge else None
+        if edge is None:
+            edge = merge_edge(None, source, target, relation, context, weight, now)
+            self._data["edges"].append(edge)
+            self._index.add(edge)
+        else:
+            merge_edge(edge, source, target, relation, context, weight, now)
+        if self._times is not None:
+            self._times["edge_seen"].move(old_seen, edge_seen(edge), (source, target, relation))
+        return edge
+
+    def edges_for(self, node_id, direction="both"):
+        """Yield edges leaving (`out`), entering (`in`) or touching a node."""
+        return self.index.edges_for(node_id, direction)
+
+    def strong_edges(self, min_weight=2, limit=10):
+        """Return the heaviest edges with at least `min_weight`."""
+        strong = (e for e in self.index.edges.values() if e.get("weight", 1) >= min_weight)
+        return heapq.nlargest(limit, strong, key=lambda e: e.get("weight", 1))
+
+    def nodes_between(self, field, start=None, end=None):
+        """Nodes whose `field` timestamp lies in [start, end], oldest first."""
+        nodes = self.load()["nodes"]
+        return [nodes[i] for i in self.times[field].between(start, end)]
+
+    def edges_between(self, start=None, end=None):
+        """Edges last seen in [start, end], oldest first."""
+        edges = self.index.edges
+        return [edges[k] for k in self.times["edge_seen"].between(start, end)]
+
+    def find_by_name(self, name):
+        nodes = self.load()["nodes"]
+        return [nodes[i] for i in self.names.exact(name)]
+
+    def find_by_prefix(self, prefix, limit=10):
+        nodes = self.load()["nodes"]
+        return [nodes[i] for i in self.names.prefix(prefix, limit)]
+
+    def find_similar(self, name, limit=10, min_score=0.3):
+        """(score, node) pairs ranked by trigram similarity."""
+        nodes = self.load()["nodes"]
+        return [(score, nodes[i]) for score, i in self.names.similar(name, limit, min_score)]
+
+    def nodes_by_type(self, type_):
+        nodes = self.load()["nodes"]
+        return [nodes[i] for i in self.names.of_type(type_)]
+
+    def iter_nodes(self):
+        return iter(self.load()["nodes"].values())
+
+    def iter_edges(self):
+        return iter(self.load()["edges"])
+
+    def count_nodes(self):
+        return len(self.load()["nodes"])
+
+    def count_edges(self):
+        return len(self.load()["edges"])
+
+    def revision(self):
+        """Changes whenever a commit reaches disk."""
+        stamps = self._disk_stamp()
+        if self.journal is None:
+            stamps = (stamps,)
+        return "-".join("0" if st is None else f"{st[1]}.{st[2]}" for st in stamps)
+
+    def get_meta(self, key, default=None):
+        return self.load().get("meta", {}).get(key, default)
+
+    def set_meta(self, key, value):
+        """Store a string under `key`, committed with the rest of the transaction."""
+        args = (key, str(value))
+        self._ops.append(("set_meta", args))
+        self._set_meta(*args)
+        self._touch()
+
+    def _set_meta(self, key, value):
+        self.load().setdefault("meta", {})[key] = value
+
+    def size_bytes(self):
+        """Snapshot plus the journal not yet folded into it (history is not counted)."""
+        files = [self.path] + ([self.journal.current] if self.journal is not None else [])
+        return sum(p.stat().st_size for p in files if p.exists())
+
+    def vacuum(self):
+        """Rewrite the snapshot from the in-memory graph, folding in the journal."""
+        if self._data is not None:
+            self._write(snapshot=True)
+
+    def close(self):
+        self._data = None
+        self._stamp = None
+        self._ops = []
+        self._index = None
+        self._names = None
+        self._times = None
+
+class SqliteStore:
+    """Indexed storage in SQLite (WAL mode); writes touch only changed rows."""
+
+    backend = "sqlite"
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._depth = 0
+        self.archive = None  # ContextArchive for evicted contexts
+        self.max_contexts = MAX_CONTEXTS
+        if self.get_meta("name_index") != "trigram":
+            self.rebuild_name_index()
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed mutations as one write transaction."""
+        if self._depth == 0:
+            self.conn.execute("BEGIN IMMEDIATE")
+        self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                self.conn.execute("ROLLBACK")
+                if self.archive is not None:
+                    self.archive.discard()
+            raise
+        self._depth -= 1
+        if self._depth == 0:
+            if self.archive is not None:
+                self.archive.flush()
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('revision', '1') "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+            )
+            self.conn.execute("COMMIT")
+
+    def refresh(self):
+        """Nothing to do: every query reads the latest commit."""
+
+    def revision(self):
+        """Counter bumped by every committed write transaction."""
+        return self.get_meta("revision", "0")
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    def set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    @staticmethod
+    def _node(row):
+        if row is None:
+            return None
+        node = dict(row)
+        node["properties"] = json.loads(node["properties"] or "{}")
+        node["contexts"] = json.loads(node["contexts"] or "[]")
+        return node
+
+    @staticmethod
+    def _edge(row):
+        if row is None:
+            return None
+        edge = dict(row)
+        if edge["last_seen"] is None:
+            del edge["last_seen"]
+        return edge
+
+    def _write_node(self, node):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO nodes (id, name, type, properties, created_at, mentions, last_mentioned, contexts) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (node["id"], node["name"], node["type"], json.dumps(node.get("properties") or {}),
+             node.get("created_at"), node.get("mentions", 0), node.get("last_mentioned"),
+             json.dumps(node.get("contexts") or [])),
+        )
+
+    def _index_name(self, node):
+        self.conn.execute("DELETE FROM name_trigrams WHERE node_id = ?", (node["id"],))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO name_trigrams (trigram, node_id) VALUES (?, ?)",
+            [(gram, node["id"]) for gram in trigrams(node["name"])],
+        )
+
+    def rebuild_name_index(self):
+        """Regenerate the trigram table from the nodes table."""
+        with self.transaction():
+            self.conn.execute("DELETE FROM name_trigrams")
+            for row in self.conn.execute("SELECT id, name FROM nodes").fetchall():
+                self._index_name(row)
+            self.set_meta("name_index", "trigram")
+
+    def _write_edge(self, edge):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO edges (source, target, relation, context, created_at, weight, last_seen) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (edge["source"], edge["target"], edge["relation"], edge.get("context", ""),
+             edge.get("created_at"), edge.get("weight", 1), edge.get("last_seen")),
+        )
+
+    def load(self):
+        """Return the full graph document."""
+        data = empty_graph()
+        for node in self.iter_nodes():
+            data["nodes"][node["id"]] = node
+        data["edges"] = list(self.iter_edges())
+        data["next_id"] = int(self.get_meta("next_id", 1))
+        return data
+
+    def save(self, data):
+        """Replace the stored graph with `data`."""
+        with self.transaction():
+            self.conn.execute("DELETE FROM edges")
+            self.conn.execute("DELETE FROM nodes")
+            self.conn.execute("DELETE FROM name_trigrams")
+            for node in data.get("nodes", {}).values():
+                self._write_node(node)
+                self._index_name(node)
+            for edge in data.get("edges", []):
+                self._write_edge(edge)
+            self.set_meta("next_id", data.get("next_id", 1))
+
+    def get_node(self, node_id):
+        return self._node(self.conn.execute("SELECT * FROM nodes WHERE id = ?", (node_id,)).fetchone())
+
+    def upsert_node(self, node_id, name, type_, properties=None, contexts=(), mentions=1, now=None):
+        with self.transaction():
+            existing = self.get_node(node_id)
+            evicted = []
+            node = merge_node(existing, node_id, name, type_, properties, contexts, mentions, now,
+                              self.max_contexts, evicted)
+            if evicted and self.archive is not None:
+                self.archive.add(node_id, evicted)
+            self._write_node(node)
+            if existing is None:
+                self._index_name(node)
+        return node
+
+    def put_node(self, node):
+        with self.transaction():
+            self._write_node(node)
+            self._index_name(node)
+
+    def get_edge(self, source, target, relation):
+        return self._edge(self.conn.execute(
+            "SELECT * FROM edges WHERE source = ? AND target = ? AND relation = ?",
+            (source, target, relation),
+        ).fetchone())
+
+    def upsert_edge(self, source, target, relation, context="", weight=1, now=None):
+        with self.transaction():
+            edge = merge_edge(self.get_edge(source, target, relation), source, target, relation, context, weight, now)
+            self._write_edge(edge)
+        return edge
+
+    def edges_for(self, node_id, direction="both"):
+        """Yield edges leaving (`out`), entering (`in`) or touching a node."""
+        if direction in ("out", "both"):
+            for row in self.conn.execute("SELECT * FROM edges WHERE source = ?", (node_id,)).fetchall():
+                yield self._edge(row)
+        if direction in ("in", "both"):
+            for row in self.conn.execute("SELECT * FROM edges WHERE target = ?", (node_id,)).fetchall():
+                if direction == "both" and row["source"] == node_id:
+                    continue
+                yield self._edge(row)
+
+    def strong_edges(self, min_weight=2, limit=10):
+        """Return the heaviest edges with at least `min_weight`."""
+        rows = self.conn.execute(
+            "SELECT * FROM edges WHERE weight >= ? ORDER BY weight DESC LIMIT ?", (min_weight, limit)
+        ).fetchall()
+        return [self._edge(r) for r in rows]
+
+    def nodes_between(self, field, start=None, end=None):
+        """Nodes whose `field` timestamp lies in [start, end], oldest first."""
+        if field not in NODE_TIME_FIELDS:
+            raise ValueError(f"Not a time field: {field}")
+        start = start.isoformat() if start else ""
+        end = end.isoformat() if end else "\uffff"
+        rows = self.conn.execute(
+            f"SELECT * FROM nodes WHERE {field} >= ? AND {field} <= ? ORDER BY {field}", (start, end)
+        ).fetchall()
+        return [self._node(r) for r in rows]
+
+    def edges_between(self, start=None, end=None):
+        """Edges last seen in [start, end], oldest first."""
+        start = start.isoformat() if start else ""
+        end = end.isoformat() if end else "\uffff"
+        rows = self.conn.execute(
+            "SELECT * FROM edges WHERE COALESCE(last_seen, created_at) >= ? "
+            "AND COALESCE(last_seen, created_at) <= ? ORDER BY COALESCE(last_seen, created_at)",
+            (start, end),
+        ).fetchall()
+        return [self._edge(r) for r in rows]
+
+    def find_by_name(self, name):
+        rows = self.conn.execute("SELECT * FROM nodes WHERE lower(name) = lower(?)", (name,)).fetchall()
+        return [self._node(r) for r in rows]
+
+    def find_by_prefix(self, prefix, limit=10):
+        # Range scan on the lower(name) index; chr(0x10ffff) sorts after any continuation
+        rows = self.conn.execute(
+            "SELECT * FROM nodes WHERE lower(name) >= lower(?) AND lower(name) < lower(?) "
+            "ORDER BY lower(name) LIMIT ?",
+            (prefix, prefix + chr(0x10ffff), limit),
+        ).fetchall()
+        return [self._node(r) for r in rows]
+
+    def find_similar(self, name, limit=10, min_score=0.3):
+        """(score, node) pairs ranked by trigram similarity."""
+        query = trigrams(name)
+        if not query:
+            return []
+        marks = ",".join("?" * len(query))
+        rows = self.conn.execute(
+            f"SELECT n.* FROM nodes n JOIN ("
+            f"  SELECT node_id, COUNT(*) AS shared FROM name_trigrams WHERE trigram IN ({marks}) "
+            f"  GROUP BY node_id ORDER BY shared DESC LIMIT ?"
+            f") t ON t.node_id = n.id",
+            (*query, max(limit * 20, 200)),
+        ).fetchall()
+        scored = []
+        for row in rows:
+            score = similarity(query, trigrams(row["name"]))
+            if score >= min_score:
+                scored.append((score, self._node(row)))
+        scored.sort(key=lambda x: (-x[0], x[1]["name"].lower()))
+        return scored[:limit]
+
+    def nodes_by_type(self, type_):
+        rows = self.conn.execute("SELECT * FROM nodes WHERE type = ?", (type_,)).fetchall()
+        return [self._node(r) for r in rows]
+
+    def iter_nodes(self):
+        for row in self.conn.execute("SELECT * FROM nodes"):
+            yield self._node(row)
+
+    def iter_edges(self):
+        for row in self.conn.execute("SELECT * FROM edges"):
+            yield self._edge(row)
+
+    def count_nodes(self):
+        return self.conn.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+
+    def count_edges(self):
+        return self.conn.execute("SELECT COUNT(*) FROM edges").fetchone()[0]
+
+    def size_bytes(self):
+        return sum(p.stat().st_size for p in (self.path, Path(f"{self.path}-wal")) if p.exists())
+
+    def vacuum(self):
+        """Checkpoint the WAL and rebuild the database file to drop free pages."""
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        self.conn.execute("VACUUM")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def migrate_json(self, json_path):
+        """Import a legacy JSON graph (snapshot plus journal). Returns (nodes, edges) imported.
+
+        The import and the `migrated_from` mark are one transaction: an import
+        that fails part way leaves neither behind.
+        """
+        data = JsonStore(json_path).load()
+        data.pop("journal_seq", None)
+        with self.transaction():
+            self.save(data)
+            self.set_meta("migrated_from", json_path)
+            self.set_meta("migrated_at", datetime.now().isoformat())
+        return len(data.get("nodes", {})), len(data.get("edges", []))
+
+    def close(self):
+        self.conn.close()
+
+def open_store(backend, json_path, db_path):
+    """Open the configured backend, migrating the JSON file into SQLite once.
+
+    The database records a completed migration itself, so one that failed
+    (say on a corrupt JSON file) is tried again on the next open rather than
+    leaving an empty graph. A database that already holds nodes of its own
+    is never overwritten.
+    """
+    if backend == "json":
+        return JsonStore(json_path)
+    if backend != "sqlite":
+        raise ValueError(f"Unknown storage backend: {backend} (expected one of {', '.join(BACKENDS)})")
+    store = SqliteStore(db_path)
+    if Path(json_path).exists() and store.get_meta("migrated_from") is None and not store.count_nodes():
+        store.migrate_json(str(json_path))
+    return store
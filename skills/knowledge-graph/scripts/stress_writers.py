@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+knowledge-graph: Concurrent-writer benchmark
+
+Starts N writer processes that hammer one graph at the same time (like
+several cron jobs running `graph.py process` together) while a reader
+keeps re-reading it, and reports commits per second for each backend.
+Afterwards every mention, edge weight and context must be accounted for,
+and the reader must never have seen a torn file.
+
+tests/test_storage.py runs a small version of the same check (writer()
+and check() below) with the rest of the test suite.
+"""
+import json
+import multiprocessing
+import sqlite3
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from contexts import ContextArchive
+from storage import BACKENDS, open_store
+
+SHARED_ID = "shared"
+
+def paths(workdir):
+    workdir = Path(workdir)
+    return workdir / "graph.json", workdir / "graph.db", workdir / "contexts.db"
+
+def writer(workdir, backend, worker, rounds, start):
+    json_path, db_path, contexts_db = paths(workdir)
+    store = open_store(backend, json_path, db_path)
+    store.archive = ContextArchive(contexts_db)
+    own_id = f"w{worker}"
+    start.wait()
+    for i in range(rounds):
+        with store.transaction():
+            store.upsert_node(SHARED_ID, "Shared", "concept", contexts=[f"{own_id} round {i}"])
+            store.upsert_node(own_id, f"Writer {worker}", "person", contexts=[f"round {i}"])
+            store.upsert_edge(own_id, SHARED_ID, "works_with")
+            store.upsert_edge(SHARED_ID, "hub", "related_to")
+    store.archive.close()
+    store.close()
+
+def reader(workdir, backend, stop, torn):
+    """Re-read the graph until told to stop, counting reads that failed to parse."""
+    json_path, db_path, _ = paths(workdir)
+    while not stop.is_set():
+        try:
+            if backend == "json":
+                if json_path.exists():
+                    with open(json_path) as f:
+                        json.load(f)
+            elif db_path.exists():
+                conn = sqlite3.connect(str(db_path), timeout=30)
+                conn.execute("SELECT COUNT(*) FROM nodes").fetchone()
+                conn.close()
+        except (ValueError, sqlite3.DatabaseError):
+            with torn.get_lock():
+                torn.value += 1
+
+def check(workdir, backend, writers, rounds):
+    """Return a list of problems found in the final graph (empty when consistent)."""
+    json_path, db_path, contexts_db = paths(workdir)
+    store = open_store(backend, json_path, db_path)
+    archive = ContextArchive(contexts_db)
+    total = writers * rounds
+    problems = []
+
+    def expect(label, actual, wanted):
+        if actual != wanted:
+            problems.append(f"{label}: expected {wanted}, got {actual}")
+
+    shared = store.get_node(SHARED_ID) or {}
+    expect("shared mentions", shared.get("mentions"), total)
+    expect("hub edge weight", (store.get_edge(SHARED_ID, "hub", "related_to") or {}).get("weight"), total)
+    for worker in range(writers):
+        own_id = f"w{worker}"
+        expect(f"{own_id} mentions", (store.get_node(own_id) or {}).get("mentions"), rounds)
+        expect(f"{own_id} edge weight", (store.get_edge(own_id, SHARED_ID, "works_with") or {}).get("weight"), rounds)
+    kept = set(shared.get("contexts", []))
+    archived = set(archive.get(SHARED_ID, limit=total))
+    expect("shared contexts kept or archived", len(kept | archived), total)
+    archive.close()
+    store.close()
+    return problems
+
+def run(backend, writers, rounds):
+    ctx = multiprocessing.get_context("fork" if sys.platform != "win32" else "spawn")
+    with tempfile.TemporaryDirectory() as workdir:
+        start, stop = ctx.Event(), ctx.Event()
+        torn = ctx.Value("i", 0)
+        procs = [ctx.Process(target=writer, args=(workdir, backend, w, rounds, start)) for w in range(writers)]
+        watcher = ctx.Process(target=reader, args=(workdir, backend, stop, torn))
+        for p in procs:
+            p.start()
+        watcher.start()
+        began = time.perf_counter()
+        start.set()
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - began
+        stop.set()
+        watcher.join()
+        problems = check(workdir, backend, writers, rounds)
+        if any(p.exitcode for p in procs):
+            problems.append("a writer process failed")
+        if torn.value:
+            problems.append(f"reader saw {torn.value} torn reads")
+    commits = writers * rounds
+    status = "OK" if not problems else "FAILED"
+    print(f"{backend:>6}: {writers} writers x {rounds} commits in {elapsed:.2f}s "
+          f"({commits / elapsed:.0f} commits/s) — {status}")
+    for problem in problems:
+        print(f"    {problem}")
+    return not problems
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in ("--help", "-h"):
+        print("Usage: stress_writers.py [writers] [rounds] [backend]")
+        print("")
+        print("Benchmark parallel writers against one graph and verify no mentions are lost.")
+        print(f"Backends: {', '.join(BACKENDS)} (default: both)")
+        print("")
+        print("Examples:")
+        print("  stress_writers.py")
+        print("  stress_writers.py 16 50 json")
+        sys.exit(0)
+
+    writers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+    backends = [sys.argv[3]] if len(sys.argv) > 3 else list(BACKENDS)
+    ok = all([run(backend, writers, rounds) for backend in backends])
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
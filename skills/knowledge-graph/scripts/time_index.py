@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+knowledge-graph: Sorted time index for range queries
+
+Keys are kept ordered by epoch seconds so "added in the last N hours" or
+"strengthened this week" is a binary search instead of a full scan that
+parses every timestamp.
+"""
+import bisect
+from datetime import datetime
+
+def to_epoch(value):
+    """Epoch seconds for an ISO string or datetime (None stays None)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value.timestamp()
+
+class TimeIndex:
+    """(epoch, key) pairs kept sorted; timestamps are parsed once, on insert."""
+
+    def __init__(self, items=()):
+        pairs = []
+        for timestamp, key in items:
+            epoch = to_epoch(timestamp)
+            if epoch is not None:
+                pairs.append((epoch, key))
+        pairs.sort(key=lambda p: p[0])
+        self.epochs = [p[0] for p in pairs]
+        self.keys = [p[1] for p in pairs]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, timestamp, key):
+        epoch = to_epoch(timestamp)
+        if epoch is None:
+            return
+        i = bisect.bisect_right(self.epochs, epoch)
+        self.epochs.insert(i, epoch)
+        self.keys.insert(i, key)
+
+    def remove(self, timestamp, key):
+        epoch = to_epoch(timestamp)
+        if epoch is None:
+            return
+        i = bisect.bisect_left(self.epochs, epoch)
+        while i < len(self.epochs) and self.epochs[i] == epoch:
+            if self.keys[i] == key:
+                del self.epochs[i]
+                del self.keys[i]
+                return
+            i += 1
+
+    def move(self, old_timestamp, new_timestamp, key):
+        """Re-index `key` after its timestamp changed."""
+        if old_timestamp != new_timestamp:
+            self.remove(old_timestamp, key)
+            self.add(new_timestamp, key)
+
+    def between(self, start=None, end=None):
+        """Keys with start <= time <= end (either bound optional), oldest first."""
+        lo = 0 if start is None else bisect.bisect_left(self.epochs, to_epoch(start))
+        hi = len(self.epochs) if end is None else bisect.bisect_right(self.epochs, to_epoch(end))
+        return self.keys[lo:hi]
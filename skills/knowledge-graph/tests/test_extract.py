@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from graph import extract_entities, extract_relationships
+
+def edges(text):
+    return [(r["source"]["name"], r["relation"], r["target"]["name"])
+            for r in extract_relationships(text, extract_entities(text))]
+
+def test_entities_come_in_document_order():
+    assert [e["name"] for e in extract_entities("Docker runs on Linux for @dana at Google")] == [
+        "Docker", "Linux", "@dana", "Google"]
+
+@pytest.mark.parametrize("text, expected", [
+    ("Steve uses Python", [("Steve", "uses", "Python")]),
+    ("Python created by Steve", [("Python", "created_by", "Steve")]),
+    ("TaskMaster depends on SQLite", [("TaskMaster", "depends_on", "SQLite")]),
+    ("SQLite is part of TaskMaster", [("SQLite", "part_of", "TaskMaster")]),
+])
+def test_edges_point_from_the_first_mention(text, expected):
+    assert edges(text) == expected
@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from paths import shortest_path
+
+def neighbors(edges):
+    adjacency = {}
+    for source, target, weight in edges:
+        adjacency.setdefault(source, []).append((target, {"source": source, "target": target, "weight": weight}))
+    return lambda node: adjacency.get(node, [])
+
+# A->B->C is the cheap way to C (heavy edges are short) but too deep to reach T within 2 hops
+DEEP_CHEAP = neighbors([("A", "B", 10), ("A", "C", 1), ("B", "C", 10), ("C", "T", 1)])
+
+def test_weighted_depth_cap_keeps_shallower_route():
+    path = shortest_path(DEEP_CHEAP, None, "A", "T", "weighted", 2)
+    assert path["nodes"] == ["A", "C", "T"]
+    assert path["cost"] == 2.0
+    assert shortest_path(DEEP_CHEAP, None, "A", "T", "bfs", 2)["nodes"] == ["A", "C", "T"]
+
+def test_weighted_without_cap_takes_cheapest_route():
+    path = shortest_path(DEEP_CHEAP, None, "A", "T", "weighted")
+    assert path["nodes"] == ["A", "B", "C", "T"]
+    assert [e["target"] for e in path["edges"]] == ["B", "C", "T"]
+    assert abs(path["cost"] - 1.2) < 1e-9
+
+def test_weighted_respects_cap():
+    assert shortest_path(DEEP_CHEAP, None, "A", "T", "weighted", 1) is None
+
+def test_weighted_without_cap_expands_each_node_once():
+    # A cheap deep chain s->a0->...->a20, plus a dear direct edge to every a_i:
+    # each a_i is settled deep first and reached shallower later
+    layers = [("s", "a0", 100)] + [(f"a{i}", f"a{i + 1}", 100) for i in range(20)]
+    layers += [("s", f"a{i}", 1) for i in range(1, 21)]
+    forward = neighbors(layers)
+    expanded = []
+    def counting(node):
+        expanded.append(node)
+        return forward(node)
+    assert shortest_path(counting, None, "s", "missing", "weighted") is None
+    assert sorted(expanded) == sorted(set(expanded))
@@ -0,0 +1,84 @@
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+from server import GraphDaemon
+
+class CountingStore:
+    """Stands in for the graph: a write counter plus the committed log position."""
+
+    def __init__(self):
+        self.count = 0
+        self.queued = 0
+        self.applied = 0
+
+    def write(self, n=1):
+        self.queued += n
+        return {}
+
+    def commit(self, last_seq):
+        self.count, self.queued, self.applied = self.count + self.queued, 0, last_seq
+
+def daemon(tmp_path, store):
+    return GraphDaemon(tmp_path / "s.sock", tmp_path / "pending.jsonl", {}, {"add": store.write},
+                       store.commit, lambda: store.applied)
+
+def test_recover_skips_writes_committed_before_a_crash(tmp_path):
+    store = CountingStore()
+    first = daemon(tmp_path, store)
+    first.recover()
+    for _ in range(3):
+        first.handle({"op": "add"})
+    first._flush(first.log.seq)  # committed, then the process dies before clearing the log
+    first.handle({"op": "add"})  # acknowledged but never committed
+    store.queued = 0  # lost with the process
+
+    second = daemon(tmp_path, store)
+    assert second.recover() == 1
+    assert store.count == 4
+    assert daemon(tmp_path, store).recover() == 0
+
+    second.handle({"op": "add"})
+    second.flush()
+    assert store.count == 5 and store.applied == 5
+
+@pytest.fixture
+def graph_daemon(tmp_path, monkeypatch):
+    """The daemon `graph.py serve` would run, over a fresh sqlite graph, without its socket loop."""
+    import graph
+    monkeypatch.setattr(graph, "GRAPH_FILE", tmp_path / "graph.json")
+    monkeypatch.setattr(graph, "GRAPH_DB", tmp_path / "graph.db")
+    monkeypatch.setattr(graph, "CONTEXTS_DB", tmp_path / "contexts.db")
+    monkeypatch.setattr(graph, "STORAGE_BACKEND", "sqlite")
+    monkeypatch.setattr(graph, "SOCKET_FILE", tmp_path / "graph.sock")
+    monkeypatch.setattr(graph, "WRITE_BEHIND_LOG", tmp_path / "pending.jsonl")
+    monkeypatch.setattr(graph, "_store", None)
+    started = []
+    monkeypatch.setattr(GraphDaemon, "serve_forever", lambda self: started.append(self))
+    graph.serve()
+    yield graph, started[0]
+    graph.get_store().close()
+
+def test_failed_commit_keeps_queued_writes(graph_daemon, monkeypatch):
+    graph, daemon = graph_daemon
+    daemon.handle({"op": "process", "text": "Python uses Docker"})
+    daemon.handle({"op": "process", "text": "Python"})
+
+    store = graph.get_store()
+    def busy(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+    with monkeypatch.context() as m:
+        m.setattr(store, "upsert_edge", busy)
+        assert not daemon.try_flush()
+    assert daemon.pending == 2 and daemon.log.path.exists()
+
+    # The next flush commits both writes, with nothing half-applied by the failed one
+    assert daemon.try_flush()
+    assert not daemon.log.path.exists()
+    assert [n["mentions"] for n in store.find_by_name("Python")] == [2]
+    assert store.count_edges() == 1
+    assert int(store.get_meta("write_behind_seq")) == 2
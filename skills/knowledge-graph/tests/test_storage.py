@@ -0,0 +1,88 @@
+import multiprocessing
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import stress_writers
+from storage import JsonStore, SqliteStore, open_store
+
+def open_stores(tmp_path):
+    return {
+        "json": lambda: JsonStore(tmp_path / "graph.json"),
+        "sqlite": lambda: SqliteStore(tmp_path / "graph.db"),
+    }
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_failed_transaction_persists_nothing(tmp_path, backend):
+    open_store = open_stores(tmp_path)[backend]
+    store = open_store()
+    with store.transaction():
+        store.upsert_node("a", "Alpha", "concept")
+
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.upsert_node("a", "Alpha", "concept")
+            store.upsert_node("b", "Beta", "concept")
+            store.upsert_edge("a", "b", "related_to")
+            raise RuntimeError("boom")
+
+    for view in (store, open_store()):
+        assert view.get_node("a")["mentions"] == 1
+        assert view.get_node("b") is None
+        assert view.count_edges() == 0
+
+    # The store keeps working after the rollback
+    with store.transaction():
+        store.upsert_node("b", "Beta", "concept")
+    assert open_store().get_node("b")["mentions"] == 1
+
+def test_failed_migration_is_retried(tmp_path):
+    json_path, db_path = tmp_path / "graph.json", tmp_path / "graph.db"
+    json_path.write_text('{"nodes": {"a": ')  # cut off mid-write
+    with pytest.raises(ValueError):
+        open_store("sqlite", json_path, db_path)
+    assert db_path.exists()
+
+    json_path.unlink()  # repaired
+    legacy = JsonStore(json_path)
+    with legacy.transaction():
+        legacy.upsert_node("a", "Alpha", "concept")
+    store = open_store("sqlite", json_path, db_path)
+    assert store.get_node("a")["name"] == "Alpha"
+    assert store.get_meta("migrated_from") == str(json_path)
+
+    # Migrated once: later writes are not replaced by the JSON file again
+    with store.transaction():
+        store.upsert_node("b", "Beta", "concept")
+    store.close()
+    assert open_store("sqlite", json_path, db_path).count_nodes() == 2
+
+def test_migration_never_overwrites_native_nodes(tmp_path):
+    json_path, db_path = tmp_path / "graph.json", tmp_path / "graph.db"
+    store = open_store("sqlite", json_path, db_path)
+    with store.transaction():
+        store.upsert_node("b", "Beta", "concept")
+    store.close()
+    legacy = JsonStore(json_path)
+    with legacy.transaction():
+        legacy.upsert_node("a", "Alpha", "concept")
+    store = open_store("sqlite", json_path, db_path)
+    assert store.get_node("b") is not None and store.get_node("a") is None
+
+@pytest.mark.parametrize("backend", ["json", "sqlite"])
+def test_parallel_writers_lose_nothing(tmp_path, backend):
+    ctx = multiprocessing.get_context("fork" if sys.platform != "win32" else "spawn")
+    writers, rounds = 4, 10
+    start = ctx.Event()
+    procs = [ctx.Process(target=stress_writers.writer, args=(tmp_path, backend, w, rounds, start))
+             for w in range(writers)]
+    for p in procs:
+        p.start()
+    start.set()
+    for p in procs:
+        p.join(timeout=120)
+    assert [p.exitcode for p in procs] == [0] * writers
+    assert stress_writers.check(tmp_path, backend, writers, rounds) == []
@@ -4,6 +4,7 @@ Morning Brief Skill - Personalized daily briefing for Rajesh
 Sends daily at 9-10 AM IST via cron
 """
 import subprocess
+import sys
 import json
 from datetime import datetime
 from pathlib import Path
@@ -49,13 +50,9 @@ def get_weather():
 def get_tasks():
     """Get today's tasks from task-master"""
     try:
-        result = subprocess.run(
-            ['python3', '/home/ubuntu/clawd/skills/task-master/scripts/check_reminders.py', '--hours', '24'],
-            capture_output=True,
-            text=True,
-            timeout=10
-        )
-        return result.stdout.strip() if result.stdout.strip() else "No urgent tasks for today"
+        sys.path.insert(0, "/home/ubuntu/clawd/skills/task-master/scripts")
+        from task_queries import reminders
+        return reminders(24) or "No urgent tasks for today"
     except:
         return "Task check unavailable"
 
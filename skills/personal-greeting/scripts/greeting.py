@@ -13,7 +13,7 @@ from pathlib import Path
 os.environ['TZ'] = 'Asia/Kolkata'
 
 # Paths
-TASKS_FILE = Path("/home/ubuntu/clawd/memory/tasks.json")
+TASK_SCRIPTS = Path(__file__).resolve().parents[2] / "task-master" / "scripts"
 LESSONS_FILE = Path("/home/ubuntu/clawd/memory/lessons.json")
 GRAPH_FILE = Path("/home/ubuntu/clawd/memory/knowledge_graph.json")
 MEMORY_DIR = Path("/home/ubuntu/clawd/memory")
@@ -114,69 +114,54 @@ def get_sleep_pattern():
     except:
         return "Activity pattern unavailable."
 
+def task_queries():
+    """task-master's shared query module (one cached read per greeting)."""
+    sys.path.insert(0, str(TASK_SCRIPTS))
+    import task_queries
+    return task_queries
+
 def get_today_tasks():
     """Get today's tasks from task-master."""
-    if not TASKS_FILE.exists():
-        return []
-    
     try:
-        with open(TASKS_FILE) as f:
-            data = json.load(f)
-            today = get_current_time().strftime("%Y-%m-%d")
-            
-            # Get open tasks with today's deadline or no deadline
-            tasks = []
-            for task in data.get("tasks", []):
-                if task.get("status") == "open":
-                    deadline = task.get("deadline", "")
-                    if not deadline or deadline.startswith(today):
-                        tasks.append(task)
-            
-            return tasks[:5]  # Top 5
+        today = get_current_time().strftime("%Y-%m-%d")
+        
+        # Get open tasks with today's deadline or no deadline
+        tasks = []
+        for task in task_queries().open_tasks(sort_by=None):
+            if task.get("status") == "open":
+                deadline = task.get("deadline") or ""
+                if not deadline or deadline.startswith(today):
+                    tasks.append(task)
+        
+        return tasks[:5]  # Top 5
     except:
         return []
 
 def get_today_accomplishments():
     """Get today's completed tasks."""
-    if not TASKS_FILE.exists():
-        return []
-    
     try:
-        with open(TASKS_FILE) as f:
-            data = json.load(f)
-            today = get_current_time().strftime("%Y-%m-%d")
-            
-            completed_today = []
-            for task in data.get("tasks", []):
-                if task.get("status") == "completed":
-                    completed_at = task.get("completed_at", "")
-                    if completed_at.startswith(today):
-                        completed_today.append(task)
-            
-            return completed_today
+        today = get_current_time().strftime("%Y-%m-%d")
+        
+        # Completed tasks are archived by completion day
+        return task_queries().completed_on(today)
     except:
         return []
 
 def get_tomorrow_priority():
     """Get high priority tasks for tomorrow."""
-    if not TASKS_FILE.exists():
-        return []
-    
     try:
-        with open(TASKS_FILE) as f:
-            data = json.load(f)
-            tomorrow = (get_current_time() + timedelta(days=1)).strftime("%Y-%m-%d")
-            
-            priorities = []
-            for task in data.get("tasks", []):
-                if task.get("status") == "open":
-                    deadline = task.get("deadline", "")
-                    priority = task.get("priority", "medium")
-                    # Include critical/high priority or tasks due tomorrow
-                    if priority in ["critical", "high"] or deadline.startswith(tomorrow):
-                        priorities.append(task)
-            
-            return priorities[:3]
+        tomorrow = (get_current_time() + timedelta(days=1)).strftime("%Y-%m-%d")
+        
+        priorities = []
+        for task in task_queries().open_tasks(sort_by=None):
+            if task.get("status") == "open":
+                deadline = task.get("deadline") or ""
+                priority = task.get("priority", "medium")
+                # Include critical/high priority or tasks due tomorrow
+                if priority in ["critical", "high"] or deadline.startswith(tomorrow):
+                    priorities.append(task)
+        
+        return priorities[:3]
     except:
         return []
 
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+self-improving: Lesson access statistics, kept out of the lesson store
+
+Lookups only note which lessons they returned. The notes are written as one
+batch when the process exits (or on flush()), after results have been shown,
+so reads never rewrite the lesson store and can run side by side. Reading
+counts opens the database read-only and never creates it. Counts live in
+a small SQLite table and add to the `accessed_count` already stored on each
+lesson from before this table existed.
+"""
+import atexit
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+def create_table(conn, schema="main"):
+    conn.execute(
+        f"CREATE TABLE IF NOT EXISTS {schema}.access ("
+        "lesson_id INTEGER PRIMARY KEY, count INTEGER NOT NULL DEFAULT 0, last_accessed TEXT)"
+    )
+
+class AccessStats:
+    """Per-lesson access counters with batched, deferred writes."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._conn = None
+        self._pending = {}  # lesson id -> [count, last_accessed]
+        self._registered = False
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            create_table(self._conn)
+        return self._conn
+
+    def record(self, lesson_ids):
+        """Count an access to each lesson; written on flush() or at exit."""
+        now = datetime.now().isoformat()
+        for lesson_id in lesson_ids:
+            entry = self._pending.setdefault(lesson_id, [0, now])
+            entry[0] += 1
+            entry[1] = now
+        if self._pending and not self._registered:
+            atexit.register(self.flush)
+            self._registered = True
+
+    def flush(self):
+        """Write pending counts in one transaction. Returns how many lessons were updated."""
+        if not self._pending:
+            return 0
+        rows = [(lesson_id, n, last) for lesson_id, (n, last) in self._pending.items()]
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO access (lesson_id, count, last_accessed) VALUES (?, ?, ?) "
+                "ON CONFLICT(lesson_id) DO UPDATE SET count = count + excluded.count, "
+                "last_accessed = excluded.last_accessed",
+                rows,
+            )
+        self._pending = {}
+        return len(rows)
+
+    def _query(self, sql, params=()):
+        """Rows of a read against the table, without creating it ([] if there is none yet)."""
+        if self._conn is None and not self.path.exists():
+            return []
+        conn = self._conn or sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=30)
+        try:
+            return conn.execute(sql, params).fetchall()
+        except sqlite3.OperationalError:
+            return []
+        finally:
+            if conn is not self._conn:
+                conn.close()
+
+    def stamp(self):
+        """Changes whenever counts are flushed (rows, total, latest access); None without a table."""
+        rows = self._query("SELECT COUNT(*), TOTAL(count), MAX(last_accessed) FROM access")
+        return list(rows[0]) if rows else None
+
+    def merge(self, target, sources):
+        """Move the recorded accesses of lessons `sources` onto lesson `target`."""
+        self.flush()
+        sources = list(sources)
+        marks = ",".join("?" * len(sources))
+        with self.conn:
+            row = self.conn.execute(
+                f"SELECT SUM(count), MAX(last_accessed) FROM access WHERE lesson_id IN ({marks})", sources
+            ).fetchone()
+            if row[0]:
+                self.conn.execute(
+                    "INSERT INTO access (lesson_id, count, last_accessed) VALUES (?, ?, ?) "
+                    "ON CONFLICT(lesson_id) DO UPDATE SET count = count + excluded.count, "
+                    "last_accessed = MAX(COALESCE(last_accessed, ''), excluded.last_accessed)",
+                    (target, row[0], row[1]),
+                )
+            self.conn.execute(f"DELETE FROM access WHERE lesson_id IN ({marks})", sources)
+
+    def counts(self, lesson_ids=None):
+        """{lesson id: (count, last_accessed)}, including accesses not yet flushed. Never writes."""
+        if lesson_ids is None:
+            rows = self._query("SELECT lesson_id, count, last_accessed FROM access")
+        else:
+            ids = list(lesson_ids)
+            rows = self._query(
+                f"SELECT lesson_id, count, last_accessed FROM access WHERE lesson_id IN ({','.join('?' * len(ids))})",
+                ids,
+            ) if ids else []
+        result = {lesson_id: (n, last) for lesson_id, n, last in rows}
+        for lesson_id, (n, last) in self._pending.items():
+            if lesson_ids is None or lesson_id in lesson_ids:
+                base, _ = result.get(lesson_id, (0, None))
+                result[lesson_id] = (base + n, last)
+        return result
+
+    def apply(self, lessons):
+        """Fold recorded accesses into lesson dicts (accessed_count, last_accessed)."""
+        counts = self.counts({lesson["id"] for lesson in lessons})
+        for lesson in lessons:
+            if lesson["id"] in counts:
+                n, last = counts[lesson["id"]]
+                lesson["accessed_count"] = lesson.get("accessed_count", 0) + n
+                lesson["last_accessed"] = max(filter(None, [lesson.get("last_accessed"), last]), default=None)
+        return lessons
+
+    def close(self):
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -3,62 +3,178 @@
 Check for lessons that should be surfaced before starting similar tasks
 """
 import sys
+import heapq
 import json
+import os
 from pathlib import Path
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 
-LESSONS_FILE = Path("/home/ubuntu/clawd/memory/lessons.json")
+from lesson_store import ACCESS_FILE, LESSONS_DIR, LESSONS_FILE, RECENT_FILE, LessonStore
+
+CACHE_FILE = LESSONS_FILE.with_name("lessons_check_cache.json")
 SHOWN_FILE = Path("/home/ubuntu/clawd/memory/lessons-shown-today.json")
 
-def load_lessons():
-    if LESSONS_FILE.exists():
-        with open(LESSONS_FILE) as f:
-            return json.load(f)
-    return {"lessons": []}
+# Results kept in the cache (one per distinct store/shown-today state)
+CACHE_ENTRIES = 8
+
+_store = None
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = LessonStore(LESSONS_DIR, LESSONS_FILE)
+    return _store
+
+def load_lessons(category="", since=""):
+    """Lessons from the shards matching `category` / logged `since` (all by default)."""
+    return {"lessons": get_store().lessons(category, since)}
 
-def get_recent_errors(hours=48):
-    """Get recent errors that might be relevant (excluding resolved)."""
-    from datetime import datetime, timedelta
+def lessons_version():
+    """Identifies the current contents of the lesson store, as learner.py does."""
+    return get_store().version()
+
+def load_recent_view():
+    """The writer-maintained recent-errors view, or None if it doesn't match the store."""
+    try:
+        with open(RECENT_FILE) as f:
+            view = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return view if view.get("source") == lessons_version() else None
+
+def get_recent_errors(hours=48, data=None, view=None):
+    """Get recent errors that might be relevant (excluding resolved).
     
-    data = load_lessons()
-    cutoff = datetime.now() - timedelta(hours=hours)
+    Reads the writer-maintained view when it is current and covers `hours`,
+    otherwise scans `data` (loading only recently logged error shards if not given).
+    """
+    cutoff = (datetime.now() - timedelta(hours=hours)).isoformat()
+    if data is None:
+        view = view or load_recent_view()
+        if view is None or view.get("hours", 0) < hours:
+            data = load_lessons("error", since=cutoff)
+    lessons = data["lessons"] if data is not None else view["errors"]
     
     recent = []
-    for lesson in data["lessons"]:
+    for lesson in lessons:
         # Skip resolved lessons
         if lesson.get("outcome") == "resolved":
             continue
-        if lesson["category"] == "error":
-            created = datetime.fromisoformat(lesson["created_at"])
-            if created > cutoff:
-                recent.append(lesson)
+        # ISO timestamps written by learner.py compare correctly as strings
+        if lesson["category"] == "error" and (lesson.get("last_seen") or lesson["created_at"]) > cutoff:
+            recent.append(lesson)
     
     return recent
 
-def get_high_impact_lessons(min_accessed=2):
-    """Get frequently-accessed lessons (high value), excluding resolved."""
-    data = load_lessons()
-    
-    # Load already-shown lessons for today
-    shown_today = set()
+def load_shown_today():
+    """Ids of lessons already shown today."""
     if SHOWN_FILE.exists():
         try:
             with open(SHOWN_FILE) as f:
                 shown_data = json.load(f)
                 if shown_data.get("date") == str(date.today()):
-                    shown_today = set(shown_data.get("lessons", []))
+                    return set(shown_data.get("lessons", []))
         except:
             pass
+    return set()
+
+def get_high_impact_lessons(min_accessed=2, data=None, view=None):
+    """Get frequently-accessed lessons (high value), excluding resolved.
+    
+    With a current view, only lessons whose stored plus recorded accesses reach
+    `min_accessed` are read; otherwise `data` (all lessons by default) is scanned.
+    """
+    from access_stats import AccessStats
+    
+    stats = AccessStats(ACCESS_FILE)
+    if data is None:
+        view = view or load_recent_view()
+    if data is None and view is not None and "accessed" in view:
+        # The view lists stored counts of unresolved lessons; recorded accesses add to them
+        totals = dict(view["accessed"])
+        for lesson_id, (n, _) in stats.counts().items():
+            totals[lesson_id] = totals.get(lesson_id, 0) + n
+        lessons = get_store().get([i for i, n in totals.items() if n >= min_accessed])
+    else:
+        lessons = (data or load_lessons())["lessons"]
+    stats.apply(lessons)
     
-    impactful = [
-        l for l in data["lessons"] 
+    # Load already-shown lessons for today
+    shown_today = load_shown_today()
+    
+    impactful = (
+        l for l in lessons 
         if l.get("accessed_count", 0) >= min_accessed 
         and l.get("outcome") != "resolved"
         and l["id"] not in shown_today  # Skip already shown today
-    ]
-    impactful.sort(key=lambda x: -x.get("accessed_count", 0))
+    )
+    return heapq.nlargest(5, impactful, key=lambda x: x.get("accessed_count", 0))
+
+def state_key():
+    """Everything the check's output depends on apart from the clock."""
+    from access_stats import AccessStats
+    
+    parts = [lessons_version(), str(date.today()), sorted(load_shown_today()), AccessStats(ACCESS_FILE).stamp()]
+    return json.dumps(parts)
+
+def load_cache():
+    try:
+        with open(CACHE_FILE) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def cached_result(key):
+    """(output, shown ids) from an earlier run in the same state, if still valid."""
+    entry = load_cache().get(key)
+    if entry is None:
+        return None
+    if entry["valid_until"] and datetime.now().isoformat() >= entry["valid_until"]:
+        return None  # a listed error has aged out of the window
+    return entry["output"], entry["shown"]
+
+def cache_result(key, output, shown_ids, valid_until):
+    cache = load_cache()
+    cache.pop(key, None)
+    cache[key] = {"output": output, "shown": sorted(shown_ids), "valid_until": valid_until}
+    for old in list(cache)[:-CACHE_ENTRIES]:
+        del cache[old]
+    CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = CACHE_FILE.with_name(CACHE_FILE.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, CACHE_FILE)
+
+def check(hours=48):
+    """Output lines, ids of high-value lessons shown, and when the result expires."""
+    view = load_recent_view()
+    data = None if view is not None and view.get("hours", 0) >= hours else load_lessons()
+    
+    # Check for recent errors
+    recent_errors = get_recent_errors(hours, data=data, view=view)
+    
+    output = []
+    
+    if recent_errors:
+        output.append(f"🚨 RECENT ERRORS (last {hours}h):")
+        for e in recent_errors[:3]:
+            output.append(f"  • #{e['id']}: {e['lesson'][:60]}")
     
-    return impactful[:5]
+    # Check for high-impact lessons
+    impactful = get_high_impact_lessons(data=data, view=view)
+    
+    shown_ids = set()
+    
+    if impactful:
+        output.append("\n📚 HIGH-VALUE LESSONS:")
+        for l in impactful[:3]:
+            output.append(f"  • #{l['id']} (used {l.get('accessed_count', 0)}x): {l['lesson'][:60]}")
+            shown_ids.add(l["id"])
+    
+    # The result changes without a write when the oldest listed error leaves the window
+    expiry = min((datetime.fromisoformat(e.get("last_seen") or e["created_at"]) for e in recent_errors), default=None)
+    valid_until = (expiry + timedelta(hours=hours)).isoformat() if expiry else None
+    return output, shown_ids, valid_until
 
 def mark_shown(lesson_ids):
     """Mark lessons as shown today."""
@@ -82,26 +198,13 @@ if __name__ == "__main__":
         sys.exit(0)
     
     try:
-        # Check for recent errors
-        recent_errors = get_recent_errors()
-        
-        output = []
-        
-        if recent_errors:
-            output.append("🚨 RECENT ERRORS (last 48h):")
-            for e in recent_errors[:3]:
-                output.append(f"  • #{e['id']}: {e['lesson'][:60]}")
-        
-        # Check for high-impact lessons
-        impactful = get_high_impact_lessons()
-        
-        shown_ids = set()
-        
-        if impactful:
-            output.append("\n📚 HIGH-VALUE LESSONS:")
-            for l in impactful[:3]:
-                output.append(f"  • #{l['id']} (used {l.get('accessed_count', 0)}x): {l['lesson'][:60]}")
-                shown_ids.add(l["id"])
+        key = state_key()
+        cached = cached_result(key)
+        if cached is not None:
+            output, shown_ids = cached
+        else:
+            output, shown_ids, valid_until = check()
+            cache_result(key, output, shown_ids, valid_until)
         
         if output:
             print("\n".join(output))
@@ -5,29 +5,185 @@ self-improving: Capture errors, lessons, and feedback to build institutional kno
 import json
 import sys
 import os
-from datetime import datetime
-from pathlib import Path
+from datetime import datetime, timedelta
 from typing import List, Dict, Optional
 
-LESSONS_FILE = Path("/home/ubuntu/clawd/memory/lessons.json")
+from access_stats import AccessStats
+from lesson_index import TOKENIZER_VERSION, LessonIndex
+from lesson_minhash import DuplicateIndex, cluster
+from lesson_store import ACCESS_FILE, COMPRESS_AFTER_MONTHS, LESSONS_DIR, LESSONS_FILE, RECENT_FILE, LessonStore
+from lesson_vectors import LessonVectors
 
-def load_lessons() -> Dict:
-    """Load lessons database."""
-    if LESSONS_FILE.exists():
-        with open(LESSONS_FILE) as f:
-            return json.load(f)
+INDEX_FILE = LESSONS_FILE.with_name("lessons_index.db")
+VECTORS_FILE = LESSONS_FILE.with_name("lessons_vectors")  # .f32 / .ids / .json
+DUPLICATES_FILE = LESSONS_FILE.with_name("lessons_minhash.db")
+
+# Hours of errors kept in the recent-errors view read by check_lessons.py
+RECENT_ERRORS_HOURS = 7 * 24
+
+_store = None
+
+def get_store() -> LessonStore:
+    """The sharded lesson store (importing a legacy lessons.json on first use)."""
+    global _store
+    if _store is None:
+        _store = LessonStore(LESSONS_DIR, LESSONS_FILE)
+    return _store
+
+def load_lessons(category: str = "", since: str = "") -> Dict:
+    """Load lessons database (only the shards matching `category` / logged `since`, if given)."""
+    store = get_store()
+    lessons = store.lessons(category, since)
+    patterns = {}
+    for lesson in lessons:
+        patterns.setdefault(lesson["category"], []).append(lesson["id"])
     return {
-        "lessons": [],
-        "patterns": {},
-        "tool_effectiveness": {},
-        "next_id": 1
+        "lessons": lessons,
+        "patterns": patterns,
+        "tool_effectiveness": store.manifest["tool_effectiveness"],
+        "next_id": store.next_id
     }
 
-def save_lessons(data: Dict):
-    """Save lessons database."""
-    LESSONS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(LESSONS_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+def lessons_version() -> str:
+    """Identifies the current contents of the lesson store."""
+    return get_store().version()
+
+def index_version() -> str:
+    """Source version recorded by the search, vector and duplicate indexes (store + tokenizer)."""
+    return f"{lessons_version()}/t{TOKENIZER_VERSION}"
+
+_index = None
+_vectors = None
+_duplicates = None
+_access = None
+
+def get_access_stats() -> AccessStats:
+    """Access counters, written in one batch when the process exits."""
+    global _access
+    if _access is None:
+        _access = AccessStats(ACCESS_FILE)
+    return _access
+
+def get_index() -> LessonIndex:
+    """Open the search index as it is (see sync_indexes())."""
+    global _index
+    if _index is None:
+        _index = LessonIndex(INDEX_FILE, ACCESS_FILE)
+    return _index
+
+def get_vectors() -> LessonVectors:
+    """Open the similarity vectors as they are (see sync_indexes())."""
+    global _vectors
+    if _vectors is None:
+        _vectors = LessonVectors(VECTORS_FILE)
+    return _vectors
+
+def get_duplicates() -> DuplicateIndex:
+    """Open the near-duplicate (MinHash/LSH) index as it is (see sync_indexes())."""
+    global _duplicates
+    if _duplicates is None:
+        _duplicates = DuplicateIndex(DUPLICATES_FILE)
+    return _duplicates
+
+def sync_indexes(force: bool = False) -> str:
+    """Rebuild the search, vector and duplicate indexes that no longer match the lesson store.
+    
+    Only writers (and `learner.py reindex`, which passes force=True) call this;
+    lookups use the indexes as they are and note when they are out of date.
+    Returns the version the indexes now match.
+    """
+    version = index_version()
+    lessons = None
+    for target in (get_index(), get_vectors(), get_duplicates()):
+        if force or not target.is_current(version):
+            if lessons is None:
+                lessons = load_lessons()["lessons"]
+            target.rebuild(lessons, version)
+    return version
+
+_stale_noted = set()
+
+def for_reading(target, label: str):
+    """`target` unchanged, with a note on stderr (once per process) if it lags behind the store."""
+    if label not in _stale_noted and not target.is_current(index_version()):
+        _stale_noted.add(label)
+        print(f"Note: the lesson {label} is out of date; run `learner.py reindex`", file=sys.stderr)
+    return target
+
+def save_lessons(data: Optional[Dict] = None, changed: Optional[List[Dict]] = None):
+    """Save lessons database.
+    
+    With `changed` (the lessons this save added or modified), only their shards
+    are rewritten and the index, vectors and duplicate index are updated in
+    place. Otherwise `data` replaces the whole store and they are rebuilt.
+    """
+    if changed is not None:
+        sync_indexes()
+    store = get_store()
+    previous = lessons_version()
+    if changed is not None:
+        store.put(changed)
+    else:
+        store.replace_all(data["lessons"], data.get("next_id"), data.get("tool_effectiveness"))
+    save_recent_view(lessons_version(), changed, previous)
+    if changed is None:
+        sync_indexes()
+        return
+    version = index_version()
+    for target in (get_index(), get_vectors(), get_duplicates()):
+        target.update(changed, version)
+
+def load_view(source: str) -> Optional[Dict]:
+    """The recent view, if it was written for this version (`source`) of the store."""
+    try:
+        with open(RECENT_FILE) as f:
+            view = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return view if view.get("source") == source else None
+
+def save_recent_view(version: str, changed: Optional[List[Dict]] = None, previous: str = ""):
+    """Write the view read by check_lessons.py.
+    
+    It holds the unresolved errors seen in the last RECENT_ERRORS_HOURS, and
+    [id, accessed_count] for every unresolved lesson with a stored access
+    count. With `changed`, the second list is carried over from the view of
+    the `previous` store version and patched, so the whole store is only read
+    when that view is missing or stale.
+    """
+    cutoff = (datetime.now() - timedelta(hours=RECENT_ERRORS_HOURS)).isoformat()
+    fields = ("id", "lesson", "category", "outcome", "created_at", "last_seen")
+    errors = [
+        {k: l[k] for k in fields if k in l} for l in get_store().lessons("error", since=cutoff)
+        if l.get("outcome") != "resolved"
+        and (l.get("last_seen") or l["created_at"]) > cutoff
+    ]
+    old = load_view(previous) if changed is not None else None
+    if old is not None and "accessed" in old:
+        accessed = dict(old["accessed"])
+        lessons = changed
+    else:
+        accessed = {}
+        lessons = get_store().lessons()
+    for l in lessons:
+        accessed.pop(l["id"], None)
+        if l.get("accessed_count") and l.get("outcome") != "resolved":
+            accessed[l["id"]] = l["accessed_count"]
+    tmp = RECENT_FILE.with_name(RECENT_FILE.name + ".tmp")
+    with open(tmp, 'w') as f:
+        json.dump({"source": version, "hours": RECENT_ERRORS_HOURS, "errors": errors,
+                   "accessed": sorted(accessed.items())}, f)
+    os.replace(tmp, RECENT_FILE)
+
+def merge_lessons(canonical: Dict, duplicates: List[Dict]) -> Dict:
+    """Fold near-duplicate lessons into `canonical` (occurrences, tags, access counts, last seen)."""
+    for dup in duplicates:
+        canonical["occurrences"] = canonical.get("occurrences", 1) + dup.get("occurrences", 1)
+        canonical["accessed_count"] = canonical.get("accessed_count", 0) + dup.get("accessed_count", 0)
+        seen = [canonical.get("last_seen") or canonical["created_at"], dup.get("last_seen") or dup["created_at"]]
+        canonical["last_seen"] = max(seen)
+        canonical["tags"] = list(dict.fromkeys((canonical.get("tags") or []) + (dup.get("tags") or [])))
+    return canonical
 
 def add_lesson(
     lesson: str,
@@ -35,11 +191,15 @@ def add_lesson(
     context: str = "",
     tool: str = "",
     outcome: str = "success",  # success, failure, partial
-    tags: List[str] = None
+    tags: List[str] = None,
+    merge: bool = True
 ) -> int:
-    """Add a new lesson to the knowledge base."""
-    data = load_lessons()
-    lesson_id = data["next_id"]
+    """Add a new lesson to the knowledge base.
+    
+    A near-duplicate of an existing lesson (same category) is merged into it
+    instead, and the existing lesson's id is returned.
+    """
+    lesson_id = get_store().next_id
     
     entry = {
         "id": lesson_id,
@@ -51,18 +211,24 @@ def add_lesson(
         "tags": tags or [],
         "created_at": datetime.now().isoformat(),
         "accessed_count": 0,
-        "last_accessed": None
+        "last_accessed": None,
+        "occurrences": 1
     }
     
-    data["lessons"].append(entry)
-    data["next_id"] = lesson_id + 1
-    
-    # Update category patterns
-    if category not in data["patterns"]:
-        data["patterns"][category] = []
-    data["patterns"][category].append(lesson_id)
+    if merge:
+        sync_indexes()
+    duplicate = get_duplicates().find_duplicate(entry) if merge else None
+    if duplicate:
+        canonical = next(iter(get_store().get([duplicate[1]])), None)
+        if canonical is not None:
+            merge_lessons(canonical, [entry])
+            if canonical.get("outcome") == "resolved":
+                canonical["outcome"] = outcome  # it happened again
+            save_lessons(changed=[canonical])
+            return canonical["id"]
     
-    save_lessons(data)
+    # Only this lesson's category/month shard and the manifest are rewritten
+    save_lessons(changed=[entry])
     return lesson_id
 
 def add_error(
@@ -109,33 +275,25 @@ def add_feedback(
     )
 
 def search_lessons(query: str = "", category: str = "", tool: str = "", limit: int = 5) -> List[Dict]:
-    """Search lessons by query, category, or tool."""
-    data = load_lessons()
-    results = []
-    
-    for lesson in data["lessons"]:
-        match = True
-        
-        if category and lesson["category"] != category:
-            match = False
-        if tool and lesson["tool"] != tool:
-            match = False
-        if query and query.lower() not in lesson["lesson"].lower() and query.lower() not in lesson.get("context", "").lower():
-            match = False
-        
-        if match:
-            results.append(lesson)
-    
-    # Sort by relevance (most accessed first, then newest)
-    results.sort(key=lambda x: (-x.get("accessed_count", 0), x["created_at"]), reverse=True)
+    """Search lessons by query (BM25 over lesson, context, tags, tool), category, or tool.
     
-    # Update access counts
-    for r in results[:limit]:
-        r["accessed_count"] = r.get("accessed_count", 0) + 1
-        r["last_accessed"] = datetime.now().isoformat()
+    With a query, results are ranked by relevance; without one, most accessed first, then newest.
+    Read-only: the access is recorded in lessons_access.db, not in the lesson store.
+    """
+    results = for_reading(get_index(), "search index").search(query, category, tool, limit)
     
-    save_lessons(data)
-    return results[:limit]
+    # Access counts go to their own table, so lookups never rewrite lesson shards
+    access = get_access_stats()
+    access.record(r["id"] for r in results)
+    return access.apply(results)
+
+def similar_lessons(text: str, limit: int = 5) -> List[Dict]:
+    """Lessons most similar to `text` (cosine over hashed TF-IDF vectors), best first."""
+    hits = for_reading(get_vectors(), "similarity vectors").search(text, limit)
+    results = for_reading(get_index(), "search index").get(lesson_id for _, lesson_id in hits)
+    access = get_access_stats()
+    access.record(r["id"] for r in results)
+    return access.apply(results)
 
 def get_tool_guidance(tool: str) -> List[Dict]:
     """Get accumulated wisdom about a specific tool."""
@@ -149,6 +307,35 @@ def get_preferences() -> List[Dict]:
     """Get user preferences from feedback."""
     return search_lessons(category="feedback", limit=10)
 
+def dedupe_lessons(dry_run: bool = False) -> List[List[int]]:
+    """Cluster near-duplicate lessons and merge each cluster into its oldest lesson.
+    
+    Returns the clusters as lists of ids, canonical id first.
+    """
+    data = load_lessons()
+    clusters = cluster(data["lessons"])
+    if dry_run or not clusters:
+        return clusters
+    
+    by_id = {l["id"]: l for l in data["lessons"]}
+    removed = set()
+    for ids in clusters:
+        canonical, rest = by_id[ids[0]], [by_id[i] for i in ids[1:]]
+        merge_lessons(canonical, rest)
+        get_access_stats().merge(canonical["id"], ids[1:])
+        removed.update(ids[1:])
+    
+    data["lessons"] = [l for l in data["lessons"] if l["id"] not in removed]
+    save_lessons(data)
+    return clusters
+
+def compress_lessons(older_than: int = COMPRESS_AFTER_MONTHS) -> List[str]:
+    """Compress old shards; the indexes are re-synced since the store's version changed."""
+    compressed = get_store().compress(older_than)
+    if compressed:
+        sync_indexes()
+    return compressed
+
 def format_lesson(lesson: Dict, verbose: bool = False) -> str:
     """Format a lesson for display."""
     lines = [
@@ -162,12 +349,14 @@ def format_lesson(lesson: Dict, verbose: bool = False) -> str:
         if lesson.get("tags"):
             lines.append(f"  Tags: {', '.join(lesson['tags'])}")
         lines.append(f"  Learned: {lesson['created_at'][:10]}")
+        if lesson.get("occurrences", 1) > 1:
+            lines.append(f"  Seen: {lesson['occurrences']}x, last {lesson['last_seen'][:10]}")
     return "\n".join(lines)
 
 def suggest_approach(task_description: str) -> str:
     """Suggest approach based on similar past tasks."""
-    # Search for relevant lessons
-    lessons = search_lessons(query=task_description, limit=5)
+    # Find lessons about similar tasks
+    lessons = similar_lessons(task_description, limit=5)
     
     if not lessons:
         return "No relevant lessons found for this type of task."
@@ -187,14 +376,24 @@ def suggest_approach(task_description: str) -> str:
     
     return "\n".join(output)
 
+def added_message(lesson_id: int, label: str) -> str:
+    """Confirmation for an add, noting when it was merged into an existing lesson."""
+    lesson = next(iter(get_index().get([lesson_id])), {})
+    if lesson.get("occurrences", 1) > 1:
+        return f"{label} #{lesson_id} seen again ({lesson['occurrences']}x), merged"
+    return f"{label} #{lesson_id} added"
+
 def main():
     if len(sys.argv) < 2 or sys.argv[1] in ("--help", "-h"):
         print("Usage: learner.py <command> [args]")
-        print("Commands: add-lesson, add-error, add-feedback, search, tool, errors, suggest")
+        print("Commands: add-lesson, add-error, add-feedback, search, tool, errors, suggest, dedupe, compress, reindex")
         print("\nExamples:")
         print("  learner.py search 'Python error handling'")
         print("  learner.py tool web_search")
         print("  learner.py errors")
+        print("  learner.py dedupe --dry-run")
+        print("  learner.py compress 3")
+        print("  learner.py reindex")
         sys.exit(0 if sys.argv[1] in ("--help", "-h") else 1)
     
     cmd = sys.argv[1]
@@ -205,7 +404,7 @@ def main():
             sys.exit(1)
         tags = sys.argv[5].split(",") if len(sys.argv) > 5 else []
         id = add_lesson(sys.argv[2], sys.argv[3], tool=sys.argv[4] if len(sys.argv) > 4 else "", tags=tags)
-        print(f"Lesson #{id} added")
+        print(added_message(id, "Lesson"))
     
     elif cmd == "add-error":
         if len(sys.argv) < 5:
@@ -214,7 +413,7 @@ def main():
         id = add_error(sys.argv[2], sys.argv[3], sys.argv[4], 
                       sys.argv[5] if len(sys.argv) > 5 else "",
                       sys.argv[6] if len(sys.argv) > 6 else "")
-        print(f"Error lesson #{id} added")
+        print(added_message(id, "Error lesson"))
     
     elif cmd == "add-feedback":
         if len(sys.argv) < 3:
@@ -224,7 +423,7 @@ def main():
                          sys.argv[3] if len(sys.argv) > 3 else "",
                          sys.argv[4] if len(sys.argv) > 4 else "",
                          sys.argv[5] if len(sys.argv) > 5 else "")
-        print(f"Feedback #{id} added")
+        print(added_message(id, "Feedback"))
     
     elif cmd == "search":
         query = sys.argv[2] if len(sys.argv) > 2 else ""
@@ -255,6 +454,25 @@ def main():
             sys.exit(1)
         print(suggest_approach(sys.argv[2]))
     
+    elif cmd == "dedupe":
+        dry_run = "--dry-run" in sys.argv
+        clusters = dedupe_lessons(dry_run=dry_run)
+        for ids in clusters:
+            print(f"#{ids[0]} <- {', '.join(f'#{i}' for i in ids[1:])}")
+        verb = "Would merge" if dry_run else "Merged"
+        print(f"{verb} {sum(len(c) - 1 for c in clusters)} duplicate(s) into {len(clusters)} lesson(s)")
+    
+    elif cmd == "compress":
+        months = int(sys.argv[2]) if len(sys.argv) > 2 else COMPRESS_AFTER_MONTHS
+        compressed = compress_lessons(months)
+        for key in compressed:
+            print(f"Compressed {key}")
+        print(f"{len(compressed)} shard(s) compressed")
+    
+    elif cmd == "reindex":
+        sync_indexes(force=True)
+        print(f"Reindexed {get_store().count()} lesson(s)")
+    
     else:
         print(f"Unknown command: {cmd}")
 
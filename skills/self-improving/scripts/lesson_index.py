@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+self-improving: Inverted index with BM25 ranking over lessons
+
+Kept in SQLite next to the lesson store: posting lists (term -> lesson, term
+frequency), each lesson's length, category and tool, and a copy of the
+lesson record itself. A query reads only the postings of its own terms and
+the records it returns, so it does not grow with the size of the store.
+The index remembers which version of the lesson store it was built from and is
+rebuilt when the store changes behind its back. Access counts recorded since
+(see access_stats.py) are read from their own database, attached read-only
+alongside. Only writers build or rebuild the index (see learner.sync_indexes);
+reading a missing index returns nothing rather than creating it.
+"""
+import json
+import math
+import re
+import sqlite3
+from collections import Counter
+from pathlib import Path
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Letters and digits in any script; underscores still split words as before
+TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+# Bumped when tokenize() changes, so indexes built with the old tokens are rebuilt
+TOKENIZER_VERSION = 2
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "was", "were", "will", "with",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    tool TEXT NOT NULL DEFAULT '',
+    length INTEGER NOT NULL,
+    accessed_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    lesson_id INTEGER NOT NULL,
+    tf INTEGER NOT NULL,
+    PRIMARY KEY (term, lesson_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_docs_category ON docs(category, accessed_count, created_at);
+CREATE INDEX IF NOT EXISTS idx_docs_tool ON docs(tool, accessed_count, created_at);
+CREATE INDEX IF NOT EXISTS idx_postings_lesson ON postings(lesson_id);
+"""
+
+def tokenize(text):
+    """Case-folded word tokens (any script), without stopwords and single characters."""
+    return [t for t in TOKEN_RE.findall(text.casefold()) if len(t) > 1 and t not in STOPWORDS]
+
+def lesson_terms(lesson):
+    """Term frequencies over the searchable fields: lesson, context, tags and tool."""
+    fields = [lesson.get("lesson", ""), lesson.get("context", ""), lesson.get("tool", "")]
+    fields.extend(lesson.get("tags") or [])
+    return Counter(t for field in fields if field for t in tokenize(field))
+
+class LessonIndex:
+    """BM25 inverted index plus category/tool lookups, persisted in SQLite."""
+
+    def __init__(self, path, access_path=None):
+        self.path = Path(path)
+        self.access_path = Path(access_path) if access_path else None
+        self._conn = None
+        self._stats = False
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    @property
+    def stats_attached(self):
+        """Attach the access counts read-only if they exist (AccessStats writes them)."""
+        if not self._stats and self.access_path is not None and self.access_path.exists():
+            try:
+                self.conn.execute("ATTACH DATABASE ? AS stats", (f"file:{self.access_path}?mode=ro",))
+                self._stats = self.conn.execute(
+                    "SELECT 1 FROM stats.sqlite_master WHERE name = 'access'").fetchone() is not None
+                if not self._stats:
+                    self.conn.execute("DETACH DATABASE stats")
+            except sqlite3.OperationalError:
+                self._stats = False
+        return self._stats
+
+    def _meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def is_current(self, source):
+        """Whether the index was built from this version (`source`) of the lesson store."""
+        return self.path.exists() and self._meta("source") == source
+
+    def _put(self, lesson):
+        """Index one lesson, replacing a previous version. Returns (length delta, docs added)."""
+        terms = lesson_terms(lesson)
+        length = sum(terms.values())
+        old = self.conn.execute("SELECT length FROM docs WHERE id = ?", (lesson["id"],)).fetchone()
+        self.conn.execute("DELETE FROM postings WHERE lesson_id = ?", (lesson["id"],))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO docs (id, category, tool, length, accessed_count, created_at, body) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (lesson["id"], lesson.get("category", ""), lesson.get("tool") or "", length,
+             lesson.get("accessed_count", 0), lesson.get("created_at"), json.dumps(lesson)),
+        )
+        self.conn.executemany("INSERT INTO postings (term, lesson_id, tf) VALUES (?, ?, ?)",
+                              [(term, lesson["id"], tf) for term, tf in terms.items()])
+        return length - (old[0] if old else 0), 0 if old else 1
+
+    def rebuild(self, lessons, source):
+        """Re-index every lesson from scratch."""
+        with self.conn:
+            self.conn.execute("DELETE FROM docs")
+            self.conn.execute("DELETE FROM postings")
+            total = 0
+            for lesson in lessons:
+                total += self._put(lesson)[0]
+            self._set_meta("docs", len(lessons))
+            self._set_meta("total_length", total)
+            self._set_meta("source", source)
+
+    def update(self, lessons, source):
+        """Re-index the given (new or changed) lessons and record the new source version."""
+        with self.conn:
+            docs, total = int(self._meta("docs", 0)), int(self._meta("total_length", 0))
+            for lesson in lessons:
+                length_delta, added = self._put(lesson)
+                total += length_delta
+                docs += added
+            self._set_meta("docs", docs)
+            self._set_meta("total_length", total)
+            self._set_meta("source", source)
+
+    def _filters(self, category, tool):
+        clauses, params = [], []
+        if category:
+            clauses.append("d.category = ?")
+            params.append(category)
+        if tool:
+            clauses.append("d.tool = ?")
+            params.append(tool)
+        return clauses, params
+
+    def search(self, query="", category="", tool="", limit=5):
+        """Lessons ranked by BM25 for `query` (most accessed, then newest, without one)."""
+        if not self.path.exists():
+            return []
+        clauses, params = self._filters(category, tool)
+        terms = list(dict.fromkeys(tokenize(query))) if query else []
+        if not terms:
+            where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+            if not self.stats_attached:
+                query_sql = f"SELECT d.body FROM docs d {where} ORDER BY d.accessed_count DESC, d.created_at DESC LIMIT ?"
+            else:
+                query_sql = (f"SELECT d.body FROM docs d LEFT JOIN stats.access a ON a.lesson_id = d.id {where} "
+                             f"ORDER BY d.accessed_count + COALESCE(a.count, 0) DESC, d.created_at DESC LIMIT ?")
+            rows = self.conn.execute(query_sql, params + [limit]).fetchall()
+            return [json.loads(r[0]) for r in rows]
+        return [lesson for _, lesson in self.rank(terms, clauses, params, limit)]
+
+    def rank(self, terms, clauses=(), params=(), limit=5):
+        """[(score, lesson)] for the best BM25 matches of `terms`."""
+        docs = int(self._meta("docs", 0))
+        if not docs:
+            return []
+        avgdl = int(self._meta("total_length", 0)) / docs or 1.0
+        marks = ",".join("?" * len(terms))
+        df = dict(self.conn.execute(
+            f"SELECT term, COUNT(*) FROM postings WHERE term IN ({marks}) GROUP BY term", terms
+        ).fetchall())
+        weights = [(t, math.log(1 + (docs - n + 0.5) / (n + 0.5))) for t, n in df.items()]
+        if not weights:
+            return []
+        values = ",".join("(?, ?)" for _ in weights)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        top = self.conn.execute(
+            f"WITH w(term, idf) AS (VALUES {values}) "
+            f"SELECT p.lesson_id, SUM(w.idf * p.tf * {K1 + 1} / (p.tf + {K1} * ({1 - B} + {B} * d.length / ?))) "
+            f"AS score FROM w JOIN postings p ON p.term = w.term JOIN docs d ON d.id = p.lesson_id {where} "
+            f"GROUP BY p.lesson_id ORDER BY score DESC, p.lesson_id DESC LIMIT ?",
+            [v for pair in weights for v in pair] + [avgdl] + list(params) + [limit],
+        ).fetchall()
+        if not top:
+            return []
+        bodies = dict(self.conn.execute(
+            f"SELECT id, body FROM docs WHERE id IN ({','.join('?' * len(top))})", [i for i, _ in top]
+        ).fetchall())
+        return [(score, json.loads(bodies[i])) for i, score in top]
+
+    def get(self, lesson_ids):
+        """Stored lesson records for `lesson_ids`, in the same order (unknown ids skipped)."""
+        lesson_ids = list(lesson_ids)
+        if not lesson_ids or not self.path.exists():
+            return []
+        bodies = dict(self.conn.execute(
+            f"SELECT id, body FROM docs WHERE id IN ({','.join('?' * len(lesson_ids))})", lesson_ids
+        ).fetchall())
+        return [json.loads(bodies[i]) for i in lesson_ids if i in bodies]
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+            self._stats = False
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+self-improving: MinHash/LSH near-duplicate detection for lessons
+
+A lesson's text (lesson + context, with numbers folded so ids and timings don't
+matter) is cut into word-bigram shingles and summarized by NUM_PERM MinHash
+values. Two lessons' signatures agree in about the same fraction of positions
+as their shingle sets overlap (Jaccard similarity). Signatures are split into
+BANDS bands; lessons sharing any band bucket are candidates, and a candidate
+is a duplicate when the signatures agree in at least THRESHOLD of positions
+and the category is the same. A lesson with no shingles (nothing but
+stopwords and single characters) has no signature and is never a duplicate.
+
+Signatures and band buckets of canonical lessons are kept in SQLite next to
+the lesson store, so checking a new lesson reads only its own buckets.
+"""
+import random
+import re
+import sqlite3
+import zlib
+from array import array
+from hashlib import blake2b
+from pathlib import Path
+
+from lesson_index import tokenize
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# MinHash permutations, split into BANDS bands of NUM_PERM // BANDS rows
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+# Estimated Jaccard similarity at which two lessons are the same lesson
+THRESHOLD = 0.7
+
+# Words per shingle
+SHINGLE_SIZE = 2
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_rng = random.Random(1)
+# a, b < 2**32 keep a * h + b below 2**64, so NumPy's uint64 math is exact
+_A = [_rng.randrange(1, 1 << 32) for _ in range(NUM_PERM)]
+_B = [_rng.randrange(0, 1 << 32) for _ in range(NUM_PERM)]
+
+DIGITS_RE = re.compile(r"\b\d+\b")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    lesson_id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    sig BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bands (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    lesson_id INTEGER NOT NULL,
+    PRIMARY KEY (band, bucket, lesson_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_bands_lesson ON bands(lesson_id);
+"""
+
+def shingles(lesson):
+    """Word-bigram shingles of lesson + context, with standalone numbers folded to 0."""
+    text = DIGITS_RE.sub("0", f"{lesson.get('lesson', '')} {lesson.get('context', '')}")
+    tokens = tokenize(text)
+    if len(tokens) < SHINGLE_SIZE:
+        return set(tokens)
+    return {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+def signature(lesson):
+    """NUM_PERM MinHash values (each < 2**32) of the lesson's shingles, or None without any."""
+    hashes = [zlib.crc32(s.encode()) for s in shingles(lesson)]
+    if not hashes:
+        return None
+    if NUMPY_AVAILABLE:
+        hv = np.asarray(hashes, dtype=np.uint64)
+        a = np.asarray(_A, dtype=np.uint64)[:, None]
+        b = np.asarray(_B, dtype=np.uint64)[:, None]
+        return (((a * hv + b) % np.uint64(_PRIME)) & np.uint64(_MAX_HASH)).min(axis=1).tolist()
+    return [min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes) for a, b in zip(_A, _B)]
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity: the fraction of positions where the signatures agree."""
+    return sum(x == y for x, y in zip(sig_a, sig_b)) / NUM_PERM
+
+def band_buckets(sig):
+    """[(band, bucket)] for LSH: one 64-bit bucket key per band of ROWS values."""
+    keys = []
+    for band in range(BANDS):
+        chunk = array("I", sig[band * ROWS:(band + 1) * ROWS]).tobytes()
+        keys.append((band, int.from_bytes(blake2b(chunk, digest_size=8).digest(), "big", signed=True)))
+    return keys
+
+def cluster(lessons):
+    """Groups of near-duplicate lesson ids (two or more each), lowest id first."""
+    sigs = {lesson["id"]: signature(lesson) for lesson in lessons}
+    sigs = {lesson_id: sig for lesson_id, sig in sigs.items() if sig is not None}
+    category = {lesson["id"]: lesson.get("category") for lesson in lessons}
+    parent = {lesson_id: lesson_id for lesson_id in sigs}
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    buckets = {}
+    for lesson_id, sig in sigs.items():
+        for key in band_buckets(sig):
+            buckets.setdefault(key, []).append(lesson_id)
+    for members in buckets.values():
+        # Compare each member with one representative per cluster already in the
+        # bucket, so a bucket of n copies costs n checks rather than n^2
+        reps = []
+        for lesson_id in members:
+            for rep in reps:
+                if find(rep) == find(lesson_id):
+                    break
+                if category[rep] == category[lesson_id] and similarity(sigs[rep], sigs[lesson_id]) >= THRESHOLD:
+                    parent[find(lesson_id)] = find(rep)
+                    break
+            else:
+                reps.append(lesson_id)
+    groups = {}
+    for lesson_id in sigs:
+        groups.setdefault(find(lesson_id), []).append(lesson_id)
+    return sorted(sorted(g) for g in groups.values() if len(g) > 1)
+
+class DuplicateIndex:
+    """LSH buckets over the signatures of canonical lessons, persisted in SQLite."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._conn = None
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def is_current(self, source):
+        """Whether the index was built from this version (`source`) of the lesson store."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+        return row is not None and row[0] == source
+
+    def _put(self, lesson):
+        sig = signature(lesson)
+        self.conn.execute("DELETE FROM bands WHERE lesson_id = ?", (lesson["id"],))
+        if sig is None:
+            self.conn.execute("DELETE FROM signatures WHERE lesson_id = ?", (lesson["id"],))
+            return
+        self.conn.execute("INSERT OR REPLACE INTO signatures (lesson_id, category, sig) VALUES (?, ?, ?)",
+                          (lesson["id"], lesson.get("category", ""), array("I", sig).tobytes()))
+        self.conn.executemany("INSERT OR IGNORE INTO bands (band, bucket, lesson_id) VALUES (?, ?, ?)",
+                              [(band, bucket, lesson["id"]) for band, bucket in band_buckets(sig)])
+
+    def rebuild(self, lessons, source):
+        """Re-sign every lesson from scratch."""
+        with self.conn:
+            self.conn.execute("DELETE FROM signatures")
+            self.conn.execute("DELETE FROM bands")
+            for lesson in lessons:
+                self._put(lesson)
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source', ?)", (source,))
+
+    def update(self, lessons, source):
+        """Re-sign the given (new or changed) lessons and record the new source version."""
+        with self.conn:
+            for lesson in lessons:
+                self._put(lesson)
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source', ?)", (source,))
+
+    def find_duplicate(self, lesson):
+        """(similarity, lesson id) of the closest indexed lesson that `lesson` duplicates, or None."""
+        sig = signature(lesson)
+        if sig is None:
+            return None
+        keys = band_buckets(sig)
+        values = ",".join("(?, ?)" for _ in keys)
+        rows = self.conn.execute(
+            f"WITH k(band, bucket) AS (VALUES {values}) "
+            f"SELECT DISTINCT s.lesson_id, s.sig FROM k JOIN bands b ON b.band = k.band AND b.bucket = k.bucket "
+            f"JOIN signatures s ON s.lesson_id = b.lesson_id WHERE s.category = ?",
+            [v for key in keys for v in key] + [lesson.get("category", "")],
+        ).fetchall()
+        best = None
+        for lesson_id, blob in rows:
+            score = similarity(sig, array("I", blob))
+            if score >= THRESHOLD and (best is None or (score, -lesson_id) > (best[0], -best[1])):
+                best = (score, lesson_id)
+        return best
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+self-improving: Lesson store sharded by category and month
+
+    lessons/
+        manifest.json               next id, revision, one entry per shard
+        <category>/<YYYY-MM>.json   lessons created that month (.json.gz once compressed)
+
+Each manifest entry records its shard's file, lesson count, id range and the
+latest time any lesson in it was logged (created or seen again). Queries by
+category or by recent time open only the shards that can match, and a
+lesson is found by id without scanning. Writes rewrite only the shards they
+touch, then the manifest, each with an atomic replace.
+
+Before any shard is rewritten, the manifest is saved with the new next_id
+and a "pending" list of the shards about to change. If a crash leaves that
+list behind, the next load rebuilds just those entries from the shard files,
+so ids are never reused and no entry stays stale.
+
+A legacy single-file lessons.json is imported on first use and moved aside.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+
+LESSONS_DIR = Path("/home/ubuntu/clawd/memory/lessons")  # manifest.json + <category>/<YYYY-MM>.json shards
+LESSONS_FILE = LESSONS_DIR.with_name("lessons.json")  # legacy single file, imported on first use
+ACCESS_FILE = LESSONS_FILE.with_name("lessons_access.db")  # see access_stats.py
+RECENT_FILE = LESSONS_FILE.with_name("lessons_recent.json")  # view written by learner.py for check_lessons.py
+
+# Shards whose month ended this many months ago are compressed by compress()
+COMPRESS_AFTER_MONTHS = 3
+
+def month_of(lesson):
+    return lesson["created_at"][:7]
+
+def seen_at(lesson):
+    return lesson.get("last_seen") or lesson["created_at"]
+
+def slug(category):
+    """Directory-safe form of a category name."""
+    return re.sub(r"[^a-z0-9_-]+", "_", category.lower()) or "_"
+
+def empty_manifest():
+    return {"next_id": 1, "revision": 0, "tool_effectiveness": {}, "shards": {}}
+
+class LessonStore:
+    """Category/month shards of lessons plus a manifest, in one directory."""
+
+    def __init__(self, directory, legacy_file=None):
+        self.dir = Path(directory)
+        self.manifest_path = self.dir / "manifest.json"
+        self.legacy_file = Path(legacy_file) if legacy_file else None
+        self._manifest = None
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            try:
+                with open(self.manifest_path) as f:
+                    self._manifest = json.load(f)
+            except FileNotFoundError:
+                self._manifest = empty_manifest()
+            if self._manifest.get("pending"):
+                self._recover(self._manifest["pending"])
+            if self.legacy_file is not None and self.legacy_file.exists():
+                self.import_legacy(self.legacy_file)
+        return self._manifest
+
+    @property
+    def next_id(self):
+        return self.manifest["next_id"]
+
+    def version(self):
+        """Changes with every write, including hand edits of a shard (stat of each file)."""
+        stamps = []
+        for path in [self.manifest_path] + [self.dir / e["file"] for e in self.manifest["shards"].values()]:
+            try:
+                st = path.stat()
+                stamps.append(f"{path.name}:{st.st_mtime_ns}:{st.st_size}")
+            except FileNotFoundError:
+                stamps.append(f"{path.name}:-")
+        return hashlib.sha1("|".join(stamps).encode()).hexdigest()[:16]
+
+    def _key(self, lesson):
+        return f"{slug(lesson['category'])}/{month_of(lesson)}"
+
+    def _read(self, key):
+        entry = self.manifest["shards"].get(key)
+        if entry is None:
+            return []
+        path = self.dir / entry["file"]
+        try:
+            with (gzip.open(path, "rt") if entry.get("compressed") else open(path)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def _write(self, key, lessons, category, compressed=None):
+        """Replace one shard's contents and refresh its manifest entry."""
+        old = self.manifest["shards"].get(key, {})
+        compressed = old.get("compressed", False) if compressed is None else compressed
+        if not lessons:
+            if old:
+                (self.dir / old["file"]).unlink(missing_ok=True)
+                del self.manifest["shards"][key]
+            return
+        lessons = sorted(lessons, key=lambda l: l["id"])
+        name = f"{key}.json.gz" if compressed else f"{key}.json"
+        path = self.dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with (gzip.open(tmp, "wt") if compressed else open(tmp, "w")) as f:
+            json.dump(lessons, f, indent=None if compressed else 2)
+        os.replace(tmp, path)
+        if old and old["file"] != name:
+            (self.dir / old["file"]).unlink(missing_ok=True)
+        self._set_entry(key, name, lessons, category, compressed)
+
+    def _set_entry(self, key, name, lessons, category, compressed):
+        self.manifest["shards"][key] = {
+            "file": name,
+            "category": category,
+            "month": key.rsplit("/", 1)[1],
+            "count": len(lessons),
+            "min_id": lessons[0]["id"],
+            "max_id": lessons[-1]["id"],
+            "last": max(seen_at(l) for l in lessons),
+            "compressed": compressed,
+        }
+
+    @contextmanager
+    def _rewriting(self, keys, next_id=None):
+        """Record the shards about to be rewritten (and the new next_id) before touching them."""
+        if next_id is not None:
+            self.manifest["next_id"] = max(self.manifest["next_id"], next_id)
+        self.manifest["pending"] = sorted(keys)
+        self._save_manifest()
+        yield
+        self.manifest.pop("pending", None)
+        self._save_manifest()
+
+    def _recover(self, keys):
+        """Rebuild the manifest entries of shards a crashed write may have left out of date."""
+        manifest = self._manifest
+        for key in keys:
+            compressed, plain = self.dir / f"{key}.json.gz", self.dir / f"{key}.json"
+            if compressed.exists():
+                plain.unlink(missing_ok=True)  # compress() finished the gzip copy
+                path, is_compressed = compressed, True
+            else:
+                path, is_compressed = plain, False
+            try:
+                with (gzip.open(path, "rt") if is_compressed else open(path)) as f:
+                    lessons = sorted(json.load(f), key=lambda l: l["id"])
+            except FileNotFoundError:
+                lessons = []
+            if not lessons:
+                manifest["shards"].pop(key, None)
+                continue
+            self._set_entry(key, path.relative_to(self.dir).as_posix(), lessons, lessons[0]["category"], is_compressed)
+            manifest["next_id"] = max(manifest["next_id"], lessons[-1]["id"] + 1)
+        manifest.pop("pending", None)
+        self._save_manifest()
+
+    def _save_manifest(self):
+        self.manifest["revision"] += 1
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, self.manifest_path)
+
+    def shards(self, category="", since=""):
+        """Manifest keys of the shards that can hold lessons of `category` logged at or after `since`."""
+        return sorted(
+            key for key, entry in self.manifest["shards"].items()
+            if (not category or entry["category"] == category) and (not since or entry["last"] >= since)
+        )
+
+    def lessons(self, category="", since=""):
+        """Lessons in id order, opening only the shards that can match the filters.
+
+        `since` selects shards by when lessons were last logged; callers filter
+        individual lessons themselves.
+        """
+        result = []
+        for key in self.shards(category, since):
+            result.extend(self._read(key))
+        return sorted(result, key=lambda l: l["id"])
+
+    def count(self):
+        return sum(entry["count"] for entry in self.manifest["shards"].values())
+
+    def get(self, lesson_ids):
+        """Lessons with these ids, in the same order (unknown ids skipped)."""
+        wanted = set(lesson_ids)
+        found = {}
+        for key, entry in self.manifest["shards"].items():
+            if any(entry["min_id"] <= i <= entry["max_id"] for i in wanted - found.keys()):
+                found.update((l["id"], l) for l in self._read(key) if l["id"] in wanted)
+        return [found[i] for i in lesson_ids if i in found]
+
+    def put(self, lessons):
+        """Add or replace lessons (matched by id), rewriting only their shards."""
+        by_key = {}
+        for lesson in lessons:
+            by_key.setdefault(self._key(lesson), []).append(lesson)
+        with self._rewriting(by_key, max([1] + [l["id"] + 1 for l in lessons])):
+            for key, changed in by_key.items():
+                merged = {l["id"]: l for l in self._read(key)}
+                merged.update((l["id"], l) for l in changed)
+                self._write(key, list(merged.values()), changed[0]["category"])
+
+    def replace_all(self, lessons, next_id=None, tool_effectiveness=None):
+        """Rewrite the whole store as exactly `lessons`."""
+        by_key = {}
+        for lesson in lessons:
+            by_key.setdefault(self._key(lesson), []).append(lesson)
+        stale = set(self.manifest["shards"]) - set(by_key)
+        # next_id may only grow, so an id handed out before this rewrite is never reused
+        with self._rewriting(stale | set(by_key), max([next_id or 1] + [l["id"] + 1 for l in lessons])):
+            for key in stale:
+                self._write(key, [], None)
+            for key, shard in by_key.items():
+                self._write(key, shard, shard[0]["category"])
+            if tool_effectiveness is not None:
+                self.manifest["tool_effectiveness"] = tool_effectiveness
+
+    def compress(self, older_than=COMPRESS_AFTER_MONTHS):
+        """Gzip shards at least `older_than` months old. Returns the keys compressed."""
+        today = date.today()
+        cutoff_index = today.year * 12 + today.month - 1 - older_than
+        due = []
+        for key, entry in self.manifest["shards"].items():
+            year, month = (int(x) for x in entry["month"].split("-"))
+            if not entry.get("compressed") and year * 12 + month - 1 <= cutoff_index:
+                due.append(key)
+        if due:
+            with self._rewriting(due):
+                for key in due:
+                    self._write(key, self._read(key), self.manifest["shards"][key]["category"], compressed=True)
+        return due
+
+    def import_legacy(self, path):
+        """Fold a single-file lessons.json into the shards and move it aside."""
+        with open(path) as f:
+            data = json.load(f)
+        existing = {l["id"]: l for l in self.get([l["id"] for l in data.get("lessons", [])])}
+        next_id = max(self.manifest["next_id"], data.get("next_id", 1))
+        imported = []
+        for lesson in data.get("lessons", []):
+            if lesson["id"] in existing:
+                if existing[lesson["id"]] == lesson:
+                    continue
+                lesson = dict(lesson, id=next_id)  # id already taken by another lesson
+                next_id += 1
+            imported.append(lesson)
+        self.manifest["next_id"] = next_id
+        for key, value in (data.get("tool_effectiveness") or {}).items():
+            self.manifest["tool_effectiveness"].setdefault(key, value)
+        self.put(imported)
+        os.replace(path, path.with_name(f"{path.name}.imported-{datetime.now():%Y%m%d%H%M%S}"))
+        return len(imported)
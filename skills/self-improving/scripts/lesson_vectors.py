@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+self-improving: Hashed TF-IDF vectors for similarity search over lessons
+
+Each lesson becomes a fixed-size vector: its words and their character
+trigrams are hashed into DIM buckets (so "deploy" and "deployment" share
+features), weighted by TF-IDF and L2-normalized. Rows are stored as raw
+float32 next to the lesson store and memory-mapped for search; a query is one
+cosine product against the matrix and a top-k selection. NumPy does this
+when installed; otherwise the same file is scanned in pure Python.
+
+Adding a lesson appends (or overwrites) one row. Document frequencies keep
+updating, but rows keep the IDF they were written with until the next
+rebuild, which happens whenever the store changes behind our back.
+
+Files (for base `lessons_vectors`):
+    lessons_vectors.f32   rows x DIM float32 matrix
+    lessons_vectors.ids   rows int64 lesson ids
+    lessons_vectors.json  dim, document count, per-bucket document frequency, source version
+"""
+import heapq
+import json
+import math
+import os
+import zlib
+from array import array
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+from lesson_index import tokenize
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Hash buckets per vector (4 bytes each)
+DIM = 512
+
+# Weight of character trigram features relative to whole words
+TRIGRAM_WEIGHT = 0.5
+
+# Cosine similarity below which a lesson is not considered related
+MIN_SCORE = 0.1
+
+@lru_cache(maxsize=65536)
+def token_buckets(token, dim=DIM):
+    """Signed bucket weights of one word: the word itself plus its character trigrams."""
+    padded = f"<{token}>"
+    features = [(token, 1.0)] + [("#" + padded[i:i + 3], TRIGRAM_WEIGHT) for i in range(len(padded) - 2)]
+    buckets = {}
+    for feature, weight in features:
+        h = zlib.crc32(feature.encode())
+        bucket = h % dim
+        buckets[bucket] = buckets.get(bucket, 0.0) + (-weight if h >> 31 else weight)
+    return tuple(buckets.items())
+
+def hashed(text, dim=DIM):
+    """Sparse signed vector {bucket: value} for `text`, with sublinear term frequency."""
+    vec = {}
+    for token, tf in Counter(tokenize(text)).items():
+        scale = 1.0 + math.log(tf)
+        for bucket, value in token_buckets(token, dim):
+            vec[bucket] = vec.get(bucket, 0.0) + scale * value
+    return {b: v for b, v in vec.items() if v}
+
+def lesson_text(lesson):
+    parts = [lesson.get("lesson", ""), lesson.get("context", ""), lesson.get("tool", "")]
+    parts.extend(lesson.get("tags") or [])
+    return " ".join(p for p in parts if p)
+
+class LessonVectors:
+    """Memory-mapped float32 matrix of lesson vectors with incremental updates."""
+
+    def __init__(self, base, dim=DIM):
+        base = Path(base)
+        self.matrix_path = base.with_name(base.name + ".f32")
+        self.ids_path = base.with_name(base.name + ".ids")
+        self.meta_path = base.with_name(base.name + ".json")
+        self.dim = dim
+        self._meta = None
+        self._rows = None
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            try:
+                with open(self.meta_path) as f:
+                    self._meta = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._meta = {}
+            if self._meta.get("dim") != self.dim:
+                self._meta = {"dim": self.dim, "docs": 0, "df": [0] * self.dim, "source": None}
+        return self._meta
+
+    @property
+    def rows(self):
+        """{lesson id: row number}."""
+        if self._rows is None:
+            ids = array("q")
+            if self.ids_path.exists():
+                with open(self.ids_path, "rb") as f:
+                    ids.frombytes(f.read())
+            self._rows = {lesson_id: row for row, lesson_id in enumerate(ids)}
+        return self._rows
+
+    def is_current(self, source):
+        """Whether the vectors were built from this version (`source`) of the lesson store."""
+        return self.meta.get("source") == source
+
+    def _idf(self):
+        docs, df = self.meta["docs"], self.meta["df"]
+        return [math.log((1 + docs) / (1 + n)) + 1.0 for n in df]
+
+    def _weighted(self, sparse, idf):
+        """TF-IDF weight and L2-normalize a sparse vector."""
+        vec = {b: v * idf[b] for b, v in sparse.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values()))
+        return {b: v / norm for b, v in vec.items()} if norm else {}
+
+    def _dense(self, vec):
+        row = array("f", [0.0] * self.dim)
+        for b, v in vec.items():
+            row[b] = v
+        return row
+
+    def _write_meta(self, source):
+        self.meta["source"] = source
+        tmp = self.meta_path.with_name(self.meta_path.name + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp, self.meta_path)
+
+    def rebuild(self, lessons, source):
+        """Recompute every vector with the current document frequencies."""
+        sparse = [(lesson["id"], hashed(lesson_text(lesson), self.dim)) for lesson in lessons]
+        df = [0] * self.dim
+        for _, vec in sparse:
+            for b in vec:
+                df[b] += 1
+        self._meta = {"dim": self.dim, "docs": len(sparse), "df": df, "source": None}
+        idf = self._idf()
+        self.matrix_path.parent.mkdir(parents=True, exist_ok=True)
+        matrix_tmp = self.matrix_path.with_name(self.matrix_path.name + ".tmp")
+        ids = array("q")
+        with open(matrix_tmp, "wb") as f:
+            for lesson_id, vec in sparse:
+                f.write(self._dense(self._weighted(vec, idf)).tobytes())
+                ids.append(lesson_id)
+        ids_tmp = self.ids_path.with_name(self.ids_path.name + ".tmp")
+        with open(ids_tmp, "wb") as f:
+            f.write(ids.tobytes())
+        os.replace(matrix_tmp, self.matrix_path)
+        os.replace(ids_tmp, self.ids_path)
+        self._rows = None
+        self._write_meta(source)
+
+    def update(self, lessons, source):
+        """Write vectors for new or changed lessons and record the new source version."""
+        self.matrix_path.parent.mkdir(parents=True, exist_ok=True)
+        rows = self.rows
+        sparse = [(lesson["id"], hashed(lesson_text(lesson), self.dim)) for lesson in lessons]
+        for lesson_id, vec in sparse:
+            if lesson_id not in rows:
+                self.meta["docs"] += 1
+                for b in vec:
+                    self.meta["df"][b] += 1
+        idf = self._idf()
+        with open(self.matrix_path, "r+b" if self.matrix_path.exists() else "w+b") as matrix, \
+                open(self.ids_path, "ab") as ids:
+            for lesson_id, vec in sparse:
+                row = rows.get(lesson_id)
+                if row is None:
+                    row = rows[lesson_id] = len(rows)
+                    ids.write(array("q", [lesson_id]).tobytes())
+                matrix.seek(row * self.dim * 4)
+                matrix.write(self._dense(self._weighted(vec, idf)).tobytes())
+        self._write_meta(source)
+
+    def search(self, text, limit=5, min_score=MIN_SCORE):
+        """[(cosine score, lesson id)] of the lessons most similar to `text`."""
+        query = self._weighted(hashed(text, self.dim), self._idf())
+        n = len(self.rows)
+        if not query or not n:
+            return []
+        cols = sorted(query)
+        weights = [query[b] for b in cols]
+        ids = {row: lesson_id for lesson_id, row in self.rows.items()}
+        if NUMPY_AVAILABLE:
+            matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+            scores = matrix[:, cols] @ np.asarray(weights, dtype=np.float32)
+            k = min(limit, n)
+            top = np.argpartition(-scores, k - 1)[:k]
+            hits = [(float(scores[i]), int(i)) for i in top]
+        else:
+            matrix = array("f")
+            with open(self.matrix_path, "rb") as f:
+                matrix.frombytes(f.read(n * self.dim * 4))
+            dim = self.dim
+            hits = heapq.nlargest(limit, (
+                (sum(matrix[row * dim + b] * w for b, w in zip(cols, weights)), row) for row in range(n)
+            ))
+        hits.sort(key=lambda hit: (-hit[0], -ids[hit[1]]))
+        return [(score, ids[row]) for score, row in hits if score >= min_score]
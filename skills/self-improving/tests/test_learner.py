@@ -0,0 +1,90 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import check_lessons
+import learner
+from lesson_index import tokenize
+from lesson_minhash import signature
+
+@pytest.fixture
+def lessons(tmp_path, monkeypatch):
+    monkeypatch.setattr(learner, "LESSONS_DIR", tmp_path / "lessons")
+    monkeypatch.setattr(learner, "LESSONS_FILE", tmp_path / "lessons.json")
+    for name in ("INDEX_FILE", "ACCESS_FILE", "DUPLICATES_FILE", "RECENT_FILE"):
+        monkeypatch.setattr(learner, name, tmp_path / getattr(learner, name).name)
+    monkeypatch.setattr(learner, "VECTORS_FILE", tmp_path / "lessons_vectors")
+    for name in ("_store", "_index", "_vectors", "_duplicates", "_access"):
+        monkeypatch.setattr(learner, name, None)
+    monkeypatch.setattr(learner, "_stale_noted", set())
+    for name in ("LESSONS_DIR", "LESSONS_FILE", "ACCESS_FILE", "RECENT_FILE"):
+        monkeypatch.setattr(check_lessons, name, getattr(learner, name))
+    monkeypatch.setattr(check_lessons, "SHOWN_FILE", tmp_path / "shown.json")
+    monkeypatch.setattr(check_lessons, "_store", None)
+    yield tmp_path
+    for obj in (learner._index, learner._duplicates):
+        if obj is not None:
+            obj.close()
+
+def test_tokenize_keeps_words_in_any_script():
+    assert tokenize("Ошибка сети при Deploy") == ["ошибка", "сети", "при", "deploy"]
+    assert tokenize("ファイル が 見つからない") == ["ファイル", "見つからない"]
+    assert tokenize("STRASSE straße") == ["strasse", "strasse"]
+
+def test_lessons_without_shingles_have_no_signature():
+    assert signature({"lesson": "It is", "context": ""}) is None
+    assert signature({"lesson": "To be", "context": "a"}) is None
+
+def test_lessons_without_shingles_are_never_merged(lessons):
+    first = learner.add_lesson("It is", "insight")
+    second = learner.add_lesson("To be", "insight")
+    assert first != second
+    assert learner.dedupe_lessons(dry_run=True) == []
+
+def test_non_latin_lessons_are_kept_apart(lessons):
+    russian = learner.add_lesson("Не запускать миграции без резервной копии", "insight")
+    japanese = learner.add_lesson("本番環境では必ずバックアップを取る", "insight")
+    assert russian != japanese
+    # ...but a repeat of either is still recognised
+    assert learner.add_lesson("Не запускать миграции без резервной копии", "insight") == russian
+    assert [l["id"] for l in learner.search_lessons("миграции")] == [russian]
+
+def test_check_serves_high_impact_lessons_from_the_view(lessons, monkeypatch):
+    old = learner.add_lesson("Pin dependency versions in requirements files", "insight")
+    learner.save_lessons(changed=[dict(learner.get_store().get([old])[0], accessed_count=3)])
+    searched = learner.add_lesson("Retry flaky network calls with backoff", "insight")
+    learner.add_lesson("Quote shell variables that may contain spaces", "insight")
+    resolved = learner.add_lesson("Clear the build cache after upgrading the compiler", "insight")
+    learner.save_lessons(changed=[dict(learner.get_store().get([resolved])[0], accessed_count=5, outcome="resolved")])
+    for _ in range(2):
+        learner.search_lessons("backoff")
+    learner.get_access_stats().flush()
+
+    view = check_lessons.load_recent_view()
+    assert view["accessed"] == [[old, 3]]
+    def full_scan(*args, **kwargs):
+        raise AssertionError("read every shard")
+    monkeypatch.setattr(check_lessons.get_store(), "lessons", full_scan)
+    found = check_lessons.get_high_impact_lessons(view=view)
+    assert [(l["id"], l["accessed_count"]) for l in found] == [(old, 3), (searched, 2)]
+
+def test_lookups_write_nothing(lessons):
+    assert learner.search_lessons("anything") == []
+    assert learner.similar_lessons("anything") == []
+    assert learner.get_access_stats().counts() == {}
+    assert list(lessons.iterdir()) == []
+
+def test_lookups_do_not_rebuild_a_stale_index(lessons, capsys):
+    first = learner.add_lesson("Rotate logs before the disk fills up", "insight")
+    # A lesson written behind the index's back (e.g. an edited shard)
+    learner.get_store().put([dict(learner.get_store().get([first])[0], id=first + 1, lesson="Rotate keys yearly")])
+
+    assert [l["id"] for l in learner.search_lessons("rotate")] == [first]
+    assert not learner.get_index().is_current(learner.index_version())
+    assert "learner.py reindex" in capsys.readouterr().err
+
+    learner.sync_indexes(force=True)
+    assert sorted(l["id"] for l in learner.search_lessons("rotate")) == [first, first + 1]
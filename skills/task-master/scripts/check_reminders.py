@@ -1,93 +1,120 @@
 #!/usr/bin/env python3
 """
 task-master: Check for upcoming deadlines and output reminder text
-Usage: check_reminders.py [--hours HOURS]
+Usage: check_reminders.py [--hours HOURS] [--daemon]
 """
 import sys
-import json
+import time
 from datetime import datetime, timedelta
-from pathlib import Path
 
-TASKS_FILE = Path("/home/ubuntu/clawd/memory/tasks.json")
+from task_queries import get_store, reminders, time_until
+from task_store import normalize_deadline
 
-def load_tasks():
-    if TASKS_FILE.exists():
-        with open(TASKS_FILE) as f:
-            return json.load(f)
-    return {"tasks": []}
+# Longest the daemon sleeps before checking whether tasks were added or changed
+MAX_SLEEP = 60
 
-def check_reminders(hours=24):
-    data = load_tasks()
-    now = datetime.now()
-    cutoff = now + timedelta(hours=hours)
+_TICK = timedelta(microseconds=1)
+
+def check_reminders(hours=24, store=None):
+    return reminders(hours, store)
+
+def next_wake(store, last, window):
+    """When the next open deadline passes or enters the look-ahead window, or None."""
+    due = store.next_deadline(last)
+    entering = store.next_deadline(last + window)
+    return min([t for t in (due, entering and entering - window) if t], default=None)
+
+def run_daemon(hours=24):
+    """Print reminders as deadlines arrive, sleeping until the next one instead of polling.
     
-    urgent = []
-    upcoming = []
+    Each wake reads only the tasks that fell due or entered the window since the
+    last one. Tasks added or rescheduled in the meantime are noticed within MAX_SLEEP.
+    """
+    store = get_store()
+    window = timedelta(hours=hours)
+    result = check_reminders(hours, store)
+    if result:
+        print(result, flush=True)
+    last = datetime.now()
+    version = store.data_version()
+    announced = {(t["id"], t["deadline"]) for t in store.due_between(last, last + window)}
+    wake = next_wake(store, last, window)
     
-    for task in data["tasks"]:
-        if task["status"] != "open" or not task.get("deadline"):
+    while True:
+        delay = MAX_SLEEP if wake is None else (wake - datetime.now()).total_seconds()
+        time.sleep(min(MAX_SLEEP, max(0, delay)))
+        now = datetime.now()
+        changed = store.data_version() != version
+        if not changed and (wake is None or now < wake):
             continue
-        try:
-            deadline = datetime.fromisoformat(task["deadline"])
-            if deadline < now:
-                urgent.append(task)
-            elif deadline <= cutoff:
-                upcoming.append(task)
-        except:
-            pass
-    
-    # Sort by deadline
-    urgent.sort(key=lambda t: t["deadline"])
-    upcoming.sort(key=lambda t: t["deadline"])
-    
-    output = []
-    
-    if urgent:
-        output.append("🚨 OVERDUE TASKS:")
-        for t in urgent:
-            days_late = (now - datetime.fromisoformat(t["deadline"])).days
-            late_text = f" ({days_late}d late)" if days_late > 0 else " (due today)"
-            output.append(f"  • #{t['id']}: {t['description']}{late_text}")
-    
-    if upcoming:
-        output.append("⏰ UPCOMING DEADLINES:")
-        for t in upcoming:
-            hours_until = int((datetime.fromisoformat(t["deadline"]) - now).total_seconds() / 3600)
-            time_text = f"in {hours_until}h" if hours_until < 24 else f"in {hours_until//24}d"
-            output.append(f"  • #{t['id']}: {t['description']} ({time_text})")
-    
-    return "\n".join(output) if output else ""
+        
+        due = store.due_between(last + _TICK, now)
+        if changed:
+            # New or rescheduled tasks may already be inside the window
+            entering = store.due_between(now + _TICK, now + window)
+            version = store.data_version()
+        else:
+            entering = store.due_between(last + window + _TICK, now + window)
+        entering = [t for t in entering if (t["id"], t["deadline"]) not in announced]
+        
+        output = []
+        if due:
+            output.append("🚨 DUE NOW:")
+            output.extend(f"  • #{t['id']}: {t['description']}" for t in due)
+        if entering:
+            output.append("⏰ UPCOMING DEADLINES:")
+            output.extend(f"  • #{t['id']}: {t['description']} ({time_until(t, now)})" for t in entering)
+        if output:
+            print("\n".join(output), flush=True)
+        
+        announced.update((t["id"], t["deadline"]) for t in entering)
+        announced = {a for a in announced if (normalize_deadline(a[1]) or "") > now.isoformat()}
+        last = now
+        wake = next_wake(store, last, window)
 
 if __name__ == "__main__":
     # Handle --help
     if len(sys.argv) > 1 and sys.argv[1] in ("--help", "-h"):
-        print("Usage: check_reminders.py [--hours HOURS]")
+        print("Usage: check_reminders.py [--hours HOURS] [--daemon]")
         print("")
         print("Check for upcoming task deadlines and overdue tasks.")
         print("")
         print("Options:")
         print("  --hours HOURS  Look ahead window in hours (default: 24)")
+        print("  --daemon       Keep running; print reminders when deadlines arrive")
         print("")
         print("Examples:")
         print("  check_reminders.py           # Check next 24 hours")
         print("  check_reminders.py --hours 48  # Check next 48 hours")
+        print("  check_reminders.py --daemon    # Remind on time instead of per cron tick")
         sys.exit(0)
     
     # Parse arguments with error handling
+    args = sys.argv[1:]
+    daemon = "--daemon" in args
+    if daemon:
+        args.remove("--daemon")
     hours = 24
-    if len(sys.argv) > 2 and sys.argv[1] == "--hours":
+    if len(args) > 1 and args[0] == "--hours":
         try:
-            hours = int(sys.argv[2])
+            hours = int(args[1])
             if hours < 1 or hours > 8760:  # Max 1 year
                 print("Error: Hours must be between 1 and 8760", file=sys.stderr)
                 sys.exit(1)
         except ValueError:
             print("Error: Hours must be a valid integer", file=sys.stderr)
             sys.exit(1)
-    elif len(sys.argv) > 1:
+    elif args:
         print("Error: Unknown argument. Use --help for usage.", file=sys.stderr)
         sys.exit(1)
     
+    if daemon:
+        try:
+            run_daemon(hours)
+        except KeyboardInterrupt:
+            pass
+        sys.exit(0)
+    
     try:
         result = check_reminders(hours)
         if result:
@@ -2,34 +2,32 @@
 """
 task-master: Core task management operations
 """
-import json
 import sys
 import os
+import csv
+import json
 from datetime import datetime, timedelta
 from pathlib import Path
 
-TASKS_FILE = Path("/home/ubuntu/clawd/memory/tasks.json")
+from task_queries import get_store
+from task_store import FIELDS, PRIORITIES
+
+BATCH_OPS = {"add": "added", "complete": "completed", "delete": "deleted", "update": "updated"}
+
+# Fields a batch op may set; an add also accepts (and ignores) what export writes besides them
+OP_FIELDS = ("description", "priority", "deadline", "status", "context", "created_at", "completed_at")
+EXPORT_ONLY = ("id", "archived_at")
+
+EXPORT_FORMATS = ("jsonl", "csv")
 
 def load_tasks():
-    """Load tasks from storage."""
-    if TASKS_FILE.exists():
-        with open(TASKS_FILE) as f:
-            return json.load(f)
-    return {"tasks": [], "next_id": 1}
-
-def save_tasks(data):
-    """Save tasks to storage."""
-    TASKS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(TASKS_FILE, 'w') as f:
-        json.dump(data, f, indent=2)
+    """Load all tasks (in the shape tasks.json used to have)."""
+    store = get_store()
+    return {"tasks": store.query("all", sort_by=None), "next_id": store.next_id}
 
 def add_task(description, priority="medium", deadline=None, context=None):
     """Add a new task."""
-    data = load_tasks()
-    task_id = data["next_id"]
-    
-    task = {
-        "id": task_id,
+    task_id = get_store().add({
         "description": description,
         "priority": priority.lower(),
         "deadline": deadline,
@@ -37,74 +35,124 @@ def add_task(description, priority="medium", deadline=None, context=None):
         "context": context or "",
         "created_at": datetime.now().isoformat(),
         "completed_at": None
-    }
-    
-    data["tasks"].append(task)
-    data["next_id"] = task_id + 1
-    save_tasks(data)
+    })
     
     print(f"Task #{task_id} added: {description}")
     return task_id
 
 def list_tasks(filter_status="open", sort_by="priority"):
     """List tasks with optional filtering."""
-    data = load_tasks()
-    tasks = [t for t in data["tasks"] if filter_status == "all" or t["status"] == filter_status]
-    
     # Priority ordering: critical > high > medium > low
-    priority_order = {"critical": 0, "high": 1, "medium": 2, "low": 3}
-    
-    if sort_by == "priority":
-        tasks.sort(key=lambda t: (priority_order.get(t["priority"], 2), t.get("deadline") or "9999"))
-    elif sort_by == "deadline":
-        tasks.sort(key=lambda t: (t.get("deadline") or "9999", priority_order.get(t["priority"], 2)))
-    
-    return tasks
+    return get_store().query(filter_status, sort_by)
 
 def complete_task(task_id):
     """Mark a task as completed."""
-    data = load_tasks()
-    for task in data["tasks"]:
-        if task["id"] == int(task_id):
-            task["status"] = "completed"
-            task["completed_at"] = datetime.now().isoformat()
-            save_tasks(data)
-            print(f"Task #{task_id} completed: {task['description']}")
-            return True
-    print(f"Task #{task_id} not found")
+    store = get_store()
+    if store.update(task_id, status="completed", completed_at=datetime.now().isoformat()):
+        print(f"Task #{task_id} completed: {store.get(task_id)['description']}")
+        return True
+    task = store.get(task_id)
+    print(f"Task #{task_id} already {task['status']}" if task else f"Task #{task_id} not found")
     return False
 
 def delete_task(task_id):
-    """Delete a task permanently."""
-    data = load_tasks()
-    original_len = len(data["tasks"])
-    data["tasks"] = [t for t in data["tasks"] if t["id"] != int(task_id)]
-    
-    if len(data["tasks"]) < original_len:
-        save_tasks(data)
+    """Delete a task (it moves to the archive as deleted)."""
+    store = get_store()
+    if store.delete(task_id):
         print(f"Task #{task_id} deleted")
         return True
-    print(f"Task #{task_id} not found")
+    print(f"Task #{task_id} already deleted" if store.get(task_id) else f"Task #{task_id} not found")
     return False
 
+def get_completed_on(day=None):
+    """Tasks completed on a day (YYYY-MM-DD, default today), from the archive's day index."""
+    return get_store().archived_on(day or datetime.now().strftime("%Y-%m-%d"))
+
 def get_upcoming_tasks(hours=24):
     """Get tasks with deadlines within the next N hours."""
-    data = load_tasks()
     now = datetime.now()
-    cutoff = now + timedelta(hours=hours)
-    
-    upcoming = []
-    for task in data["tasks"]:
-        if task["status"] != "open" or not task.get("deadline"):
-            continue
+    return get_store().due_between(now, now + timedelta(hours=hours))
+
+def apply_op(store, op):
+    """Apply one batch op (a dict with "op", default "add"). Raises ValueError if it can't be applied."""
+    kind = op.pop("op", "add")
+    if kind not in BATCH_OPS:
+        raise ValueError(f"unknown op {kind!r}")
+    if kind == "add":
+        for field in EXPORT_ONLY:
+            op.pop(field, None)
+    elif "id" not in op:
+        raise ValueError(f"{kind} needs an id")
+    task_id = op.pop("id", None)
+    unknown = sorted(set(op) - set(OP_FIELDS))
+    if unknown:
+        raise ValueError(f"unknown fields {unknown}")
+    if task_id is not None:
         try:
-            deadline = datetime.fromisoformat(task["deadline"])
-            if now <= deadline <= cutoff:
-                upcoming.append(task)
-        except:
-            pass
-    
-    return sorted(upcoming, key=lambda t: t["deadline"])
+            task_id = int(task_id)
+        except (TypeError, ValueError):
+            raise ValueError(f"bad id {task_id!r}")
+    
+    if "priority" in op:
+        priority = op["priority"]
+        if not isinstance(priority, str) or priority.lower() not in PRIORITIES:
+            raise ValueError(f"unknown priority {priority!r} (expected one of {', '.join(PRIORITIES)})")
+        op["priority"] = priority.lower()
+    
+    if kind == "add":
+        if not op.get("description"):
+            raise ValueError("add needs a description")
+        store.add(op)
+    elif kind == "complete":
+        if not store.update(task_id, status="completed", completed_at=op.get("completed_at") or datetime.now().isoformat()):
+            raise ValueError(f"task #{task_id} is not open")
+    elif kind == "delete":
+        if not store.delete(task_id):
+            raise ValueError(f"task #{task_id} not found")
+    elif kind == "update":
+        if not op:
+            raise ValueError("update has no fields to change")
+        if not store.update(task_id, **op):
+            raise ValueError(f"task #{task_id} is not open")
+
+def apply_batch(lines):
+    """Apply a stream of JSONL ops (add/complete/delete/update) in one transaction.
+    
+    All or nothing: the first bad line raises ValueError (naming the line) and
+    nothing is applied. Returns {op: count}.
+    """
+    store = get_store()
+    counts = dict.fromkeys(BATCH_OPS, 0)
+    with store.transaction():
+        for n, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                op = json.loads(line)
+                if not isinstance(op, dict):
+                    raise ValueError("expected a JSON object")
+                kind = op.get("op", "add")
+                apply_op(store, op)
+            except ValueError as e:  # includes JSONDecodeError
+                raise ValueError(f"line {n}: {e}") from None
+            counts[kind] += 1
+    return counts
+
+def export_tasks(out, fmt="jsonl", status="all"):
+    """Write tasks with `status` to `out` as JSONL or CSV, streaming one task at a time."""
+    count = 0
+    tasks = get_store().iter_tasks(status)
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=FIELDS + ("archived_at",), extrasaction="ignore")
+        writer.writeheader()
+        for task in tasks:
+            writer.writerow(task)
+            count += 1
+    else:
+        for task in tasks:
+            out.write(json.dumps(task) + "\n")
+            count += 1
+    return count
 
 def format_task_list(tasks, verbose=False):
     """Format tasks for display."""
@@ -130,9 +178,14 @@ if __name__ == "__main__":
         print("  complete <task_id>                          - Mark task as complete")
         print("  delete <task_id>                            - Delete a task")
         print("  upcoming [hours]                            - Show upcoming deadlines")
+        print("  done [YYYY-MM-DD]                           - Tasks completed on a day (default: today)")
+        print("  batch [file|-]                              - Apply JSONL ops atomically (default: stdin)")
+        print("  export [jsonl|csv] [status]                 - Stream tasks to stdout (default: jsonl all)")
         print("\nExamples:")
         print('  task_manager.py add "Fix bug" high 2024-12-31 "urgent"')
         print('  task_manager.py list all deadline')
+        print('  echo \'{"op": "complete", "id": 3}\' | task_manager.py batch')
+        print('  task_manager.py export csv completed > done.csv')
         sys.exit(0)
     
     cmd = sys.argv[1] if len(sys.argv) > 1 else "list"
@@ -169,5 +222,34 @@ if __name__ == "__main__":
         tasks = get_upcoming_tasks(hours)
         print(format_task_list(tasks))
     
+    elif cmd == "done":
+        day = sys.argv[2] if len(sys.argv) > 2 else None
+        print(format_task_list(get_completed_on(day)))
+    
+    elif cmd == "batch":
+        path = sys.argv[2] if len(sys.argv) > 2 else "-"
+        try:
+            if path == "-":
+                counts = apply_batch(sys.stdin)
+            else:
+                with open(path) as f:
+                    counts = apply_batch(f)
+        except (OSError, ValueError) as e:
+            print(f"Batch not applied: {e}", file=sys.stderr)
+            sys.exit(1)
+        print("Batch applied: " + ", ".join(f"{counts[op]} {verb}" for op, verb in BATCH_OPS.items()))
+    
+    elif cmd == "export":
+        fmt = sys.argv[2] if len(sys.argv) > 2 else "jsonl"
+        status = sys.argv[3] if len(sys.argv) > 3 else "all"
+        if fmt not in EXPORT_FORMATS:
+            print("Usage: export [jsonl|csv] [status]")
+        else:
+            try:
+                export_tasks(sys.stdout, fmt, status)
+            except BrokenPipeError:
+                # Reader stopped early (e.g. piped into head)
+                os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    
     else:
-        print("Unknown command. Use: add, list, complete, delete, upcoming")
\ No newline at end of file
+        print("Unknown command. Use: add, list, complete, delete, upcoming, done, batch, export")
\ No newline at end of file
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+task-master: Shared task queries for other skills, cached per process
+
+    import sys
+    sys.path.insert(0, "/home/ubuntu/clawd/skills/task-master/scripts")
+    from task_queries import open_tasks, completed_on, reminders
+
+Every caller in a process shares one store connection. Query results are
+kept until the store changes: a write through this process or a commit by
+any other process. Several readers in one run, such as the three task
+sections of a greeting, therefore cost one read between them.
+
+On a machine with no tasks yet (neither tasks.db nor a legacy tasks.json),
+the queries return empty results without creating a database.
+"""
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from task_store import TaskStore, normalize_deadline
+
+TASKS_DB = Path("/home/ubuntu/clawd/memory/tasks.db")
+TASKS_FILE = TASKS_DB.with_name("tasks.json")  # legacy single file, imported on first use
+
+_store = None
+_cache = {}
+_cache_version = None
+
+def get_store():
+    """The task store (importing a legacy tasks.json on first use)."""
+    global _store
+    if _store is None:
+        _store = TaskStore(TASKS_DB, TASKS_FILE)
+    return _store
+
+def has_tasks():
+    """Whether there is a store (or a legacy tasks.json to import) to read from."""
+    return _store is not None or TASKS_DB.exists() or TASKS_FILE.exists()
+
+def cached(key, compute):
+    """compute() once per version of the store; later calls reuse the result."""
+    global _cache_version
+    version = get_store().version()
+    if version != _cache_version:
+        _cache.clear()
+        _cache_version = version
+    if key not in _cache:
+        _cache[key] = compute()
+    return _cache[key]
+
+def open_tasks(sort_by="priority"):
+    """Open tasks, ordered by priority, deadline or (None) id. Treat the list as read-only."""
+    if not has_tasks():
+        return []
+    return cached(("open", sort_by), lambda: get_store().query("open", sort_by))
+
+def completed_on(day=None):
+    """Tasks completed on a day (date or YYYY-MM-DD, default today)."""
+    if not has_tasks():
+        return []
+    day = str(day or date.today())
+    return cached(("completed", day), lambda: get_store().archived_on(day))
+
+def reminders(hours=24, store=None):
+    """Reminder text for overdue tasks and deadlines in the next `hours` ("" if none)."""
+    if store is None and not has_tasks():
+        return ""
+    store = store or get_store()
+    now = datetime.now()
+    cutoff = now + timedelta(hours=hours)
+
+    # Range scans over the (status, deadline) index; only due tasks are read
+    urgent = store.due_between(end=now - timedelta(microseconds=1))
+    upcoming = store.due_between(now, cutoff)
+
+    output = []
+
+    if urgent:
+        output.append("🚨 OVERDUE TASKS:")
+        for t in urgent:
+            days_late = (now - datetime.fromisoformat(normalize_deadline(t["deadline"]))).days
+            late_text = f" ({days_late}d late)" if days_late > 0 else " (due today)"
+            output.append(f"  • #{t['id']}: {t['description']}{late_text}")
+
+    if upcoming:
+        output.append("⏰ UPCOMING DEADLINES:")
+        for t in upcoming:
+            output.append(f"  • #{t['id']}: {t['description']} ({time_until(t, now)})")
+
+    return "\n".join(output) if output else ""
+
+def time_until(task, now):
+    """'in Nh' / 'in Nd' until the task's deadline."""
+    hours_until = int((datetime.fromisoformat(normalize_deadline(task["deadline"])) - now).total_seconds() / 3600)
+    return f"in {hours_until}h" if hours_until < 24 else f"in {hours_until//24}d"
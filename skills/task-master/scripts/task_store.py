@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+task-master: SQLite task store with indexes on status, priority and deadline
+
+One row per task, keyed by id, so completing or deleting a task touches only
+that row. Deadlines are parsed once, when written, into `deadline_at` (a
+normalized local ISO timestamp that sorts as text); deadline and priority
+queries are range scans over indexes instead of passes over every task.
+
+Only open tasks stay in the `tasks` table. Completing or deleting a task
+moves it to the archive: an append-only JSON-lines file per month,
+tasks_archive/<YYYY-MM>.jsonl, partitioned by the day the task was closed.
+The `archive` table indexes every archived task by day and status, with
+its file offset, so "completed on day X" reads just that day's lines.
+
+A legacy tasks.json is imported on first use and moved aside.
+"""
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+PRIORITIES = ("critical", "high", "medium", "low")
+
+# Rank used for sorting; unknown priorities sort with medium
+PRIORITY_RANK = {p: i for i, p in enumerate(PRIORITIES)}
+
+FIELDS = ("id", "description", "priority", "deadline", "status", "context", "created_at", "completed_at")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    priority_rank INTEGER NOT NULL,
+    deadline TEXT,
+    deadline_at TEXT,
+    status TEXT NOT NULL,
+    context TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL,
+    completed_at TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS archive (
+    id INTEGER PRIMARY KEY,
+    day TEXT NOT NULL,
+    status TEXT NOT NULL,
+    file TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_archive_day ON archive(day, status);
+CREATE INDEX IF NOT EXISTS idx_archive_status ON archive(status, file, offset);
+CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks(status, priority_rank, deadline);
+CREATE INDEX IF NOT EXISTS idx_tasks_deadline ON tasks(status, deadline_at);
+"""
+
+SORTS = {
+    "priority": "priority_rank, COALESCE(deadline, '9999'), id",
+    "deadline": "COALESCE(deadline, '9999'), priority_rank, id",
+}
+
+def _deadline_key(task):
+    return "9999" if task.get("deadline") is None else task["deadline"]
+
+def _rank(task):
+    return PRIORITY_RANK.get(task.get("priority"), PRIORITY_RANK["medium"])
+
+# The same orderings as SORTS, for merging open tasks with archived ones
+SORT_KEYS = {
+    "priority": lambda t: (_rank(t), _deadline_key(t), t["id"]),
+    "deadline": lambda t: (_deadline_key(t), _rank(t), t["id"]),
+}
+
+def normalize_deadline(deadline):
+    """Local naive ISO timestamp for a deadline string, or None if it doesn't parse."""
+    if not deadline:
+        return None
+    try:
+        parsed = datetime.fromisoformat(deadline)
+    except (TypeError, ValueError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed.isoformat()
+
+def row_to_task(row):
+    return dict(zip(FIELDS, row))
+
+class TaskStore:
+    """Tasks in SQLite; every mutation is a single-row statement."""
+
+    def __init__(self, path, legacy_file=None, archive_dir=None):
+        self.path = Path(path)
+        self.legacy_file = Path(legacy_file) if legacy_file else None
+        self.archive_dir = Path(archive_dir) if archive_dir else self.path.with_name(f"{self.path.stem}_archive")
+        self._conn = None
+        self._depth = 0
+        self._closing = {}  # id -> (task, archived_at), archived when the transaction commits
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            if self.legacy_file is not None and self.legacy_file.exists():
+                self.import_legacy(self.legacy_file)
+            self.archive_closed()
+        return self._conn
+
+    @contextmanager
+    def transaction(self):
+        """Group several mutations into one atomic commit (nests).
+
+        Tasks closed inside the transaction are appended to the archive just
+        before the outermost commit, one write per archive file.
+        """
+        conn = self.conn
+        if self._depth == 0:
+            conn.execute("BEGIN IMMEDIATE")
+            self._closing = {}
+        self._depth += 1
+        try:
+            yield self
+            if self._depth == 1:
+                self._flush_closed()
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                self._closing = {}
+                conn.execute("ROLLBACK")
+            raise
+        self._depth -= 1
+        if self._depth == 0:
+            conn.execute("COMMIT")
+
+    def _meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    @property
+    def next_id(self):
+        return int(self._meta("next_id", 1))
+
+    def _insert(self, task):
+        task = dict(task)
+        task["priority"] = task.get("priority") or "medium"
+        task["status"] = task.get("status") or "open"
+        task["context"] = task.get("context") or ""
+        task["description"] = task.get("description") or ""
+        task["created_at"] = task.get("created_at") or datetime.now().isoformat()
+        self.conn.execute(
+            f"INSERT INTO tasks ({', '.join(FIELDS)}, priority_rank, deadline_at) "
+            f"VALUES ({', '.join('?' * (len(FIELDS) + 2))})",
+            [task.get(f) for f in FIELDS]
+            + [PRIORITY_RANK.get(task["priority"], PRIORITY_RANK["medium"]), normalize_deadline(task.get("deadline"))],
+        )
+
+    def add(self, task):
+        """Insert a task (without an id) and return its new id."""
+        with self.transaction():
+            task_id = self.next_id
+            self._insert(dict(task, id=task_id))
+            self._set_meta("next_id", task_id + 1)
+            if task.get("status", "open") not in ("open", None):
+                self._archive(self.get(task_id))
+        return task_id
+
+    def get(self, task_id):
+        """An open task, or else the archived one (None if neither)."""
+        row = self.conn.execute(f"SELECT {', '.join(FIELDS)} FROM tasks WHERE id = ?", (int(task_id),)).fetchone()
+        if row:
+            task = row_to_task(row)
+            closing = self._closing.get(task["id"])
+            return dict(task, status=closing[0]["status"]) if closing else task
+        found = self._read_archive(self.conn.execute(
+            "SELECT file, offset, length FROM archive WHERE id = ?", (int(task_id),)))
+        return found[0] if found else None
+
+    def update(self, task_id, **fields):
+        """Change fields of one task. Returns False if there is no such task."""
+        fields = {k: v for k, v in fields.items() if k in FIELDS and k != "id"}
+        if "priority" in fields:
+            fields["priority_rank"] = PRIORITY_RANK.get(fields["priority"], PRIORITY_RANK["medium"])
+        if "deadline" in fields:
+            fields["deadline_at"] = normalize_deadline(fields["deadline"])
+        if not fields:
+            return self.get(task_id) is not None
+        with self.transaction():
+            cur = self.conn.execute(
+                f"UPDATE tasks SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+                list(fields.values()) + [int(task_id)],
+            )
+            if cur.rowcount and fields.get("status", "open") != "open":
+                self._archive(self.get(task_id))
+            elif cur.rowcount and "status" in fields:
+                self._closing.pop(int(task_id), None)  # reopened before the commit
+        return cur.rowcount > 0
+
+    def delete(self, task_id):
+        """Move one task (open or completed) to the archive as deleted. Returns False if there is no such task."""
+        with self.transaction():
+            task = self.get(task_id)
+            if task is None or task["status"] == "deleted":
+                return False
+            self._archive(dict(task, status="deleted"), datetime.now().isoformat())
+        return True
+
+    def _archive(self, task, archived_at=None):
+        """Queue a closed task to leave the open table when the transaction commits."""
+        self._closing[task["id"]] = (task, archived_at)
+
+    def _flush_closed(self):
+        """Archive the tasks closed in this transaction, with any later edits to their rows."""
+        closed = []
+        for task_id, (task, archived_at) in self._closing.items():
+            row = self.conn.execute(f"SELECT {', '.join(FIELDS)} FROM tasks WHERE id = ?", (task_id,)).fetchone()
+            closed.append((dict(row_to_task(row), status=task["status"]) if row else task, archived_at))
+        self._closing = {}
+        if closed:
+            self._archive_many(closed)
+
+    def _archive_many(self, closed):
+        """Append closed (task, archived_at) pairs to their month's archive file and drop them from the open table.
+
+        Called with the transaction's write lock held, which keeps the recorded offsets exact.
+        """
+        by_file = {}
+        for task, archived_at in closed:
+            archived_at = archived_at or task.get("completed_at") or datetime.now().isoformat()
+            line = (json.dumps(dict(task, archived_at=archived_at)) + "\n").encode()
+            by_file.setdefault(f"{archived_at[:7]}.jsonl", []).append((task, archived_at[:10], line))
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        for name, entries in by_file.items():
+            index = []
+            with open(self.archive_dir / name, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                for task, day, line in entries:
+                    index.append((task["id"], day, task["status"], name, offset, len(line)))
+                    offset += len(line)
+                f.write(b"".join(line for _, _, line in entries))
+                f.flush()
+                os.fsync(f.fileno())
+            self.conn.executemany("DELETE FROM tasks WHERE id = ?", [(row[0],) for row in index])
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO archive (id, day, status, file, offset, length) VALUES (?, ?, ?, ?, ?, ?)",
+                index,
+            )
+
+    def archive_closed(self):
+        """Move any tasks that are no longer open out of the open table. Returns how many."""
+        rows = self.conn.execute(f"SELECT {', '.join(FIELDS)} FROM tasks WHERE status != 'open'").fetchall()
+        if rows:
+            with self.transaction():
+                for row in rows:
+                    task = row_to_task(row)
+                    self._archive(task, task.get("completed_at") or task.get("created_at"))
+        return len(rows)
+
+    def _iter_archive(self, rows):
+        """Archived tasks at the given (file, offset, length) rows, one open per file."""
+        handle, current = None, None
+        try:
+            for name, offset, length in rows:
+                if name != current:
+                    if handle:
+                        handle.close()
+                    handle, current = open(self.archive_dir / name, "rb"), name
+                handle.seek(offset)
+                yield json.loads(handle.read(length))
+        finally:
+            if handle:
+                handle.close()
+
+    def _read_archive(self, rows):
+        return list(self._iter_archive(rows))
+
+    def archived_on(self, day, status="completed"):
+        """Tasks closed with `status` on `day` (a date or YYYY-MM-DD), in id order."""
+        rows = self.conn.execute(
+            "SELECT file, offset, length FROM archive WHERE day = ? AND status = ? ORDER BY id", (str(day), status)
+        ).fetchall()
+        return self._read_archive(rows)
+
+    def archived(self, status="completed"):
+        """Every archived task with `status`, read sequentially file by file."""
+        rows = self.conn.execute(
+            "SELECT file, offset, length FROM archive WHERE status = ? ORDER BY file, offset", (status,)
+        ).fetchall()
+        return self._read_archive(rows)
+
+    def query(self, status="open", sort_by="priority"):
+        """Tasks with `status` ("all" for open and completed), ordered by priority or deadline.
+
+        Open tasks come from the open table alone; other statuses read the archive.
+        """
+        tasks = []
+        if status in ("open", "all"):
+            order = SORTS.get(sort_by, "id")
+            rows = self.conn.execute(f"SELECT {', '.join(FIELDS)} FROM tasks WHERE status = 'open' ORDER BY {order}")
+            tasks = [row_to_task(r) for r in rows]
+        if status != "open":
+            archived = self.archived("completed" if status == "all" else status)
+            tasks = sorted(tasks + archived, key=SORT_KEYS.get(sort_by, lambda t: t["id"]))
+        return tasks
+
+    def iter_tasks(self, status="all"):
+        """Stream tasks with `status` ("all" for open and completed): open ones by id, then archived in file order."""
+        if status in ("open", "all"):
+            cur = self.conn.execute(f"SELECT {', '.join(FIELDS)} FROM tasks WHERE status = 'open' ORDER BY id")
+            for row in cur:
+                yield row_to_task(row)
+        if status != "open":
+            cur = self.conn.execute(
+                "SELECT file, offset, length FROM archive WHERE status = ? ORDER BY file, offset",
+                ("completed" if status == "all" else status,),
+            )
+            yield from self._iter_archive(cur)
+
+    def due_between(self, start=None, end=None, status="open"):
+        """Tasks whose parsed deadline falls in [start, end] (datetimes or None), earliest first."""
+        clauses, params = ["status = ?", "deadline_at IS NOT NULL"], [status]
+        if start is not None:
+            clauses.append("deadline_at >= ?")
+            params.append(start.isoformat())
+        if end is not None:
+            clauses.append("deadline_at <= ?")
+            params.append(end.isoformat())
+        rows = self.conn.execute(
+            f"SELECT {', '.join(FIELDS)} FROM tasks WHERE {' AND '.join(clauses)} ORDER BY deadline_at, id", params
+        )
+        return [row_to_task(r) for r in rows]
+
+    def next_deadline(self, after, status="open"):
+        """Earliest parsed deadline strictly after `after` (a datetime), or None.
+
+        The (status, deadline_at) index keeps open deadlines in order as tasks are
+        added, completed and deleted, so this is a single index lookup.
+        """
+        row = self.conn.execute(
+            "SELECT deadline_at FROM tasks WHERE status = ? AND deadline_at > ? ORDER BY deadline_at LIMIT 1",
+            (status, after.isoformat()),
+        ).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def data_version(self):
+        """Changes whenever another connection commits to the store."""
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def version(self):
+        """Changes whenever the store does, through this connection or any other."""
+        return (self.data_version(), self.conn.total_changes)
+
+    def count(self, status="open"):
+        if status == "open":
+            return self.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM archive WHERE status = ?", (status,)).fetchone()[0]
+
+    def import_legacy(self, path):
+        """Load a tasks.json document into the store and move the file aside."""
+        with open(path) as f:
+            data = json.load(f)
+        with self.transaction():
+            next_id = max(self.next_id, data.get("next_id", 1))
+            for task in data.get("tasks", []):
+                if self.get(task["id"]) is not None:
+                    if self.get(task["id"]) == {f: task.get(f) for f in FIELDS}:
+                        continue
+                    task = dict(task, id=next_id)  # id already taken by another task
+                self._insert(task)
+                next_id = max(next_id, task["id"] + 1)
+            self._set_meta("next_id", next_id)
+        os.replace(path, path.with_name(f"{path.name}.imported-{datetime.now():%Y%m%d%H%M%S}"))
+        return len(data.get("tasks", []))
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,46 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import task_manager
+import task_queries
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(task_queries, "TASKS_DB", tmp_path / "tasks.db")
+    monkeypatch.setattr(task_queries, "TASKS_FILE", tmp_path / "tasks.json")
+    monkeypatch.setattr(task_queries, "_store", None)
+    yield task_queries.get_store()
+    task_queries.get_store().close()
+
+def lines(*ops):
+    return [json.dumps(op) for op in ops]
+
+def test_batch_applies_all_ops(store):
+    counts = task_manager.apply_batch(lines(
+        {"description": "one", "priority": "HIGH"},
+        {"op": "add", "description": "two"},
+        {"op": "update", "id": 2, "priority": "critical"},
+        {"op": "complete", "id": 1},
+    ))
+    assert counts == {"add": 2, "complete": 1, "delete": 0, "update": 1}
+    assert [(t["id"], t["priority"]) for t in store.query("open")] == [(2, "critical")]
+    assert store.get(1)["status"] == "completed"
+
+@pytest.mark.parametrize("priority", [5, "urgent", None])
+def test_batch_with_invalid_priority_applies_nothing(store, priority):
+    store.add({"description": "existing"})
+    with pytest.raises(ValueError, match="line 2: unknown priority"):
+        task_manager.apply_batch(lines(
+            {"description": "valid"},
+            {"description": "invalid", "priority": priority},
+        ))
+    with pytest.raises(ValueError, match="line 1: unknown priority"):
+        task_manager.apply_batch(lines({"op": "update", "id": 1, "priority": priority}))
+    assert [t["description"] for t in store.query("all")] == ["existing"]
+    assert store.get(1)["priority"] == "medium"
+    assert task_manager.format_task_list(store.query("all"))
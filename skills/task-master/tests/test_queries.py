@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "scripts"))
+
+import task_queries
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    monkeypatch.setattr(task_queries, "TASKS_DB", tmp_path / "tasks.db")
+    monkeypatch.setattr(task_queries, "TASKS_FILE", tmp_path / "tasks.json")
+    monkeypatch.setattr(task_queries, "_store", None)
+    monkeypatch.setattr(task_queries, "_cache_version", None)
+    return tmp_path
+
+def test_reads_without_tasks_create_nothing(paths):
+    assert task_queries.open_tasks() == []
+    assert task_queries.completed_on() == []
+    assert task_queries.reminders() == ""
+    assert list(paths.iterdir()) == []
+
+def test_reads_see_tasks_once_there_are_some(paths):
+    task_queries.get_store().add({"description": "first", "deadline": "2000-01-01"})
+    assert [t["description"] for t in task_queries.open_tasks()] == ["first"]
+    assert "OVERDUE" in task_queries.reminders()
+    task_queries.get_store().close()